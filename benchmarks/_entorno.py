@@ -0,0 +1,33 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def preparar_django(ruta_db=None):
+    sys.path.insert(0, str(RAIZ))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'capital_project.settings')
+
+    from django.conf import settings
+
+    if ruta_db is None:
+        ruta_db = Path(tempfile.mkdtemp(prefix='capital_bench_')) / 'bench.sqlite3'
+    settings.DATABASES['default']['NAME'] = str(ruta_db)
+
+    import django
+
+    django.setup()
+    return ruta_db
+
+
+def medir(funcion, repeticiones=5):
+    import time
+
+    mejores = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejores.append(time.perf_counter() - inicio)
+    return min(mejores)
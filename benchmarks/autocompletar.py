@@ -0,0 +1,54 @@
+"""Tiempos del autocompletado de clientes con el índice FTS5 frente al filtro icontains.
+
+Uso: python benchmarks/autocompletar.py [--clientes 100000]
+
+Trabaja sobre una base SQLite temporal, nunca sobre la configurada en settings.
+"""
+import argparse
+import random
+
+from _entorno import medir, preparar_django
+
+NOMBRES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elena', 'Fabio', 'Gloria', 'Hugo', 'Inés', 'Jorge', 'Lucía', 'Mario']
+APELLIDOS = ['Pérez', 'Quispe', 'Mamani', 'Rojas', 'Vargas', 'Gutiérrez', 'Flores', 'Choque', 'López', 'Condori']
+CONSULTAS = ['a', 'qui', 'mar roj', 'lucía gutiérrez', 'zz']
+
+
+def sembrar(total):
+    from core import busqueda
+    from core.models import Cliente
+
+    rnd = random.Random(11)
+    Cliente.objects.bulk_create((
+        Cliente(nombre=f'{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}', nit_ci=str(rnd.randint(10 ** 6, 10 ** 8)))
+        for _ in range(total)
+    ), batch_size=5000)
+    busqueda.reconstruir(['cliente'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clientes', type=int, default=100000)
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    from django.core.management import call_command
+    from django.test.utils import override_settings
+
+    print(f'Base temporal: {ruta}')
+    call_command('migrate', verbosity=0)
+    sembrar(args.clientes)
+
+    from core.autocompletar import autocompletar
+
+    for backend in ('core.busqueda.BackendFTS5', 'core.busqueda.BackendLike'):
+        print(f'\n== {backend.rsplit(".", 1)[-1]} ==')
+        with override_settings(BUSQUEDA_BACKEND=backend):
+            for consulta in CONSULTAS:
+                segundos = medir(lambda: autocompletar('clientes', consulta, limite=20))
+                total = len(autocompletar('clientes', consulta, limite=20)['resultados'])
+                print(f'{consulta!r:<20} {segundos * 1000:9.2f} ms  ({total} resultados)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Tiempo de reconcile_stock (consulta con ventanas sobre el libro de movimientos).
+
+Uso: python benchmarks/conciliacion_stock.py [--movimientos 2000000] [--materiales 500]
+
+Trabaja sobre una base SQLite temporal, nunca sobre la configurada en settings.
+"""
+import argparse
+import random
+from datetime import timedelta
+
+from _entorno import medir, preparar_django
+
+
+def sembrar(movimientos, materiales):
+    from django.utils import timezone
+    from core.models import Inventario, MovimientoInventario
+
+    rnd = random.Random(5)
+    ids = [m.pk for m in Inventario.objects.bulk_create(Inventario(nombre=f'Material {i}', cantidad=0) for i in range(materiales))]
+    inicio = timezone.now() - timedelta(days=365)
+    tipos = ['entrada'] * 50 + ['salida'] * 49 + ['ajuste']
+
+    def filas():
+        for i in range(movimientos):
+            yield MovimientoInventario(
+                inventario_id=rnd.choice(ids), tipo=rnd.choice(tipos), cantidad=rnd.randint(1, 100),
+                motivo='bench', fecha=inicio + timedelta(seconds=i * 15),
+            )
+
+    MovimientoInventario.objects.bulk_create(filas(), batch_size=10000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--movimientos', type=int, default=2000000)
+    parser.add_argument('--materiales', type=int, default=500)
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    from django.core.management import call_command
+
+    print(f'Base temporal: {ruta}')
+    call_command('migrate', verbosity=0)
+    sembrar(args.movimientos, args.materiales)
+
+    from core import stock
+
+    segundos = medir(stock.esperado_por_material, repeticiones=3)
+    print(f'esperado_por_material: {segundos:.2f} s para {args.movimientos} movimientos de {args.materiales} materiales')
+    segundos = medir(stock.discrepancias, repeticiones=3)
+    print(f'discrepancias:         {segundos:.2f} s ({len(stock.discrepancias())} materiales desfasados)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Tiempo de fit_tiempos (regresión por material con NumPy) y del prefill al crear pedidos.
+
+Uso: python benchmarks/estimacion.py [--producciones 200000] [--materiales 500]
+
+Trabaja sobre una base SQLite temporal, nunca sobre la configurada en settings.
+"""
+import argparse
+import random
+from datetime import date
+from decimal import Decimal
+
+from _entorno import medir, preparar_django
+
+
+def sembrar(producciones, materiales):
+    from core.models import Cliente, Inventario, Pedido, Produccion
+
+    rnd = random.Random(11)
+    cliente = Cliente.objects.create(nombre='Cliente bench')
+    ids = [m.pk for m in Inventario.objects.bulk_create(Inventario(nombre=f'Material {i}', cantidad=0) for i in range(materiales))]
+    pendientes = {pk: (rnd.uniform(0.2, 3), rnd.uniform(0.001, 0.05)) for pk in ids}
+
+    def pedidos():
+        for _ in range(producciones):
+            cantidad = rnd.randint(1, 2000)
+            yield Pedido(
+                cliente=cliente, inventario_id=rnd.choice(ids), cantidad=cantidad, descripcion='bench',
+                precio_unitario=Decimal('1.00'), descuento=Decimal('0'), precio_total=Decimal(cantidad),
+                estado='terminado', fecha_entrega=date(2025, 1, 1),
+            )
+
+    creados = Pedido.objects.bulk_create(pedidos(), batch_size=5000)
+
+    def filas():
+        for pedido in creados:
+            intercepto, por_unidad = pendientes[pedido.inventario_id]
+            horas = max(0.1, intercepto + por_unidad * pedido.cantidad + rnd.gauss(0, 0.5))
+            yield Produccion(pedido=pedido, estado='terminado', tiempo_estimado=0, tiempo_real=Decimal(f'{min(horas, 999):.2f}'))
+
+    Produccion.objects.bulk_create(filas(), batch_size=5000)
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--producciones', type=int, default=200000)
+    parser.add_argument('--materiales', type=int, default=500)
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    from django.core.management import call_command
+
+    print(f'Base temporal: {ruta}')
+    call_command('migrate', verbosity=0)
+    ids = sembrar(args.producciones, args.materiales)
+
+    from core import estimacion
+
+    grupos, cantidades, horas = estimacion.historial()
+    segundos = medir(estimacion.historial, repeticiones=3)
+    print(f'historial: {segundos:.2f} s para {args.producciones} producciones')
+    segundos = medir(lambda: estimacion.ajustar(grupos, cantidades, horas), repeticiones=5)
+    print(f'ajustar:   {segundos * 1000:.1f} ms para {args.materiales} materiales')
+    segundos = medir(estimacion.reajustar, repeticiones=3)
+    print(f'reajustar: {segundos:.2f} s en total')
+
+    [estimacion.estimar(pk, 500) for pk in ids]
+    segundos = medir(lambda: [estimacion.estimar(pk, 500) for pk in ids], repeticiones=5)
+    print(f'estimar:   {segundos / len(ids) * 1e6:.1f} us por pedido')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""RSS máximo y tiempo al exportar el listado de clientes en CSV y NDJSON.
+
+Uso: python benchmarks/exportacion.py [--filas 1000000]
+
+La siembra y cada exportación corren en subprocesos separados: Linux conserva
+el RSS máximo del padre a través de fork/exec, y así el valor medido
+corresponde sólo a consumir la respuesta en streaming de la vista.
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from _entorno import preparar_django
+
+
+def sembrar(total):
+    from core.models import Cliente
+
+    Cliente.objects.bulk_create((Cliente(nombre=f'Cliente {i}', nit_ci=str(10 ** 6 + i)) for i in range(total)), batch_size=10000)
+
+
+def exportar(ruta_db, formato):
+    import resource
+    import time
+
+    preparar_django(ruta_db)
+    from django.contrib.auth.models import User
+    from django.test import Client
+
+    cliente = Client(HTTP_HOST='localhost')
+    cliente.force_login(User.objects.get_or_create(username='benchmark')[0])
+    inicio = time.perf_counter()
+    respuesta = cliente.get('/clientes/', {'export': formato})
+    lineas = bytes_ = 0
+    for trozo in respuesta.streaming_content:
+        lineas += trozo.count(b'\n')
+        bytes_ += len(trozo)
+    segundos = time.perf_counter() - inicio
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'{lineas} {segundos:.2f} {rss:.1f} {bytes_ / 1024 / 1024:.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--filas', type=int, default=1000000)
+    parser.add_argument('--exportar', nargs=2, help=argparse.SUPPRESS)
+    parser.add_argument('--sembrar', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.exportar:
+        exportar(*args.exportar)
+        return
+    if args.sembrar:
+        preparar_django(args.sembrar)
+        from django.core.management import call_command
+
+        call_command('migrate', verbosity=0)
+        sembrar(args.filas)
+        return
+
+    ruta = Path(tempfile.mkdtemp(prefix='capital_bench_')) / 'bench.sqlite3'
+    print(f'Base temporal: {ruta}')
+    subprocess.run([sys.executable, __file__, '--sembrar', str(ruta), '--filas', str(args.filas)], check=True)
+
+    print(f"{'formato':>8} {'líneas':>9} {'segundos':>9} {'RSS máx MB':>11} {'salida MB':>10}")
+    for formato in ('csv', 'ndjson'):
+        salida = subprocess.run(
+            [sys.executable, __file__, '--exportar', str(ruta), formato], check=True, capture_output=True, text=True,
+        ).stdout.split()
+        lineas, segundos, rss, tamano = salida[-4:]
+        print(f'{formato:>8} {lineas:>9} {segundos:>9} {rss:>11} {tamano:>10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Planes de consulta y tiempos de los listados sin índices y con los que declara models.py.
+
+Migra hasta la última migración, quita los índices de los modelos medidos,
+siembra y mide; luego los vuelve a crear y mide otra vez. Así se mide el
+conjunto que queda tras toda la serie (0007 los añade, 0009 cambia los de
+estado y fecha), no el de una migración intermedia.
+
+Uso: python benchmarks/indices.py [--filas 200000]
+
+Trabaja sobre una base SQLite temporal, nunca sobre la configurada en settings.
+"""
+import argparse
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from _entorno import medir, preparar_django
+
+
+def indices():
+    from core.models import Compra, Inventario, Pedido, Trabajo
+
+    return [(modelo, indice) for modelo in (Pedido, Trabajo, Compra, Inventario) for indice in modelo._meta.indexes]
+
+
+def sembrar(filas):
+    from django.db import connection
+    from core.models import Cliente, Compra, Inventario, Pedido, Proveedor, Trabajo
+
+    rnd = random.Random(7)
+    clientes = Cliente.objects.bulk_create([Cliente(nombre=f'Cliente {i}') for i in range(2000)])
+    materiales = Inventario.objects.bulk_create([
+        Inventario(nombre=f'Material {i}', cantidad=rnd.randint(0, 500), cantidad_minima=rnd.randint(5, 50))
+        for i in range(5000)
+    ])
+    proveedores = Proveedor.objects.bulk_create([Proveedor(nombre=f'Proveedor {i}') for i in range(200)])
+    estados = [e for e, _ in Pedido.ESTADOS]
+    estados_compra = [e for e, _ in Compra.ESTADOS_COMPRA]
+    hoy = date.today()
+
+    def comun():
+        return {
+            'cliente_id': rnd.choice(clientes).pk,
+            'cantidad': rnd.randint(1, 100),
+            'descripcion': 'Trabajo de imprenta',
+            'precio_unitario': Decimal('2.50'),
+            'precio_total': Decimal('25.00'),
+            'estado': rnd.choice(estados),
+            'fecha_entrega': hoy + timedelta(days=rnd.randint(-700, 30)),
+        }
+
+    Pedido.objects.bulk_create((Pedido(inventario_id=rnd.choice(materiales).pk, **comun()) for _ in range(filas)), batch_size=5000)
+    Trabajo.objects.bulk_create((Trabajo(**comun()) for _ in range(filas)), batch_size=5000)
+    Compra.objects.bulk_create((
+        Compra(
+            proveedor_id=rnd.choice(proveedores).pk, inventario_id=rnd.choice(materiales).pk, cantidad=10,
+            precio_unitario=Decimal('1.00'), costo_total=Decimal('10.00'), estado=rnd.choice(estados_compra),
+        )
+        for _ in range(filas // 4)
+    ), batch_size=5000)
+    with connection.cursor() as cursor:
+        for tabla in ('core_pedido', 'core_trabajo', 'core_compra'):
+            cursor.execute(f"UPDATE {tabla} SET fecha_creacion = date('now', '-' || (id % 730) || ' days')")
+        cursor.execute('ANALYZE')
+
+
+def consultas():
+    from django.db.models import F
+    from core.models import Compra, Inventario, Pedido, Trabajo
+
+    hoy = date.today()
+    return [
+        ('pedidos_lista estado=pendiente', lambda: Pedido.objects.filter(estado='pendiente').order_by('-fecha_creacion', '-id')[:50]),
+        ('trabajos_lista estado=en_produccion', lambda: Trabajo.objects.filter(estado='en_produccion').order_by('-fecha_creacion', '-id')[:50]),
+        ('compras_lista estado=ordenado', lambda: Compra.objects.filter(estado='ordenado').order_by('-fecha_creacion', '-id')[:50]),
+        ('dashboard pedidos pendientes', lambda: Pedido.objects.filter(estado='pendiente').order_by().values('pk')),
+        ('entregas próxima semana', lambda: Pedido.objects.filter(fecha_entrega__range=(hoy, hoy + timedelta(days=7))).values('pk')),
+        ('inventario bajo stock', lambda: Inventario.objects.filter(cantidad__lte=F('cantidad_minima')).order_by().values('pk')),
+    ]
+
+
+def ejecutar(titulo):
+    print(f'\n== {titulo} ==')
+    for nombre, construir in consultas():
+        plan = construir().explain()
+        segundos = medir(lambda: len(construir()))
+        print(f'{nombre:<40} {segundos * 1000:9.2f} ms')
+        for linea in plan.splitlines():
+            print(f'    {linea}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--filas', type=int, default=200000, help='Pedidos y trabajos a sembrar')
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    from django.core.management import call_command
+    from django.db import connection
+
+    print(f'Base temporal: {ruta}')
+    call_command('migrate', verbosity=0)
+    with connection.schema_editor() as editor:
+        for modelo, indice in indices():
+            editor.remove_index(modelo, indice)
+    sembrar(args.filas)
+    ejecutar('sin índices')
+    with connection.schema_editor() as editor:
+        for modelo, indice in indices():
+            editor.add_index(modelo, indice)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    ejecutar('con los índices de models.py')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Tiempo y RSS máximo al generar el PDF de compras con tablas por página.
+
+Uso: python benchmarks/pdf_compras.py [--filas 10000 100000 500000] [--memoria-mb 32] [--tabla-unica]
+
+Cada tamaño se siembra en una base SQLite temporal y se renderiza en un
+subproceso nuevo, así el RSS máximo medido corresponde sólo a la generación.
+--tabla-unica repite la medición con una sola tabla para todas las filas
+(el comportamiento anterior), útil para comparar con tamaños pequeños.
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+
+from _entorno import preparar_django
+
+
+def sembrar(total):
+    from core.models import Compra, Inventario, Proveedor
+
+    rnd = random.Random(7)
+    proveedores = Proveedor.objects.bulk_create(Proveedor(nombre=f'Proveedor {i}') for i in range(50))
+    materiales = Inventario.objects.bulk_create(
+        Inventario(nombre=f'Material {i}', cantidad=100, cantidad_minima=5, unidad='unidad', precio_unitario=Decimal('3.50'))
+        for i in range(200)
+    )
+    estados = ['pendiente', 'ordenado', 'recibido', 'cancelado']
+
+    def compras():
+        for _ in range(total):
+            cantidad = rnd.randint(1, 500)
+            precio = Decimal(rnd.randint(100, 9999)) / 100
+            yield Compra(
+                proveedor=rnd.choice(proveedores), inventario=rnd.choice(materiales), cantidad=cantidad,
+                precio_unitario=precio, costo_total=precio * cantidad, estado=rnd.choice(estados),
+            )
+
+    Compra.objects.bulk_create(compras(), batch_size=5000)
+
+
+def tabla_unica(filtros, destino):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Table
+    from core import reportes
+
+    filas = [[titulo for titulo, _ in reportes.COLUMNAS_PDF_COMPRAS]]
+    filas.extend(reportes._filas_compras(filtros, 2000))
+    SimpleDocTemplate(destino, pagesize=A4).build([Table(filas, repeatRows=1)])
+
+
+def renderizar(ruta_db, modo):
+    import resource
+    import time
+
+    preparar_django(ruta_db)
+    from core import reportes
+
+    destino = Path(tempfile.mkdtemp(prefix='capital_pdf_')) / 'compras.pdf'
+    filtros = reportes.filtros_compras({})
+    inicio = time.perf_counter()
+    if modo == 'unica':
+        tabla_unica(filtros, str(destino))
+    else:
+        reportes.pdf_compras(filtros, str(destino))
+    segundos = time.perf_counter() - inicio
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'{segundos:.2f} {rss:.1f} {destino.stat().st_size / 1024 / 1024:.1f}')
+    destino.unlink()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--filas', type=int, nargs='+', default=[10000, 100000, 500000])
+    parser.add_argument('--memoria-mb', type=int, default=32)
+    parser.add_argument('--tabla-unica', action='store_true')
+    parser.add_argument('--renderizar', help=argparse.SUPPRESS)
+    parser.add_argument('--modo', default='paginas', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.renderizar:
+        renderizar(args.renderizar, args.modo)
+        return
+
+    entorno = dict(os.environ, REPORTES_PDF_MEMORIA_MB=str(args.memoria_mb))
+    modos = ['paginas', 'unica'] if args.tabla_unica else ['paginas']
+    print(f"{'filas':>8} {'modo':>8} {'segundos':>9} {'RSS máx MB':>11} {'PDF MB':>7}")
+    for total in args.filas:
+        ruta = Path(tempfile.mkdtemp(prefix='capital_bench_')) / 'bench.sqlite3'
+        subprocess.run([sys.executable, '-c', (
+            'import sys; sys.argv=[""]; sys.path.insert(0, %r);'
+            'from _entorno import preparar_django; preparar_django(%r);'
+            'from django.core.management import call_command; call_command("migrate", verbosity=0);'
+            'import pdf_compras; pdf_compras.sembrar(%d)'
+        ) % (str(Path(__file__).parent), str(ruta), total)], check=True)
+        for modo in modos:
+            salida = subprocess.run(
+                [sys.executable, __file__, '--renderizar', str(ruta), '--modo', modo],
+                env=entorno, check=True, capture_output=True, text=True,
+            ).stdout.split()
+            segundos, rss, tamano = salida[-3:]
+            print(f'{total:>8} {modo:>8} {segundos:>9} {rss:>11} {tamano:>7}')
+
+
+if __name__ == '__main__':
+    main()
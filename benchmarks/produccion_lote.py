@@ -0,0 +1,74 @@
+"""Iniciar y finalizar producciones una a una frente a transicionar_producciones.
+
+Uso: python benchmarks/produccion_lote.py [--trabajos 60] [--historial 20000]
+
+Trabaja sobre una base SQLite temporal, nunca sobre la configurada en settings.
+"""
+import argparse
+from datetime import date
+from decimal import Decimal
+
+from _entorno import preparar_django
+
+
+def sembrar(trabajos, historial):
+    from core.models import Cliente, Inventario, Pedido, Produccion
+
+    cliente = Cliente.objects.create(nombre='Cliente bench')
+    material = Inventario.objects.create(nombre='Papel', cantidad=0)
+    # Pedidos entregados del mismo cliente: es lo que recuenta Pedido.save().
+    Pedido.objects.bulk_create(
+        (Pedido(cliente=cliente, inventario=material, cantidad=1, descripcion='h', precio_unitario=Decimal('1.00'),
+                descuento=Decimal('0'), precio_total=Decimal('1.00'), estado='entregado', fecha_entrega=date(2025, 1, 1))
+         for _ in range(historial)),
+        batch_size=5000,
+    )
+    grupos = []
+    for _ in range(2):
+        pedidos = Pedido.objects.bulk_create(
+            Pedido(cliente=cliente, inventario=material, cantidad=1, descripcion='t', precio_unitario=Decimal('1.00'),
+                   descuento=Decimal('0'), precio_total=Decimal('1.00'), fecha_entrega=date(2025, 1, 1))
+            for _ in range(trabajos)
+        )
+        grupos.append([p.pk for p in Produccion.objects.bulk_create(Produccion(pedido=p, tiempo_estimado=1) for p in pedidos)])
+    return grupos
+
+
+def main():
+    import time
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trabajos', type=int, default=60)
+    parser.add_argument('--historial', type=int, default=20000)
+    args = parser.parse_args()
+
+    ruta = preparar_django()
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    print(f'Base temporal: {ruta}')
+    call_command('migrate', verbosity=0)
+    uno_a_uno, lote = sembrar(args.trabajos, args.historial)
+
+    from core import transiciones
+    from core.models import Produccion
+
+    for accion in ('iniciar', 'finalizar'):
+        metodo = 'iniciar_produccion' if accion == 'iniciar' else 'finalizar_produccion'
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            for produccion in Produccion.objects.filter(pk__in=uno_a_uno).select_related('pedido'):
+                getattr(produccion, metodo)()
+            segundos = time.perf_counter() - inicio
+        print(f'{accion} uno a uno: {segundos * 1000:.0f} ms, {len(consultas)} consultas para {args.trabajos} trabajos')
+
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            transiciones.transicionar_producciones(lote, accion)
+            segundos = time.perf_counter() - inicio
+        print(f'{accion} en lote:   {segundos * 1000:.0f} ms, {len(consultas)} consultas')
+
+
+if __name__ == '__main__':
+    main()
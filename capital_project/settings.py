@@ -48,6 +48,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.user_profile',
+                'core.context_processors.eventos',
             ],
         },
     },
@@ -121,3 +122,32 @@ LOGIN_REDIRECT_URL = 'core:dashboard'
 LOGOUT_REDIRECT_URL = 'core:login'
 
 CLIENTE_FRECUENTE_UMBRAL = config('CLIENTE_FRECUENTE_UMBRAL', default=5, cast=int)
+
+ESTADISTICAS_CACHE_TTL = config('ESTADISTICAS_CACHE_TTL', default=60, cast=int)
+LISTADOS_POR_PAGINA = config('LISTADOS_POR_PAGINA', default=50, cast=int)
+EXPORTACION_LOTE = config('EXPORTACION_LOTE', default=2000, cast=int)
+BUSQUEDA_BACKEND = config('BUSQUEDA_BACKEND', default='')
+STOCK_MARGEN_PUNTO_CONTROL = config('STOCK_MARGEN_PUNTO_CONTROL', default=300, cast=int)
+CATALOGO_CACHE_TTL = config('CATALOGO_CACHE_TTL', default=3600, cast=int)
+
+REPORTES_DIR = config('REPORTES_DIR', default=str(BASE_DIR / 'media' / 'reportes'))
+REPORTES_PDF_MEMORIA_MB = config('REPORTES_PDF_MEMORIA_MB', default=32, cast=int)
+REPORTES_CACHE_TTL = config('REPORTES_CACHE_TTL', default=3600, cast=int)
+TAREAS_PROCESOS = config('TAREAS_PROCESOS', default=2, cast=int)
+TAREAS_TIEMPO_MAXIMO = config('TAREAS_TIEMPO_MAXIMO', default=1800, cast=int)
+TAREAS_MAX_INTENTOS = config('TAREAS_MAX_INTENTOS', default=3, cast=int)
+TAREAS_RETENCION_HORAS = config('TAREAS_RETENCION_HORAS', default=24, cast=int)
+
+ESTIMACION_MIN_MUESTRAS = config('ESTIMACION_MIN_MUESTRAS', default=5, cast=int)
+
+PLANIFICACION_AUTOMATICA = config('PLANIFICACION_AUTOMATICA', default=True, cast=bool)
+PLANIFICACION_JORNADA = {
+    'dias': (0, 1, 2, 3, 4),
+    'horas': ((8, 12), (14, 18)),
+}
+
+# Activar sólo al servir con ASGI, p. ej. uvicorn capital_project.asgi:application
+EVENTOS_ACTIVOS = config('EVENTOS_ACTIVOS', default=False, cast=bool)
+EVENTOS_INTERVALO = config('EVENTOS_INTERVALO', default=1.0, cast=float)
+EVENTOS_LATIDO = config('EVENTOS_LATIDO', default=15.0, cast=float)
+EVENTOS_RETENCION_MINUTOS = config('EVENTOS_RETENCION_MINUTOS', default=60, cast=int)
@@ -1,12 +1,32 @@
 from django.contrib import admin
 from django.utils.html import format_html
+from . import transiciones
 from .models import (
     Cliente, Producto, Inventario, Pedido, 
     Produccion, MovimientoInventario, PerfilUsuario,
-    Proveedor, Compra, Trabajo
+    Proveedor, Compra, Trabajo, Tarea, PuntoControlStock, PlanProduccion, CoeficienteTiempo
 )
 
 
+def _accion_transicion(estado, descripcion):
+    def accion(modeladmin, request, queryset):
+        resultados = transiciones.transicionar_lote(queryset.model, list(queryset.values_list('pk', flat=True)), estado)
+        resumen = transiciones.resumir(resultados)
+        modeladmin.message_user(request, f"{resumen.get('ok', 0)} actualizados, {len(resultados) - resumen.get('ok', 0)} sin cambios o rechazados")
+        for fila in resultados:
+            if fila['resultado'] == 'rechazado':
+                modeladmin.message_user(request, f"#{fila['id']}: {fila['mensaje']}", level='warning')
+    accion.__name__ = f'marcar_{estado}'
+    accion.short_description = descripcion
+    return accion
+
+
+ACCIONES_ESTADO = [
+    _accion_transicion('terminado', 'Marcar como terminado'),
+    _accion_transicion('entregado', 'Marcar como entregado'),
+]
+
+
 @admin.register(Cliente)
 class ClienteAdmin(admin.ModelAdmin):
     list_display = ['nombre', 'telefono', 'email', 'es_frecuente', 'cantidad_pedidos', 'descuento_badge', 'fecha_registro']
@@ -110,6 +130,7 @@ class PedidoAdmin(admin.ModelAdmin):
     search_fields = ['cliente__nombre', 'inventario__nombre', 'descripcion']
     readonly_fields = ['precio_total', 'fecha_creacion', 'usuario_registro']
     date_hierarchy = 'fecha_creacion'
+    actions = ACCIONES_ESTADO
     
     fieldsets = (
         ('Información del Pedido', {
@@ -303,6 +324,7 @@ class TrabajoAdmin(admin.ModelAdmin):
     search_fields = ['cliente__nombre', 'producto__nombre', 'descripcion']
     readonly_fields = ['precio_total', 'fecha_creacion', 'usuario_registro']
     date_hierarchy = 'fecha_creacion'
+    actions = ACCIONES_ESTADO
 
     fieldsets = (
         ('Información del Trabajo', {
@@ -325,6 +347,37 @@ class TrabajoAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tipo', 'estado', 'usuario', 'intentos', 'trabajador', 'fecha_creacion', 'fecha_fin']
+    list_filter = ['tipo', 'estado', 'fecha_creacion']
+    readonly_fields = ['clave', 'archivo', 'nombre_archivo', 'intentos', 'trabajador', 'fecha_creacion', 'fecha_inicio', 'fecha_fin']
+    ordering = ['-fecha_creacion']
+
+
+@admin.register(PuntoControlStock)
+class PuntoControlStockAdmin(admin.ModelAdmin):
+    list_display = ['inventario', 'fecha', 'cantidad', 'movimientos']
+    list_filter = ['fecha']
+    search_fields = ['inventario__nombre']
+    date_hierarchy = 'fecha'
+
+
+@admin.register(PlanProduccion)
+class PlanProduccionAdmin(admin.ModelAdmin):
+    list_display = ['empleado', 'posicion', 'produccion', 'horas', 'inicio', 'fin', 'fecha_entrega', 'atrasada']
+    list_filter = ['atrasada', 'empleado']
+    list_select_related = ['empleado', 'produccion__pedido']
+    readonly_fields = ['fecha_calculo']
+
+
+@admin.register(CoeficienteTiempo)
+class CoeficienteTiempoAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'intercepto', 'por_unidad', 'muestras', 'error', 'fecha_ajuste']
+    list_select_related = ['inventario']
+    readonly_fields = ['fecha_ajuste']
+
+
 admin.site.site_header = "Imprenta Capital - Administración"
 admin.site.site_title = "Imprenta Capital"
 admin.site.index_title = "Panel de Control"
@@ -0,0 +1,81 @@
+from django.db.models import Q
+
+from . import busqueda, paginacion
+from .models import Cliente, Inventario, Producto
+
+LIMITE_POR_DEFECTO = 20
+LIMITE_MAXIMO = 50
+
+
+class Fuente:
+    def __init__(self, modelo, filtro=None, datos=()):
+        self.modelo = modelo
+        self.filtro = filtro
+        self.datos = datos
+
+    def queryset(self):
+        qs = self.modelo.objects.all()
+        return qs.filter(self.filtro) if self.filtro is not None else qs
+
+    def datos_de(self, objeto):
+        return {campo: getattr(objeto, campo) for campo in self.datos}
+
+    def serializar(self, objeto):
+        return {'id': objeto.pk, 'texto': str(objeto), **self.datos_de(objeto)}
+
+
+FUENTES = {
+    'clientes': Fuente(Cliente, datos=('nit_ci', 'es_frecuente')),
+    'materiales': Fuente(Inventario, datos=('precio_unitario', 'cantidad', 'unidad', 'proveedor')),
+    'materiales_disponibles': Fuente(Inventario, Q(cantidad__gt=0), datos=('precio_unitario', 'cantidad', 'unidad', 'proveedor')),
+    'productos': Fuente(Producto, Q(activo=True), datos=('precio_unitario',)),
+}
+
+
+def _entero(valor, defecto, minimo, maximo):
+    try:
+        numero = int(valor)
+    except (TypeError, ValueError):
+        return defecto
+    return max(minimo, min(numero, maximo))
+
+
+def _despues_del_nombre(valores):
+    try:
+        nombre, pk = valores
+        return Q(nombre__gt=str(nombre)) | Q(nombre=str(nombre), id__gt=int(pk))
+    except (TypeError, ValueError):
+        return None
+
+
+def autocompletar(nombre, texto='', limite=None, cursor=None):
+    """Resultados de una fuente y el cursor de la página siguiente.
+
+    El cursor lleva la clave del último resultado entregado (``(rank, id)`` al
+    buscar, ``(nombre, id)`` al listar), así que cada página cuesta lo mismo
+    sin importar cuántas se hayan leído antes.
+    """
+    fuente = FUENTES[nombre]
+    limite = _entero(limite, LIMITE_POR_DEFECTO, 1, LIMITE_MAXIMO)
+    despues = paginacion.decodificar(cursor) if cursor else None
+    queryset = fuente.queryset()
+
+    if busqueda.terminos(texto):
+        encontrados = busqueda.buscar_con_claves(queryset, texto, limite + 1, despues)
+        por_id = queryset.in_bulk([pk for pk, _ in encontrados[:limite]])
+        objetos = [por_id[pk] for pk, _ in encontrados[:limite] if pk in por_id]
+        hay_mas = len(encontrados) > limite
+        ultima = encontrados[limite - 1][1] if hay_mas else None
+    else:
+        condicion = _despues_del_nombre(despues) if despues else None
+        if condicion is not None:
+            queryset = queryset.filter(condicion)
+        objetos = list(queryset.order_by('nombre', 'id')[:limite + 1])
+        hay_mas = len(objetos) > limite
+        objetos = objetos[:limite]
+        ultima = [objetos[-1].nombre, objetos[-1].pk] if hay_mas else None
+
+    return {
+        'resultados': [fuente.serializar(objeto) for objeto in objetos],
+        'siguiente': paginacion.codificar(ultima) if ultima else None,
+    }
@@ -0,0 +1,262 @@
+import re
+from functools import lru_cache
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+MAX_TERMINOS = 8
+TAMANO_LOTE = 500
+
+
+class Entidad:
+    def __init__(self, nombre, modelo, campos, dependencias=None):
+        self.nombre = nombre
+        self.modelo = modelo
+        self.campos = campos
+        self.dependencias = dependencias or {}
+
+    @property
+    def tabla(self):
+        return f'busqueda_{self.nombre}'
+
+    @property
+    def columnas(self):
+        return [campo.replace('__', '_') for campo in self.campos]
+
+    def modelo_clase(self):
+        return django_apps.get_model(self.modelo)
+
+    def documentos(self, queryset):
+        for fila in queryset.order_by().values_list('pk', *self.campos).iterator(chunk_size=2000):
+            yield (fila[0], *(valor or '' for valor in fila[1:]))
+
+
+ENTIDADES = {entidad.nombre: entidad for entidad in (
+    Entidad('cliente', 'core.Cliente', ('nombre', 'email', 'telefono', 'nit_ci')),
+    Entidad('inventario', 'core.Inventario', ('nombre', 'descripcion', 'proveedor')),
+    Entidad('producto', 'core.Producto', ('nombre', 'tipo', 'descripcion')),
+    Entidad(
+        'pedido', 'core.Pedido', ('cliente__nombre', 'inventario__nombre', 'descripcion'),
+        dependencias={'core.Cliente': 'cliente_id', 'core.Inventario': 'inventario_id'},
+    ),
+    Entidad(
+        'trabajo', 'core.Trabajo', ('cliente__nombre', 'producto__nombre', 'descripcion'),
+        dependencias={'core.Cliente': 'cliente_id', 'core.Producto': 'producto_id'},
+    ),
+    Entidad(
+        'compra', 'core.Compra', ('proveedor__nombre', 'inventario__nombre', 'observaciones'),
+        dependencias={'core.Proveedor': 'proveedor_id', 'core.Inventario': 'inventario_id'},
+    ),
+)}
+
+
+def entidad_de(modelo):
+    for entidad in ENTIDADES.values():
+        if entidad.modelo == modelo._meta.label:
+            return entidad
+    return None
+
+
+def dependientes_de(modelo):
+    return [
+        (entidad, entidad.dependencias[modelo._meta.label])
+        for entidad in ENTIDADES.values()
+        if modelo._meta.label in entidad.dependencias
+    ]
+
+
+def campos_de_dependencia(modelo):
+    """Campos de ``modelo`` que aparecen en los índices de sus dependientes."""
+    campos = set()
+    for entidad, campo_id in dependientes_de(modelo):
+        relacion = campo_id.removesuffix('_id') + '__'
+        campos.update(campo[len(relacion):] for campo in entidad.campos if campo.startswith(relacion))
+    return campos
+
+
+def modelos_indexados():
+    etiquetas = set()
+    for entidad in ENTIDADES.values():
+        etiquetas.add(entidad.modelo)
+        etiquetas.update(entidad.dependencias)
+    return [django_apps.get_model(etiqueta) for etiqueta in sorted(etiquetas)]
+
+
+def terminos(texto):
+    return re.findall(r'\w+', (texto or '').lower())[:MAX_TERMINOS]
+
+
+def _en_lotes(valores, tamano=TAMANO_LOTE):
+    valores = list(valores)
+    for inicio in range(0, len(valores), tamano):
+        yield valores[inicio:inicio + tamano]
+
+
+class BackendLike:
+    def crear(self, entidad):
+        pass
+
+    def eliminar_tabla(self, entidad):
+        pass
+
+    def indexar(self, entidad, queryset):
+        pass
+
+    def eliminar(self, entidad, pks):
+        pass
+
+    def filtrar(self, queryset, entidad, terminos):
+        for termino in terminos:
+            condicion = Q()
+            for campo in entidad.campos:
+                condicion |= Q(**{f'{campo}__icontains': termino})
+            queryset = queryset.filter(condicion)
+        return queryset
+
+    def buscar(self, queryset, entidad, terminos, limite, despues=None):
+        """``[(pk, clave)]`` en orden; ``despues`` es la clave del último resultado ya entregado."""
+        qs = self.filtrar(queryset, entidad, terminos)
+        try:
+            qs = qs.filter(pk__lt=int(despues[0])) if despues else qs
+        except (TypeError, ValueError, IndexError):
+            pass
+        return [(pk, [pk]) for pk in qs.order_by('-pk').values_list('pk', flat=True)[:limite]]
+
+
+class BackendFTS5(BackendLike):
+    tokenizador = 'unicode61 remove_diacritics 2'
+    prefijos = '2 3'
+
+    def consulta(self, terminos):
+        return ' '.join(f'"{termino}"*' for termino in terminos)
+
+    def crear(self, entidad):
+        columnas = ', '.join(entidad.columnas)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {entidad.tabla} "
+                f"USING fts5({columnas}, tokenize='{self.tokenizador}', prefix='{self.prefijos}')"
+            )
+
+    def eliminar_tabla(self, entidad):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {entidad.tabla}')
+
+    def indexar(self, entidad, queryset):
+        marcadores = ', '.join(['%s'] * (len(entidad.columnas) + 1))
+        insertar = f"INSERT INTO {entidad.tabla} (rowid, {', '.join(entidad.columnas)}) VALUES ({marcadores})"
+        with connection.cursor() as cursor:
+            for lote in _en_lotes(entidad.documentos(queryset)):
+                cursor.executemany(insertar, lote)
+
+    def eliminar(self, entidad, pks):
+        with connection.cursor() as cursor:
+            for lote in _en_lotes(pks):
+                marcadores = ', '.join(['%s'] * len(lote))
+                cursor.execute(f'DELETE FROM {entidad.tabla} WHERE rowid IN ({marcadores})', lote)
+
+    def filtrar(self, queryset, entidad, terminos):
+        subconsulta = RawSQL(f'SELECT rowid FROM {entidad.tabla} WHERE {entidad.tabla} MATCH %s', [self.consulta(terminos)])
+        return queryset.filter(pk__in=subconsulta)
+
+    def buscar(self, queryset, entidad, terminos, limite, despues=None):
+        sql = f'SELECT rowid, rank FROM {entidad.tabla} WHERE {entidad.tabla} MATCH %s'
+        parametros = [self.consulta(terminos)]
+        if queryset.query.where:
+            subconsulta, subparametros = queryset.order_by().values('pk').query.sql_with_params()
+            sql += f' AND rowid IN ({subconsulta})'
+            parametros.extend(subparametros)
+        try:
+            rango, pk = float(despues[0]), int(despues[1])
+        except (TypeError, ValueError, IndexError):
+            pass
+        else:
+            # Clave (rank, rowid): la página siguiente no vuelve a recorrer las anteriores.
+            sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+            parametros.extend([rango, rango, pk])
+        with connection.cursor() as cursor:
+            cursor.execute(f'{sql} ORDER BY rank, rowid LIMIT %s', [*parametros, limite])
+            return [(pk, [rango, pk]) for pk, rango in cursor.fetchall()]
+
+
+@lru_cache(maxsize=None)
+def _backend(ruta, vendor):
+    if ruta:
+        return import_string(ruta)()
+    return BackendFTS5() if vendor == 'sqlite' else BackendLike()
+
+
+def backend():
+    return _backend(getattr(settings, 'BUSQUEDA_BACKEND', ''), connection.vendor)
+
+
+def indexar(modelo, pks):
+    entidad = entidad_de(modelo)
+    if entidad is None or not pks:
+        return
+    motor = backend()
+    for lote in _en_lotes(pks):
+        motor.eliminar(entidad, lote)
+        motor.indexar(entidad, modelo._default_manager.filter(pk__in=lote))
+
+
+def indexar_dependientes(modelo, pks):
+    for entidad, campo in dependientes_de(modelo):
+        dependiente = entidad.modelo_clase()
+        ids = dependiente._default_manager.filter(**{f'{campo}__in': pks}).values_list('pk', flat=True)
+        indexar(dependiente, list(ids))
+
+
+def eliminar(modelo, pks):
+    entidad = entidad_de(modelo)
+    if entidad is not None and pks:
+        backend().eliminar(entidad, list(pks))
+
+
+def indexar_cambios(modelo, pks=None, campos=None):
+    entidad = entidad_de(modelo)
+    if entidad is None:
+        return
+    if campos is not None and not {campo.split('__')[0] for campo in entidad.campos} & set(campos):
+        return
+    if pks is None:
+        reconstruir([entidad.nombre])
+    else:
+        indexar(modelo, pks)
+
+
+def reconstruir(nombres=None):
+    motor = backend()
+    totales = {}
+    for nombre in nombres or ENTIDADES:
+        entidad = ENTIDADES[nombre]
+        motor.eliminar_tabla(entidad)
+        motor.crear(entidad)
+        queryset = entidad.modelo_clase()._default_manager.all()
+        motor.indexar(entidad, queryset)
+        totales[nombre] = queryset.count()
+    return totales
+
+
+def filtrar(queryset, texto):
+    entidad = entidad_de(queryset.model)
+    palabras = terminos(texto)
+    if entidad is None or not palabras:
+        return queryset
+    return backend().filtrar(queryset, entidad, palabras)
+
+
+def buscar_con_claves(queryset, texto, limite=20, despues=None):
+    entidad = entidad_de(queryset.model)
+    palabras = terminos(texto)
+    if entidad is None or not palabras:
+        return []
+    return backend().buscar(queryset, entidad, palabras, limite, despues)
+
+
+def buscar(queryset, texto, limite=20):
+    return [pk for pk, _ in buscar_con_claves(queryset, texto, limite)]
@@ -0,0 +1,67 @@
+import hashlib
+import json
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.urls import reverse
+from django.utils import timezone
+
+from . import versiones
+
+CATALOGOS = {
+    'materiales': ('core.Inventario', ('id', 'precio_unitario', 'proveedor'), {}),
+    'productos': ('core.Producto', ('id', 'precio_unitario'), {'activo': True}),
+}
+
+
+def _ttl():
+    return getattr(settings, 'CATALOGO_CACHE_TTL', 3600)
+
+
+def catalogo(tipo):
+    etiqueta, campos, filtros = CATALOGOS[tipo]
+    modelo = apps.get_model(etiqueta)
+    clave = versiones.clave_compuesta(f'catalogo:{tipo}', modelo)
+    datos = cache.get(clave)
+    if datos is None:
+        items = list(modelo.objects.filter(**filtros).order_by('id').values(*campos))
+        cuerpo = json.dumps(items, cls=DjangoJSONEncoder, separators=(',', ':'))
+        datos = {
+            'version': hashlib.sha1(cuerpo.encode()).hexdigest()[:16],
+            'modificado': versiones.ultima_modificacion(modelo) or timezone.now(),
+            'items': items,
+        }
+        cache.set(clave, datos, _ttl())
+    return datos
+
+
+def version(tipo):
+    return catalogo(tipo)['version']
+
+
+def ultima_modificacion(tipo):
+    return catalogo(tipo)['modificado']
+
+
+def url(tipo):
+    return f"{reverse('core:api_catalogo', args=[tipo])}?v={version(tipo)}"
+
+
+def proveedores_activos():
+    from .models import Proveedor
+
+    clave = versiones.clave_compuesta('catalogo:proveedores', Proveedor)
+    nombres = cache.get(clave)
+    if nombres is None:
+        nombres = list(Proveedor.objects.filter(activo=True).order_by('nombre').values_list('nombre', flat=True))
+        cache.set(clave, nombres, _ttl())
+    return nombres
+
+
+def contexto_compra():
+    return {
+        'catalogo_url': url('materiales'),
+        'proveedores_nombres': proveedores_activos(),
+    }
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+ESTADO_CONTABLE = 'entregado'
+CAMPOS_CONTADOR = ('cantidad_pedidos', 'es_frecuente')
+
+
+def umbral_frecuente():
+    return getattr(settings, 'CLIENTE_FRECUENTE_UMBRAL', 5)
+
+
+def delta_transicion(estado_anterior, estado_nuevo):
+    return int(estado_nuevo == ESTADO_CONTABLE) - int(estado_anterior == ESTADO_CONTABLE)
+
+
+def aplicar_delta(cliente_id, delta):
+    from .models import Cliente
+    from .signals import cambios_masivos
+
+    if not cliente_id or not delta:
+        return 0
+    umbral = umbral_frecuente()
+    actualizados = Cliente.objects.filter(pk=cliente_id).update(
+        cantidad_pedidos=F('cantidad_pedidos') + delta,
+        es_frecuente=Case(
+            When(cantidad_pedidos__gte=umbral - delta, then=Value(True)),
+            default=Value(False),
+        ),
+    )
+    if actualizados:
+        cambios_masivos.send(sender=Cliente, pks=[cliente_id], campos=CAMPOS_CONTADOR)
+    return actualizados
+
+
+def registrar_transicion(cliente_anterior, estado_anterior, cliente_nuevo, estado_nuevo):
+    if cliente_anterior == cliente_nuevo:
+        aplicar_delta(cliente_nuevo, delta_transicion(estado_anterior, estado_nuevo))
+        return
+    aplicar_delta(cliente_anterior, -delta_transicion(None, estado_anterior))
+    aplicar_delta(cliente_nuevo, delta_transicion(None, estado_nuevo))
+
+
+def _conteo_entregados(modelo):
+    return Coalesce(
+        Subquery(
+            modelo.objects.filter(cliente=OuterRef('pk'), estado=ESTADO_CONTABLE)
+            .order_by()
+            .values('cliente')
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def recalcular_contadores(cliente_ids=None):
+    from .models import Cliente, Pedido, Trabajo
+    from .signals import cambios_masivos
+
+    clientes = Cliente.objects.all()
+    if cliente_ids is not None:
+        cliente_ids = [pk for pk in set(cliente_ids) if pk]
+        if not cliente_ids:
+            return 0
+        clientes = clientes.filter(pk__in=cliente_ids)
+    actualizados = clientes.update(
+        cantidad_pedidos=_conteo_entregados(Pedido) + _conteo_entregados(Trabajo),
+    )
+    umbral = umbral_frecuente()
+    clientes.filter(es_frecuente=False, cantidad_pedidos__gte=umbral).update(es_frecuente=True)
+    clientes.filter(es_frecuente=True, cantidad_pedidos__lt=umbral).update(es_frecuente=False)
+    cambios_masivos.send(sender=Cliente, pks=cliente_ids, campos=CAMPOS_CONTADOR)
+    return actualizados
+
+
+def clientes_desfasados():
+    from .models import Cliente, Pedido, Trabajo
+
+    return (
+        Cliente.objects.annotate(esperado=_conteo_entregados(Pedido) + _conteo_entregados(Trabajo))
+        .exclude(cantidad_pedidos=F('esperado'))
+        .order_by('pk')
+    )
@@ -12,3 +12,9 @@ def user_profile(request):
         context['es_empleado'] = perfil.es_empleado()
     
     return context
+
+
+def eventos(request):
+    from . import eventos as modulo
+
+    return {'eventos_activos': modulo.activos()}
@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from . import resumenes, versiones
+from .models import Cliente, Compra, Inventario, Pedido, Produccion, Producto, Trabajo
+
+MODELOS_DASHBOARD = (Pedido, Trabajo, Compra, Inventario, Produccion, Cliente, Producto)
+CLAVE_ACIERTOS = 'estadisticas:aciertos'
+CLAVE_FALLOS = 'estadisticas:fallos'
+
+
+def _contar(queryset, **filtros):
+    return queryset.aggregate(**{nombre: Count('pk', filter=filtro) for nombre, filtro in filtros.items()})
+
+
+def _estadisticas_ordenes(modelo):
+    return _contar(
+        modelo.objects.all(),
+        total=None,
+        pendientes=Q(estado='pendiente'),
+        en_produccion=Q(estado='en_produccion'),
+        terminados=Q(estado='terminado'),
+    )
+
+
+def calcular_estadisticas(hoy=None):
+    hoy = hoy or timezone.now().date()
+    del_dia = resumenes.totales_del_dia(hoy)
+    return {
+        'pedidos': {**_estadisticas_ordenes(Pedido), 'hoy': del_dia.get('pedido', 0)},
+        'trabajos': {**_estadisticas_ordenes(Trabajo), 'hoy': del_dia.get('trabajo', 0)},
+        'compras': _contar(
+            Compra.objects.all(),
+            total=None,
+            pendientes=Q(estado='pendiente'),
+            ordenadas=Q(estado='ordenado'),
+            recibidas=Q(estado='recibido'),
+        ),
+        'inventario': _contar(
+            Inventario.objects.all(),
+            total_materiales=None,
+            bajo_stock=Q(cantidad__lte=F('cantidad_minima')),
+        ),
+        'clientes': _contar(Cliente.objects.all(), total=None, frecuentes=Q(es_frecuente=True)),
+        'productos': _contar(Producto.objects.all(), activos=Q(activo=True)),
+        'produccion': _contar(Produccion.objects.all(), en_proceso=Q(estado='en_proceso')),
+    }
+
+
+def _contar_acceso(clave):
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.add(clave, 1, None)
+
+
+def estadisticas_dashboard():
+    hoy = timezone.now().date()
+    clave = versiones.clave_compuesta(f'estadisticas:dashboard:{hoy.isoformat()}', *MODELOS_DASHBOARD)
+    stats = cache.get(clave)
+    if stats is None:
+        _contar_acceso(CLAVE_FALLOS)
+        stats = calcular_estadisticas(hoy)
+        cache.set(clave, stats, getattr(settings, 'ESTADISTICAS_CACHE_TTL', 60))
+    else:
+        _contar_acceso(CLAVE_ACIERTOS)
+    return stats
+
+
+def metricas_cache():
+    valores = cache.get_many([CLAVE_ACIERTOS, CLAVE_FALLOS])
+    return {'aciertos': valores.get(CLAVE_ACIERTOS, 0), 'fallos': valores.get(CLAVE_FALLOS, 0)}
@@ -0,0 +1,127 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+
+from . import versiones
+
+MAXIMO_HORAS = Decimal('999.99')
+GENERAL = None
+
+
+def _minimo_muestras():
+    return getattr(settings, 'ESTIMACION_MIN_MUESTRAS', 5)
+
+
+def historial():
+    """Producciones terminadas como arreglos (material, cantidad, horas reales)."""
+    import numpy as np
+
+    from .models import Produccion
+
+    filas = Produccion.objects.filter(estado='terminado', tiempo_real__gt=0).order_by().values_list(
+        'pedido__inventario_id', 'pedido__cantidad', 'tiempo_real',
+    )
+    datos = np.array([(material or 0, cantidad, horas) for material, cantidad, horas in filas.iterator(chunk_size=5000)], dtype=float)
+    if not len(datos):
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+    return datos[:, 0].astype(np.int64), datos[:, 1], datos[:, 2]
+
+
+def ajustar(grupos, cantidades, horas):
+    """Regresión lineal ``horas = intercepto + por_unidad * cantidad`` por grupo.
+
+    Resuelve todas las rectas a la vez con sumas por grupo (``bincount``) y
+    devuelve ``{grupo: (intercepto, por_unidad, muestras, error)}``. Si un grupo
+    no tiene variación de cantidad, o la pendiente sale negativa, se usa la
+    media como intercepto y pendiente cero.
+    """
+    import numpy as np
+
+    if not len(grupos):
+        return {}
+    claves, indices = np.unique(grupos, return_inverse=True)
+    n = np.bincount(indices, minlength=len(claves)).astype(float)
+    sx = np.bincount(indices, cantidades, len(claves))
+    sy = np.bincount(indices, horas, len(claves))
+    sxx = np.bincount(indices, cantidades * cantidades, len(claves))
+    sxy = np.bincount(indices, cantidades * horas, len(claves))
+
+    denominador = n * sxx - sx * sx
+    valida = denominador > 1e-9 * np.maximum(n * sxx, 1)
+    pendiente = np.where(valida, (n * sxy - sx * sy) / np.where(valida, denominador, 1), 0.0)
+    pendiente = np.maximum(pendiente, 0.0)
+    intercepto = (sy - pendiente * sx) / n
+    # Si la recta cortara por debajo de cero, se ajusta una proporcional.
+    proporcional = intercepto < 0
+    pendiente = np.where(proporcional, sxy / np.where(sxx > 0, sxx, 1), pendiente)
+    intercepto = np.where(proporcional, 0.0, intercepto)
+
+    residuos = horas - (intercepto[indices] + pendiente[indices] * cantidades)
+    error = np.sqrt(np.bincount(indices, residuos * residuos, len(claves)) / n)
+    return {
+        int(clave): (float(a), float(b), int(m), float(e))
+        for clave, a, b, m, e in zip(claves, intercepto, pendiente, n, error)
+    }
+
+
+def reajustar():
+    """Recalcula los coeficientes por material y el general; pensado para correr cada noche."""
+    import numpy as np
+
+    from .models import CoeficienteTiempo
+
+    grupos, cantidades, horas = historial()
+    por_material = ajustar(grupos, cantidades, horas)
+    general = ajustar(np.zeros(len(horas), dtype=np.int64), cantidades, horas).get(0)
+
+    filas = [
+        CoeficienteTiempo(inventario_id=material, intercepto=_decimal(a, 4), por_unidad=_decimal(b, 8), muestras=m, error=_decimal(e, 4))
+        for material, (a, b, m, e) in por_material.items()
+        if material and m >= _minimo_muestras()
+    ]
+    if general is not None:
+        a, b, m, e = general
+        filas.append(CoeficienteTiempo(inventario_id=GENERAL, intercepto=_decimal(a, 4), por_unidad=_decimal(b, 8), muestras=m, error=_decimal(e, 4)))
+    with transaction.atomic():
+        CoeficienteTiempo.objects.all().delete()
+        CoeficienteTiempo.objects.bulk_create(filas)
+    versiones.incrementar(CoeficienteTiempo)
+    return filas
+
+
+def _decimal(valor, decimales):
+    return Decimal(repr(round(valor, decimales)))
+
+
+_tabla = {'version': None, 'coeficientes': {}}
+
+
+def coeficiente(inventario_id):
+    """(intercepto, por_unidad) del material o, si no tiene, el general; None sin historial.
+
+    La tabla de coeficientes se guarda en memoria del proceso junto a la versión
+    de ``CoeficienteTiempo``, que vive en la base: se relee cuando ``reajustar``
+    la sube, aunque haya corrido en otro proceso (``fit_tiempos``).
+    """
+    from .models import CoeficienteTiempo
+
+    version = versiones.version(CoeficienteTiempo)
+    if _tabla['version'] != version:
+        _tabla['coeficientes'] = {
+            pk: (intercepto, por_unidad)
+            for pk, intercepto, por_unidad in CoeficienteTiempo.objects.values_list('inventario_id', 'intercepto', 'por_unidad')
+        }
+        _tabla['version'] = version
+    coeficientes = _tabla['coeficientes']
+    return coeficientes.get(inventario_id) or coeficientes.get(GENERAL)
+
+
+def estimar(inventario_id, cantidad):
+    """Horas estimadas para un pedido; 0 si todavía no hay historial."""
+    valores = coeficiente(inventario_id)
+    if valores is None:
+        return Decimal('0')
+    intercepto, por_unidad = valores
+    horas = intercepto + por_unidad * (cantidad or 0)
+    return min(max(horas, Decimal('0')), MAXIMO_HORAS).quantize(Decimal('0.01'))
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+MODELOS = ('produccion', 'pedido', 'trabajo', 'inventario')
+LOTE = 500
+PURGA_CADA = 300
+
+_proxima_purga = 0.0
+
+
+def _intervalo():
+    return getattr(settings, 'EVENTOS_INTERVALO', 1.0)
+
+
+def _latido():
+    return getattr(settings, 'EVENTOS_LATIDO', 15.0)
+
+
+def activos():
+    """Sólo se publica si el sitio se sirve con ASGI: bajo WSGI nadie leería los eventos."""
+    return getattr(settings, 'EVENTOS_ACTIVOS', False)
+
+
+def datos_de(instancia):
+    """Estado que se envía a las pantallas para cada modelo publicado."""
+    nombre = instancia._meta.model_name
+    if nombre == 'produccion':
+        return {'estado': instancia.estado, 'empleado_id': instancia.empleado_id, 'pedido_id': instancia.pedido_id}
+    if nombre == 'inventario':
+        return {'cantidad': instancia.cantidad, 'bajo_minimo': instancia.cantidad <= instancia.cantidad_minima}
+    return {'estado': instancia.estado, 'cliente_id': instancia.cliente_id}
+
+
+def publicar(modelo, ids, accion, datos=None):
+    """Registra el cambio al confirmar la transacción; cada proceso lo difunde a sus pantallas."""
+    nombre = modelo._meta.model_name
+    if nombre not in MODELOS or not ids or not activos():
+        return
+    ids, datos = list(ids), dict(datos or {})
+    if len(ids) > LOTE:
+        # Importaciones grandes: basta con avisar que hubo cambios.
+        ids, datos['total'] = [], len(ids)
+    transaction.on_commit(lambda: registrar(nombre, ids, accion, datos))
+
+
+def registrar(nombre, ids, accion, datos):
+    global _proxima_purga
+    from .models import Evento
+
+    evento = Evento.objects.create(modelo=nombre, accion=accion, ids=ids, datos=datos)
+    difusor.despertar()
+    # La tabla se limpia desde quien escribe, haya o no pantallas abiertas.
+    if time.monotonic() > _proxima_purga:
+        _proxima_purga = time.monotonic() + PURGA_CADA
+        purgar()
+    return evento
+
+
+def leer(desde, limite=LOTE):
+    from .models import Evento
+
+    filas = Evento.objects.filter(pk__gt=desde).order_by('pk').values('pk', 'modelo', 'accion', 'ids', 'datos', 'fecha')
+    return [{'id': f.pop('pk'), **f} for f in filas[:limite]]
+
+
+def ultimo_id():
+    from .models import Evento
+
+    return Evento.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+
+def purgar():
+    from .models import Evento
+
+    limite = timezone.now() - timedelta(minutes=getattr(settings, 'EVENTOS_RETENCION_MINUTOS', 60))
+    return Evento.objects.filter(fecha__lt=limite).delete()[0]
+
+
+def formatear(evento):
+    datos = json.dumps(evento, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f"id: {evento['id']}\nevent: {evento['modelo']}\ndata: {datos}\n\n"
+
+
+class Difusor:
+    """Una única lectura de ``Evento`` por proceso, repartida a todas las pantallas abiertas.
+
+    La tarea de lectura revisa la tabla cada ``EVENTOS_INTERVALO`` segundos (o
+    antes, si un cambio se publicó en este mismo proceso) y pone cada evento en
+    la cola de cada suscriptor; con N pantallas se sigue haciendo una consulta.
+    """
+
+    def __init__(self):
+        self._suscriptores = set()
+        self._loop = None
+        self._aviso = None
+        self._tarea = None
+        self._ultimo = None
+
+    def despertar(self):
+        loop, aviso = self._loop, self._aviso
+        if loop is not None and aviso is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(aviso.set)
+
+    async def _iniciar(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._aviso, self._tarea = loop, asyncio.Event(), None
+        if self._tarea is None or self._tarea.done():
+            # Sin lector nadie siguió la tabla: se parte del último evento, no
+            # de donde quedó la lectura anterior, para no reenviar lo acumulado.
+            ultimo = await sync_to_async(ultimo_id)()
+            if self._tarea is None or self._tarea.done():
+                self._ultimo = ultimo
+                self._tarea = loop.create_task(self._leer())
+
+    async def _leer(self):
+        while self._suscriptores:
+            eventos = await sync_to_async(leer)(self._ultimo)
+            for evento in eventos:
+                self._ultimo = evento['id']
+                for cola in list(self._suscriptores):
+                    if cola.full():
+                        cola.get_nowait()
+                    cola.put_nowait(evento)
+            if len(eventos) == LOTE:
+                continue
+            try:
+                await asyncio.wait_for(self._aviso.wait(), _intervalo())
+            except asyncio.TimeoutError:
+                pass
+            self._aviso.clear()
+
+    async def flujo(self, desde=None):
+        """Texto SSE para un cliente; con ``desde`` reenvía antes lo que se perdió."""
+        cola = asyncio.Queue(maxsize=getattr(settings, 'EVENTOS_COLA', 1000))
+        self._suscriptores.add(cola)
+        try:
+            await self._iniciar()
+            enviado = 0
+            yield f"retry: {int(getattr(settings, 'EVENTOS_REINTENTO_MS', 3000))}\n\n"
+            if desde is not None:
+                for evento in await sync_to_async(leer)(desde):
+                    enviado = evento['id']
+                    yield formatear(evento)
+            while True:
+                try:
+                    evento = await asyncio.wait_for(cola.get(), _latido())
+                except asyncio.TimeoutError:
+                    yield ': latido\n\n'
+                    continue
+                if evento['id'] > enviado:
+                    enviado = evento['id']
+                    yield formatear(evento)
+        finally:
+            self._suscriptores.discard(cola)
+            if not self._suscriptores:
+                self.despertar()
+
+
+difusor = Difusor()
@@ -0,0 +1,100 @@
+import csv
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+COLUMNAS = {
+    'clientes': [
+        ('id', 'id'), ('nombre', 'nombre'), ('nit_ci', 'nit_ci'), ('telefono', 'telefono'),
+        ('email', 'email'), ('direccion', 'direccion'), ('es_frecuente', 'es_frecuente'),
+        ('cantidad_pedidos', 'cantidad_pedidos'), ('fecha_registro', 'fecha_registro'),
+    ],
+    'pedidos': [
+        ('id', 'id'), ('cliente', 'cliente__nombre'), ('material', 'inventario__nombre'),
+        ('cantidad', 'cantidad'), ('descripcion', 'descripcion'), ('precio_unitario', 'precio_unitario'),
+        ('descuento', 'descuento'), ('precio_total', 'precio_total'), ('estado', 'estado'),
+        ('fecha_creacion', 'fecha_creacion'), ('fecha_entrega', 'fecha_entrega'), ('fecha_entregado', 'fecha_entregado'),
+    ],
+    'trabajos': [
+        ('id', 'id'), ('cliente', 'cliente__nombre'), ('producto', 'producto__nombre'),
+        ('cantidad', 'cantidad'), ('descripcion', 'descripcion'), ('precio_unitario', 'precio_unitario'),
+        ('descuento', 'descuento'), ('precio_total', 'precio_total'), ('estado', 'estado'),
+        ('fecha_creacion', 'fecha_creacion'), ('fecha_entrega', 'fecha_entrega'), ('fecha_entregado', 'fecha_entregado'),
+    ],
+    'compras': [
+        ('id', 'id'), ('proveedor', 'proveedor__nombre'), ('material', 'inventario__nombre'),
+        ('cantidad', 'cantidad'), ('precio_unitario', 'precio_unitario'), ('costo_total', 'costo_total'),
+        ('estado', 'estado'), ('fecha_creacion', 'fecha_creacion'), ('fecha_estimada', 'fecha_estimada'),
+        ('fecha_recepcion', 'fecha_recepcion'),
+    ],
+    'inventario': [
+        ('id', 'id'), ('nombre', 'nombre'), ('cantidad', 'cantidad'), ('cantidad_minima', 'cantidad_minima'),
+        ('unidad', 'unidad'), ('proveedor', 'proveedor'), ('precio_unitario', 'precio_unitario'),
+        ('ultima_actualizacion', 'ultima_actualizacion'),
+    ],
+    'proveedores': [
+        ('id', 'id'), ('nombre', 'nombre'), ('contacto', 'contacto'), ('telefono', 'telefono'),
+        ('email', 'email'), ('direccion', 'direccion'), ('activo', 'activo'), ('fecha_creacion', 'fecha_creacion'),
+    ],
+}
+
+
+# Una hoja de cálculo interpreta como fórmula la celda que empieza así.
+INICIOS_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+class _Eco:
+    def write(self, valor):
+        return valor
+
+
+def _tamano_lote():
+    return getattr(settings, 'EXPORTACION_LOTE', 2000)
+
+
+def filas(queryset, nombre, orden):
+    rutas = [ruta for _, ruta in COLUMNAS[nombre]]
+    return queryset.order_by(*orden).values_list(*rutas).iterator(chunk_size=_tamano_lote())
+
+
+def celda_csv(valor):
+    if isinstance(valor, str) and valor.startswith(INICIOS_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def lineas_csv(queryset, nombre, orden):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow([clave for clave, _ in COLUMNAS[nombre]])
+    for fila in filas(queryset, nombre, orden):
+        yield escritor.writerow([celda_csv(valor) for valor in fila])
+
+
+def lineas_ndjson(queryset, nombre, orden):
+    claves = [clave for clave, _ in COLUMNAS[nombre]]
+    codificador = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for fila in filas(queryset, nombre, orden):
+        yield codificador.encode(dict(zip(claves, fila))) + '\n'
+
+
+def exportar(request, queryset, nombre, orden):
+    """Respuesta en streaming para ``?export=csv|ndjson``, o None para la vista HTML.
+
+    Las filas se leen en lotes de ``EXPORTACION_LOTE``; en CSV, los textos que
+    empiezan como una fórmula se escriben con un apóstrofo delante.
+    """
+    formato = request.GET.get('export')
+    if formato not in FORMATOS:
+        return None
+    generador = lineas_csv if formato == 'csv' else lineas_ndjson
+    respuesta = StreamingHttpResponse(generador(queryset.select_related(None), nombre, orden), content_type=FORMATOS[formato])
+    archivo = f"{nombre}_{timezone.localdate():%Y%m%d}.{formato}"
+    respuesta['Content-Disposition'] = f'attachment; filename="{archivo}"'
+    return respuesta
@@ -1,9 +1,54 @@
 from django import forms
 from django.contrib.auth.forms import AuthenticationForm
+from django.core.exceptions import ValidationError
 from django.db.models import Q
+from django.urls import reverse
 from .models import Cliente, Producto, Pedido, Inventario, Proveedor, Compra, Trabajo
 
 
+class AutocompletarSelect(forms.Select):
+    def __init__(self, fuente, attrs=None):
+        super().__init__(attrs)
+        self.fuente = fuente
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocompletar'] = reverse('core:api_autocompletar', args=[self.fuente])
+        return context
+
+    def _opciones_seleccionadas(self, choices, valores):
+        if getattr(choices, 'field', None) and choices.field.empty_label is not None:
+            yield '', choices.field.empty_label
+        valores = [v for v in valores if v not in ('', None)]
+        if not valores:
+            return
+        try:
+            objetos = list(choices.queryset.filter(pk__in=valores))
+        except (ValueError, ValidationError):
+            return
+        for objeto in objetos:
+            yield choices.choice(objeto)
+
+    def optgroups(self, name, value, attrs=None):
+        todas = self.choices
+        if hasattr(todas, 'queryset'):
+            self.choices = list(self._opciones_seleccionadas(todas, value))
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = todas
+
+    def create_option(self, name, value, label, selected, index, subindex=None, attrs=None):
+        from .autocompletar import FUENTES
+
+        opcion = super().create_option(name, value, label, selected, index, subindex, attrs)
+        instancia = getattr(value, 'instance', None)
+        if instancia is not None:
+            for clave, dato in FUENTES[self.fuente].datos_de(instancia).items():
+                opcion['attrs'][f'data-{clave}'] = '' if dato is None else dato
+        return opcion
+
+
 class LoginForm(AuthenticationForm):
     username = forms.CharField(
         widget=forms.TextInput(attrs={
@@ -38,8 +83,8 @@ class PedidoForm(forms.ModelForm):
         fields = ['cliente', 'inventario', 'cantidad', 'descripcion',
                   'precio_unitario', 'descuento', 'fecha_entrega', 'estado']
         widgets = {
-            'cliente': forms.Select(attrs={'class': 'form-select'}),
-            'inventario': forms.Select(attrs={'class': 'form-select'}),
+            'cliente': AutocompletarSelect('clientes', attrs={'class': 'form-select'}),
+            'inventario': AutocompletarSelect('materiales_disponibles', attrs={'class': 'form-select'}),
             'cantidad': forms.NumberInput(attrs={'class': 'form-control', 'min': '1'}),
             'descripcion': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'precio_unitario': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
@@ -55,7 +100,6 @@ class PedidoForm(forms.ModelForm):
         else:
             qs = Inventario.objects.filter(cantidad__gt=0).order_by('nombre')
         self.fields['inventario'].queryset = qs
-        self.fields['inventario'].widget.attrs.update({'size': '12'})
         if self.instance and self.instance.pk and hasattr(self.instance, 'cliente'):
             try:
                 self.initial['descuento'] = self.instance.cliente.obtener_descuento()
@@ -71,8 +115,8 @@ class TrabajoForm(forms.ModelForm):
         model = Trabajo
         fields = ['cliente', 'producto', 'cantidad', 'descripcion', 'precio_unitario', 'descuento', 'fecha_entrega', 'estado']
         widgets = {
-            'cliente': forms.Select(attrs={'class': 'form-select'}),
-            'producto': forms.Select(attrs={'class': 'form-select'}),
+            'cliente': AutocompletarSelect('clientes', attrs={'class': 'form-select'}),
+            'producto': AutocompletarSelect('productos', attrs={'class': 'form-select'}),
             'cantidad': forms.NumberInput(attrs={'class': 'form-control', 'min': '1'}),
             'descripcion': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'precio_unitario': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
@@ -84,7 +128,6 @@ class TrabajoForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['producto'].queryset = Producto.objects.filter(activo=True).order_by('nombre')
-        self.fields['producto'].widget.attrs.update({'size': '12'})
         if self.instance and self.instance.pk and hasattr(self.instance, 'cliente'):
             try:
                 self.initial['descuento'] = self.instance.cliente.obtener_descuento()
@@ -112,7 +155,7 @@ class CompraForm(forms.ModelForm):
         fields = ['proveedor', 'inventario', 'cantidad', 'precio_unitario', 'estado', 'fecha_recepcion', 'observaciones']
         widgets = {
             'proveedor': forms.Select(attrs={'class': 'form-select'}),
-            'inventario': forms.Select(attrs={'class': 'form-select'}),
+            'inventario': AutocompletarSelect('materiales', attrs={'class': 'form-select'}),
             'cantidad': forms.NumberInput(attrs={'class': 'form-control', 'min': '1'}),
             'precio_unitario': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': '0.01'}),
             'estado': forms.Select(attrs={'class': 'form-select'}),
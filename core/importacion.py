@@ -0,0 +1,269 @@
+import csv
+import json
+import re
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from . import contadores, estimacion
+from .models import Cliente, Inventario, Pedido, Produccion, Producto, Trabajo
+from .signals import cambios_masivos
+
+
+def leer_filas(ruta, formato=None):
+    ruta = Path(ruta)
+    formato = (formato or ruta.suffix.lstrip('.')).lower()
+    if formato == 'csv':
+        with ruta.open(newline='', encoding='utf-8-sig') as archivo:
+            for numero, fila in enumerate(csv.DictReader(archivo), start=2):
+                yield numero, fila
+    elif formato in ('jsonl', 'ndjson'):
+        with ruta.open(encoding='utf-8') as archivo:
+            for numero, linea in enumerate(archivo, start=1):
+                if linea.strip():
+                    yield numero, json.loads(linea)
+    elif formato == 'json':
+        with ruta.open(encoding='utf-8') as archivo:
+            for numero, fila in enumerate(leer_arreglo_json(archivo), start=1):
+                yield numero, fila
+    else:
+        raise ValueError(f'Formato no soportado: {formato}')
+
+
+ESPACIOS = re.compile(r'\s*')
+
+
+def leer_arreglo_json(archivo, tamano=1 << 16):
+    """Elementos de un arreglo JSON de nivel superior, decodificados de a uno.
+
+    Lee el archivo en bloques de ``tamano`` caracteres; en memoria sólo quedan
+    el bloque actual y la fila que se está decodificando.
+    """
+    decodificador = json.JSONDecoder()
+    texto, pos, esperado = '', 0, '['
+    while True:
+        pos = ESPACIOS.match(texto, pos).end()
+        completa = False
+        if pos < len(texto):
+            caracter = texto[pos]
+            if esperado == '[':
+                if caracter != '[':
+                    raise ValueError('El JSON debe ser un arreglo de filas')
+                pos, esperado = pos + 1, 'fila o ]'
+                continue
+            if caracter == ']' and esperado in ('fila o ]', ', o ]'):
+                return
+            if esperado == ', o ]':
+                if caracter != ',':
+                    raise ValueError(f'JSON inválido: se esperaba «,» y se encontró «{caracter}»')
+                pos, esperado = pos + 1, 'fila'
+                continue
+            try:
+                fila, pos = decodificador.raw_decode(texto, pos)
+                completa = True
+            except json.JSONDecodeError:
+                pass
+        if completa:
+            esperado = ', o ]'
+            yield fila
+            continue
+        # La fila quedó cortada al final del bloque (o se agotó): se lee otro.
+        bloque = archivo.read(tamano)
+        if not bloque:
+            raise ValueError('JSON inválido o incompleto')
+        texto, pos = texto[pos:] + bloque, 0
+
+
+def en_lotes(iterable, tamano):
+    iterador = iter(iterable)
+    while True:
+        lote = list(islice(iterador, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+def _texto(valor):
+    return '' if valor is None else str(valor).strip()
+
+
+def _entero(valor):
+    texto = _texto(valor)
+    return int(texto) if texto else None
+
+
+def _decimal(valor):
+    texto = _texto(valor).replace(',', '.')
+    return Decimal(texto) if texto else None
+
+
+class Importador:
+    modelo = None
+    modelo_catalogo = None
+    campo_catalogo = None
+
+    def __init__(self, usuario=None, tamano_lote=2000, dry_run=False):
+        self.usuario = usuario
+        self.tamano_lote = tamano_lote
+        self.dry_run = dry_run
+        self.estados = {clave for clave, _ in self.modelo.ESTADOS}
+        self.creados = 0
+        self.errores = []
+        self.clientes_entregados = set()
+
+    def importar(self, filas):
+        for lote in en_lotes(filas, self.tamano_lote):
+            objetos = self._validar_lote(lote)
+            if objetos and not self.dry_run:
+                with transaction.atomic():
+                    self._crear(objetos)
+            self.creados += len(objetos)
+
+        if not self.dry_run:
+            contadores.recalcular_contadores(self.clientes_entregados)
+        return self.creados, self.errores
+
+    def _crear(self, objetos):
+        creados = self.modelo.objects.bulk_create(objetos, batch_size=500)
+        cambios_masivos.send(sender=self.modelo, pks=[o.pk for o in creados])
+
+    def _validar_lote(self, lote):
+        campo_id = f'{self.campo_catalogo}_id'
+        ids_clientes = set()
+        ids_catalogo = set()
+        for _, fila in lote:
+            for conjunto, clave in ((ids_clientes, 'cliente_id'), (ids_catalogo, campo_id)):
+                try:
+                    valor = _entero(fila.get(clave))
+                except ValueError:
+                    continue
+                if valor:
+                    conjunto.add(valor)
+
+        clientes = set(Cliente.objects.filter(pk__in=ids_clientes).values_list('pk', flat=True))
+        precios = dict(self.modelo_catalogo.objects.filter(pk__in=ids_catalogo).values_list('pk', 'precio_unitario'))
+
+        objetos = []
+        for numero, fila in lote:
+            try:
+                objetos.append(self._construir(fila, clientes, precios, campo_id))
+            except (ValueError, InvalidOperation) as exc:
+                self.errores.append((numero, str(exc) or 'Valor inválido'))
+        return objetos
+
+    def _construir(self, fila, clientes, precios, campo_id):
+        cliente_id = _entero(fila.get('cliente_id'))
+        if cliente_id not in clientes:
+            raise ValueError(f'Cliente inexistente: {fila.get("cliente_id")}')
+
+        catalogo_id = _entero(fila.get(campo_id))
+        if catalogo_id is not None and catalogo_id not in precios:
+            raise ValueError(f'{self.campo_catalogo.capitalize()} inexistente: {catalogo_id}')
+
+        cantidad = _entero(fila.get('cantidad'))
+        if not cantidad or cantidad < 1:
+            raise ValueError('La cantidad debe ser al menos 1')
+
+        descripcion = _texto(fila.get('descripcion'))
+        if not descripcion:
+            raise ValueError('La descripción es obligatoria')
+
+        precio_unitario = _decimal(fila.get('precio_unitario'))
+        if precio_unitario is None:
+            precio_unitario = precios.get(catalogo_id)
+        if precio_unitario is None:
+            raise ValueError('Falta el precio unitario')
+
+        descuento = _decimal(fila.get('descuento')) or Decimal('0')
+        if not Decimal('0') <= descuento <= Decimal('100'):
+            raise ValueError('El descuento debe estar entre 0 y 100')
+
+        fecha_entrega = parse_date(_texto(fila.get('fecha_entrega')))
+        if not fecha_entrega:
+            raise ValueError('Fecha de entrega inválida')
+        fecha_entregado = None
+        if _texto(fila.get('fecha_entregado')):
+            fecha_entregado = parse_date(_texto(fila.get('fecha_entregado')))
+            if not fecha_entregado:
+                raise ValueError('Fecha de entregado inválida')
+
+        estado = _texto(fila.get('estado')) or 'pendiente'
+        if estado not in self.estados:
+            raise ValueError(f'Estado inválido: {estado}')
+        if estado == contadores.ESTADO_CONTABLE:
+            self.clientes_entregados.add(cliente_id)
+
+        subtotal = precio_unitario * cantidad
+        return self.modelo(
+            cliente_id=cliente_id,
+            cantidad=cantidad,
+            descripcion=descripcion,
+            precio_unitario=precio_unitario,
+            descuento=descuento,
+            precio_total=subtotal - subtotal * (descuento / 100),
+            estado=estado,
+            fecha_entrega=fecha_entrega,
+            fecha_entregado=fecha_entregado,
+            usuario_registro=self.usuario,
+            **{campo_id: catalogo_id},
+        )
+
+
+class ImportadorPedidos(Importador):
+    modelo = Pedido
+    modelo_catalogo = Inventario
+    campo_catalogo = 'inventario'
+
+    def _crear(self, objetos):
+        pedidos = Pedido.objects.bulk_create(objetos, batch_size=500)
+        producciones = Produccion.objects.bulk_create(
+            [Produccion(pedido=pedido, tiempo_estimado=estimacion.estimar(pedido.inventario_id, pedido.cantidad)) for pedido in pedidos],
+            batch_size=500,
+        )
+        cambios_masivos.send(sender=Pedido, pks=[p.pk for p in pedidos])
+        cambios_masivos.send(sender=Produccion, pks=[p.pk for p in producciones])
+
+
+class ImportadorTrabajos(Importador):
+    modelo = Trabajo
+    modelo_catalogo = Producto
+    campo_catalogo = 'producto'
+
+
+class ComandoImportacion(BaseCommand):
+    importador = None
+    max_errores_listados = 50
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Archivo CSV, JSON o JSONL/NDJSON')
+        parser.add_argument('--formato', choices=['csv', 'json', 'jsonl', 'ndjson'])
+        parser.add_argument('--lote', type=int, default=2000, help='Filas validadas e insertadas por lote')
+        parser.add_argument('--usuario', help='Username registrado como usuario_registro')
+        parser.add_argument('--dry-run', action='store_true', help='Solo valida, no inserta')
+
+    def handle(self, *args, **options):
+        from django.contrib.auth.models import User
+
+        usuario = None
+        if options['usuario']:
+            usuario = User.objects.filter(username=options['usuario']).first()
+            if usuario is None:
+                raise CommandError(f'Usuario inexistente: {options["usuario"]}')
+
+        importador = self.importador(usuario=usuario, tamano_lote=options['lote'], dry_run=options['dry_run'])
+        try:
+            creados, errores = importador.importar(leer_filas(options['archivo'], options['formato']))
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        for numero, mensaje in errores[:self.max_errores_listados]:
+            self.stderr.write(f'Fila {numero}: {mensaje}')
+        if len(errores) > self.max_errores_listados:
+            self.stderr.write(f'... {len(errores) - self.max_errores_listados} errores más')
+
+        verbo = 'validadas' if options['dry_run'] else 'importadas'
+        self.stdout.write(self.style.SUCCESS(f'{creados} filas {verbo}, {len(errores)} con errores'))
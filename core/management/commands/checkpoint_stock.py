@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core import stock
+
+
+class Command(BaseCommand):
+    help = 'Guarda puntos de control del stock de cada material para acelerar las consultas históricas (ejecutar periódicamente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hasta', help='Fecha y hora de corte ISO 8601, en el pasado (por defecto, ahora menos STOCK_MARGEN_PUNTO_CONTROL)')
+        parser.add_argument('--material', type=int, action='append', dest='materiales', help='Limita a estos materiales; se puede repetir')
+
+    def handle(self, *args, **options):
+        hasta = None
+        if options['hasta']:
+            hasta = parse_datetime(options['hasta'])
+            if hasta is None:
+                raise CommandError(f"Fecha inválida: {options['hasta']}")
+            if timezone.is_naive(hasta):
+                hasta = timezone.make_aware(hasta)
+        try:
+            creados = stock.crear_puntos_control(hasta, options['materiales'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f'{len(creados)} puntos de control creados'))
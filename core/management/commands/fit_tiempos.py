@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core import estimacion
+
+
+class Command(BaseCommand):
+    help = 'Reajusta los coeficientes de tiempo de producción con las producciones terminadas (programar cada noche)'
+
+    def handle(self, *args, **options):
+        filas = estimacion.reajustar()
+        for fila in filas:
+            material = fila.inventario_id or 'general'
+            self.stdout.write(f'{material}: {fila.intercepto} h + {fila.por_unidad} h/u ({fila.muestras} producciones, error {fila.error} h)')
+        self.stdout.write(self.style.SUCCESS(f'{len(filas)} coeficientes guardados'))
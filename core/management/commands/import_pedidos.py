@@ -0,0 +1,6 @@
+from core.importacion import ComandoImportacion, ImportadorPedidos
+
+
+class Command(ComandoImportacion):
+    help = 'Importa pedidos en lote desde CSV/JSON creando su producción asociada'
+    importador = ImportadorPedidos
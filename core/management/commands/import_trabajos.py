@@ -0,0 +1,6 @@
+from core.importacion import ComandoImportacion, ImportadorTrabajos
+
+
+class Command(ComandoImportacion):
+    help = 'Importa trabajos en lote desde CSV/JSON'
+    importador = ImportadorTrabajos
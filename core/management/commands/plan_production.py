@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core import planificacion
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el plan de producción: asigna trabajos por fecha de entrega y carga de cada empleado'
+
+    def handle(self, *args, **options):
+        filas = planificacion.planificar()
+        for empleado, cola in planificacion.plan_por_empleado().items():
+            atrasadas = sum(1 for fila in cola if fila.atrasada)
+            self.stdout.write(f'{empleado.username}: {len(cola)} trabajos, {sum(f.horas for f in cola)} h, {atrasadas} atrasados')
+        self.stdout.write(self.style.SUCCESS(f'{len(filas)} trabajos planificados'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core import eventos
+
+
+class Command(BaseCommand):
+    help = 'Elimina los eventos más antiguos que EVENTOS_RETENCION_MINUTOS'
+
+    def handle(self, *args, **options):
+        total = eventos.purgar()
+        self.stdout.write(self.style.SUCCESS(f'{total} eventos eliminados'))
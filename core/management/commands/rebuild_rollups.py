@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import resumenes
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye las estadísticas diarias de pedidos, trabajos y compras desde las tablas de origen'
+
+    def add_arguments(self, parser):
+        parser.add_argument('entidades', nargs='*', help=f"Por defecto, todas: {', '.join(resumenes.CAMPOS_MONTO)}")
+
+    def handle(self, *args, **options):
+        desconocidas = set(options['entidades']) - set(resumenes.CAMPOS_MONTO)
+        if desconocidas:
+            raise CommandError(f"Entidades desconocidas: {', '.join(sorted(desconocidas))}")
+        total = resumenes.reconstruir_todo(options['entidades'] or None)
+        self.stdout.write(self.style.SUCCESS(f'{total} filas de estadística diaria reconstruidas'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import busqueda
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los índices de búsqueda de texto completo desde las tablas de origen'
+
+    def add_arguments(self, parser):
+        parser.add_argument('entidades', nargs='*', help=f"Por defecto, todas: {', '.join(busqueda.ENTIDADES)}")
+
+    def handle(self, *args, **options):
+        desconocidas = set(options['entidades']) - set(busqueda.ENTIDADES)
+        if desconocidas:
+            raise CommandError(f"Entidades desconocidas: {', '.join(sorted(desconocidas))}")
+        totales = busqueda.reconstruir(options['entidades'] or None)
+        for nombre, total in totales.items():
+            self.stdout.write(f'{nombre}: {total} documentos')
+        self.stdout.write(self.style.SUCCESS(f'Índices reconstruidos con {type(busqueda.backend()).__name__}'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core import contadores
+
+
+class Command(BaseCommand):
+    help = 'Recalcula cantidad_pedidos y es_frecuente de los clientes a partir de pedidos y trabajos entregados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Solo informa los clientes desfasados')
+
+    def handle(self, *args, **options):
+        desfasados = list(contadores.clientes_desfasados().values_list('pk', 'nombre', 'cantidad_pedidos', 'esperado'))
+        for pk, nombre, actual, esperado in desfasados:
+            self.stdout.write(f'Cliente #{pk} {nombre}: {actual} -> {esperado}')
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(desfasados)} clientes desfasados')
+            return
+
+        contadores.recalcular_contadores()
+        self.stdout.write(self.style.SUCCESS(f'{len(desfasados)} clientes corregidos'))
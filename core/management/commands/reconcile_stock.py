@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from core import stock
+from core.models import Inventario
+
+
+class Command(BaseCommand):
+    help = 'Compara Inventario.cantidad con el stock que dicta el libro de movimientos y opcionalmente lo corrige'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corregir', action='store_true', help='Registra ajustes para llevar cada material al valor del libro')
+
+    def handle(self, *args, **options):
+        if options['corregir']:
+            desfasados = stock.corregir_discrepancias()
+        else:
+            desfasados = stock.discrepancias()
+
+        for pk, nombre, actual, esperado in desfasados:
+            self.stdout.write(f'Material #{pk} {nombre}: {actual} -> {esperado} ({esperado - actual:+d})')
+
+        sin_historial = Inventario.objects.filter(movimientos__isnull=True).count()
+        if sin_historial:
+            self.stdout.write(f'{sin_historial} materiales sin movimientos no se revisan')
+
+        if options['corregir']:
+            self.stdout.write(self.style.SUCCESS(f'{len(desfasados)} materiales corregidos'))
+        else:
+            self.stdout.write(f'{len(desfasados)} materiales desfasados')
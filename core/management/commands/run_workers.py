@@ -0,0 +1,43 @@
+import multiprocessing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import tareas
+
+
+def _trabajar(indice, intervalo, una_vez):
+    connections.close_all()
+    return tareas.trabajar(indice, intervalo, una_vez)
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de tareas en segundo plano (reportes PDF) con un grupo de procesos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=getattr(settings, 'TAREAS_PROCESOS', 2))
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos de espera con la cola vacía')
+        parser.add_argument('--una-vez', action='store_true', help='Termina cuando la cola queda vacía')
+
+    def handle(self, *args, **options):
+        reintentos, fallidas = tareas.recuperar_abandonadas()
+        if reintentos or fallidas:
+            self.stdout.write(f'{reintentos} tareas abandonadas reencoladas, {fallidas} marcadas como fallidas')
+        borradas, archivos = tareas.purgar_antiguas()
+        if borradas or archivos:
+            self.stdout.write(f'{borradas} tareas antiguas y {archivos} archivos eliminados')
+
+        procesos = max(1, options['procesos'])
+        argumentos = [(indice, options['intervalo'], options['una_vez']) for indice in range(procesos)]
+        try:
+            if procesos == 1:
+                total = tareas.trabajar(*argumentos[0])
+            else:
+                connections.close_all()
+                with multiprocessing.get_context('fork').Pool(procesos) as grupo:
+                    total = sum(grupo.starmap(_trabajar, argumentos))
+        except KeyboardInterrupt:
+            self.stdout.write('Detenido')
+            return
+        self.stdout.write(self.style.SUCCESS(f'{total} tareas procesadas'))
@@ -0,0 +1,36 @@
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_alter_trabajo_cantidad_alter_trabajo_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='compra',
+            index=models.Index(fields=['estado', '-fecha_creacion'], name='compra_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(condition=models.Q(('cantidad__lte', models.F('cantidad_minima'))), fields=['cantidad'], name='inventario_bajo_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['estado', '-fecha_creacion'], name='pedido_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['fecha_entrega'], name='pedido_fecha_entrega_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trabajo',
+            index=models.Index(fields=['estado', '-fecha_creacion'], name='trabajo_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trabajo',
+            index=models.Index(fields=['fecha_entrega'], name='trabajo_fecha_entrega_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def poblar_estadisticas(apps, schema_editor):
+    EstadisticaDiaria = apps.get_model('core', 'EstadisticaDiaria')
+    fuentes = [
+        ('pedido', apps.get_model('core', 'Pedido'), 'precio_total'),
+        ('trabajo', apps.get_model('core', 'Trabajo'), 'precio_total'),
+        ('compra', apps.get_model('core', 'Compra'), 'costo_total'),
+    ]
+    for entidad, modelo, campo_monto in fuentes:
+        filas = (
+            modelo.objects.order_by()
+            .values('fecha_creacion', 'estado')
+            .annotate(n=Count('pk'), u=Sum('cantidad'), m=Sum(campo_monto))
+        )
+        EstadisticaDiaria.objects.bulk_create(
+            (
+                EstadisticaDiaria(
+                    entidad=entidad, fecha=f['fecha_creacion'], estado=f['estado'],
+                    cantidad=f['n'], unidades=f['u'] or 0, monto=f['m'] or 0,
+                )
+                for f in filas.iterator()
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_indices_listados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('entidad', models.CharField(choices=[('pedido', 'Pedidos'), ('trabajo', 'Trabajos'), ('compra', 'Compras')], max_length=20, verbose_name='Entidad')),
+                ('estado', models.CharField(max_length=50, verbose_name='Estado')),
+                ('cantidad', models.IntegerField(default=0, verbose_name='Cantidad de registros')),
+                ('unidades', models.IntegerField(default=0, verbose_name='Unidades')),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Monto')),
+            ],
+            options={
+                'verbose_name': 'Estadística diaria',
+                'verbose_name_plural': 'Estadísticas diarias',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='estadisticadiaria',
+            constraint=models.UniqueConstraint(fields=('entidad', 'fecha', 'estado'), name='estadistica_diaria_unica'),
+        ),
+        migrations.RunPython(poblar_estadisticas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_estadisticadiaria'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='compra',
+            name='compra_estado_fecha_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='pedido',
+            name='pedido_estado_fecha_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='trabajo',
+            name='trabajo_estado_fecha_idx',
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['-fecha_registro', '-id'], name='cliente_registro_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='compra',
+            index=models.Index(fields=['estado', '-fecha_creacion', '-id'], name='compra_estado_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='compra',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='compra_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(fields=['nombre', 'id'], name='inventario_nombre_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['estado', '-fecha_creacion', '-id'], name='pedido_estado_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='pedido_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proveedor',
+            index=models.Index(fields=['nombre', 'id'], name='proveedor_nombre_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trabajo',
+            index=models.Index(fields=['estado', '-fecha_creacion', '-id'], name='trabajo_estado_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trabajo',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='trabajo_fecha_id_idx'),
+        ),
+    ]
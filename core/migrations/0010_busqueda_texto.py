@@ -0,0 +1,58 @@
+from django.db import migrations
+
+# El DDL y el llenado van escritos aquí y no en core.busqueda: la migración
+# tiene que seguir creando las mismas tablas aunque el módulo cambie después.
+TOKENIZADOR = 'unicode61 remove_diacritics 2'
+
+TABLAS = {
+    'busqueda_cliente': (
+        ('nombre', 'email', 'telefono', 'nit_ci'),
+        "SELECT c.id, COALESCE(c.nombre, ''), COALESCE(c.email, ''), COALESCE(c.telefono, ''), COALESCE(c.nit_ci, '') "
+        "FROM core_cliente c",
+    ),
+    'busqueda_pedido': (
+        ('cliente_nombre', 'inventario_nombre', 'descripcion'),
+        "SELECT p.id, COALESCE(c.nombre, ''), COALESCE(i.nombre, ''), COALESCE(p.descripcion, '') "
+        "FROM core_pedido p LEFT JOIN core_cliente c ON c.id = p.cliente_id LEFT JOIN core_inventario i ON i.id = p.inventario_id",
+    ),
+    'busqueda_trabajo': (
+        ('cliente_nombre', 'producto_nombre', 'descripcion'),
+        "SELECT t.id, COALESCE(c.nombre, ''), COALESCE(pr.nombre, ''), COALESCE(t.descripcion, '') "
+        "FROM core_trabajo t LEFT JOIN core_cliente c ON c.id = t.cliente_id LEFT JOIN core_producto pr ON pr.id = t.producto_id",
+    ),
+    'busqueda_compra': (
+        ('proveedor_nombre', 'inventario_nombre', 'observaciones'),
+        "SELECT co.id, COALESCE(pv.nombre, ''), COALESCE(i.nombre, ''), COALESCE(co.observaciones, '') "
+        "FROM core_compra co LEFT JOIN core_proveedor pv ON pv.id = co.proveedor_id LEFT JOIN core_inventario i ON i.id = co.inventario_id",
+    ),
+}
+
+
+def crear_indices(apps, schema_editor):
+    # Fuera de SQLite la búsqueda usa icontains y no necesita tablas.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for tabla, (columnas, origen) in TABLAS.items():
+            cursor.execute(f'DROP TABLE IF EXISTS {tabla}')
+            cursor.execute(f"CREATE VIRTUAL TABLE {tabla} USING fts5({', '.join(columnas)}, tokenize='{TOKENIZADOR}')")
+            cursor.execute(f"INSERT INTO {tabla} (rowid, {', '.join(columnas)}) {origen}")
+
+
+def eliminar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for tabla in TABLAS:
+            cursor.execute(f'DROP TABLE IF EXISTS {tabla}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_paginacion_cursor'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
@@ -0,0 +1,57 @@
+from django.db import migrations
+
+# Como en 0010, el SQL queda fijo en la migración en lugar de leerse de core.busqueda.
+TOKENIZADOR = 'unicode61 remove_diacritics 2'
+PREFIJOS = '2 3'
+
+CLIENTE = (
+    ('nombre', 'email', 'telefono', 'nit_ci'),
+    "SELECT c.id, COALESCE(c.nombre, ''), COALESCE(c.email, ''), COALESCE(c.telefono, ''), COALESCE(c.nit_ci, '') "
+    "FROM core_cliente c",
+)
+TABLAS = {
+    # El de clientes se rehace con índices de prefijo para el autocompletado.
+    'busqueda_cliente': CLIENTE,
+    'busqueda_inventario': (
+        ('nombre', 'descripcion', 'proveedor'),
+        "SELECT i.id, COALESCE(i.nombre, ''), COALESCE(i.descripcion, ''), COALESCE(i.proveedor, '') FROM core_inventario i",
+    ),
+    'busqueda_producto': (
+        ('nombre', 'tipo', 'descripcion'),
+        "SELECT p.id, COALESCE(p.nombre, ''), COALESCE(p.tipo, ''), COALESCE(p.descripcion, '') FROM core_producto p",
+    ),
+}
+
+
+def _crear(cursor, tabla, columnas, origen, opciones):
+    cursor.execute(f'DROP TABLE IF EXISTS {tabla}')
+    cursor.execute(f"CREATE VIRTUAL TABLE {tabla} USING fts5({', '.join(columnas)}, {opciones})")
+    cursor.execute(f"INSERT INTO {tabla} (rowid, {', '.join(columnas)}) {origen}")
+
+
+def crear_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for tabla, (columnas, origen) in TABLAS.items():
+            _crear(cursor, tabla, columnas, origen, f"tokenize='{TOKENIZADOR}', prefix='{PREFIJOS}'")
+
+
+def eliminar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS busqueda_inventario')
+        cursor.execute('DROP TABLE IF EXISTS busqueda_producto')
+        _crear(cursor, 'busqueda_cliente', *CLIENTE, f"tokenize='{TOKENIZADOR}'")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_busqueda_texto'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0011_busqueda_catalogos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=50, verbose_name='Tipo')),
+                ('parametros', models.JSONField(blank=True, default=dict, verbose_name='Parámetros')),
+                ('clave', models.CharField(db_index=True, max_length=64, verbose_name='Clave de deduplicación')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En Proceso'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='pendiente', max_length=20, verbose_name='Estado')),
+                ('archivo', models.CharField(blank=True, max_length=255, verbose_name='Archivo generado')),
+                ('nombre_archivo', models.CharField(blank=True, max_length=255, verbose_name='Nombre de descarga')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('intentos', models.IntegerField(default=0, verbose_name='Intentos')),
+                ('trabajador', models.CharField(blank=True, max_length=100, verbose_name='Trabajador')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de inicio')),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True, verbose_name='Fecha de finalización')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Solicitada por')),
+            ],
+            options={
+                'verbose_name': 'Tarea en segundo plano',
+                'verbose_name_plural': 'Tareas en segundo plano',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'fecha_creacion'], name='tarea_estado_fecha_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='tarea',
+            constraint=models.UniqueConstraint(condition=models.Q(('estado__in', ['pendiente', 'en_proceso'])), fields=('clave',), name='tarea_en_curso_unica'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_tareas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PuntoControlStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(verbose_name='Fecha de corte')),
+                ('cantidad', models.IntegerField(verbose_name='Cantidad según movimientos')),
+                ('movimientos', models.IntegerField(default=0, verbose_name='Movimientos desde el punto anterior')),
+            ],
+            options={
+                'verbose_name': 'Punto de control de stock',
+                'verbose_name_plural': 'Puntos de control de stock',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='movimientoinventario',
+            index=models.Index(fields=['inventario', 'fecha', 'id'], name='movimiento_inv_fecha_idx'),
+        ),
+        migrations.AddField(
+            model_name='puntocontrolstock',
+            name='inventario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='puntos_control', to='core.inventario', verbose_name='Material'),
+        ),
+        migrations.AddConstraint(
+            model_name='puntocontrolstock',
+            constraint=models.UniqueConstraint(fields=('inventario', 'fecha'), name='punto_control_inv_fecha_unico'),
+        ),
+    ]
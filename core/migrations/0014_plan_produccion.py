@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0013_puntos_control_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanProduccion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posicion', models.IntegerField(verbose_name='Posición en la cola')),
+                ('horas', models.DecimalField(decimal_places=2, max_digits=7, verbose_name='Horas pendientes')),
+                ('inicio', models.DateTimeField(verbose_name='Inicio previsto')),
+                ('fin', models.DateTimeField(verbose_name='Fin previsto')),
+                ('fecha_entrega', models.DateField(verbose_name='Fecha de entrega')),
+                ('atrasada', models.BooleanField(default=False, verbose_name='No llega a la entrega')),
+                ('fecha_calculo', models.DateTimeField(auto_now=True, verbose_name='Calculado')),
+                ('empleado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='plan_produccion', to=settings.AUTH_USER_MODEL, verbose_name='Empleado')),
+                ('produccion', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='plan', to='core.produccion', verbose_name='Producción')),
+            ],
+            options={
+                'verbose_name': 'Plan de producción',
+                'verbose_name_plural': 'Plan de producción',
+                'ordering': ['empleado', 'posicion'],
+                'indexes': [models.Index(fields=['empleado', 'posicion'], name='plan_empleado_posicion_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_plan_produccion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoeficienteTiempo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('intercepto', models.DecimalField(decimal_places=4, max_digits=9, verbose_name='Horas fijas')),
+                ('por_unidad', models.DecimalField(decimal_places=8, max_digits=12, verbose_name='Horas por unidad')),
+                ('muestras', models.IntegerField(verbose_name='Producciones usadas')),
+                ('error', models.DecimalField(decimal_places=4, max_digits=9, verbose_name='Error típico (horas)')),
+                ('fecha_ajuste', models.DateTimeField(auto_now=True, verbose_name='Ajustado')),
+                ('inventario', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='coeficiente_tiempo', to='core.inventario', verbose_name='Material')),
+            ],
+            options={
+                'verbose_name': 'Coeficiente de tiempo',
+                'verbose_name_plural': 'Coeficientes de tiempo',
+                'ordering': ['inventario__nombre'],
+            },
+        ),
+    ]
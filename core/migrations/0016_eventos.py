@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_coeficientes_tiempo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Evento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=30, verbose_name='Modelo')),
+                ('accion', models.CharField(max_length=20, verbose_name='Acción')),
+                ('ids', models.JSONField(default=list, verbose_name='Registros')),
+                ('datos', models.JSONField(blank=True, default=dict, verbose_name='Datos')),
+                ('fecha', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Fecha')),
+            ],
+            options={
+                'verbose_name': 'Evento',
+                'verbose_name_plural': 'Eventos',
+                'ordering': ['id'],
+            },
+        ),
+    ]
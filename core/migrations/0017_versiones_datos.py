@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_eventos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionDatos',
+            fields=[
+                ('modelo', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Modelo')),
+                ('version', models.BigIntegerField(verbose_name='Versión')),
+                ('modificado', models.DateTimeField(blank=True, null=True, verbose_name='Última modificación')),
+            ],
+            options={
+                'verbose_name': 'Versión de datos',
+                'verbose_name_plural': 'Versiones de datos',
+            },
+        ),
+    ]
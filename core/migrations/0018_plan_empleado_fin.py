@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_versiones_datos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='planproduccion',
+            index=models.Index(fields=['empleado', 'fin'], name='plan_empleado_fin_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import Case, Count, F, IntegerField, Min, Q, Sum, When
+from django.utils import timezone
+
+
+def registrar_saldos_iniciales(apps, schema_editor):
+    """Ajuste de apertura para cada material, fechado antes de su primer movimiento.
+
+    El saldo es el que hace cuadrar el libro con la cantidad actual. Los
+    materiales que ya tienen un ajuste quedan como están: el libro parte de él.
+    Los puntos de control de los materiales tocados se calcularon desde cero y
+    se descartan; ``checkpoint_stock`` los vuelve a crear.
+    """
+    alias = schema_editor.connection.alias
+    Inventario = apps.get_model('core', 'Inventario')
+    MovimientoInventario = apps.get_model('core', 'MovimientoInventario')
+    PuntoControlStock = apps.get_model('core', 'PuntoControlStock')
+
+    neto = Case(
+        When(movimientos__tipo='entrada', then=F('movimientos__cantidad')),
+        When(movimientos__tipo='salida', then=-F('movimientos__cantidad')),
+        default=0, output_field=IntegerField(),
+    )
+    materiales = (
+        Inventario.objects.using(alias).order_by()
+        .annotate(neto=Sum(neto), primero=Min('movimientos__fecha'), ajustes=Count('movimientos', filter=Q(movimientos__tipo='ajuste')))
+        .filter(ajustes=0)
+        .values_list('pk', 'cantidad', 'neto', 'primero')
+    )
+    ahora = timezone.now()
+    aperturas = {}
+    for pk, cantidad, neto_movimientos, primero in materiales.iterator():
+        saldo = cantidad - (neto_movimientos or 0)
+        if saldo:
+            aperturas[pk] = (saldo, primero - timedelta(seconds=1) if primero else ahora)
+    if not aperturas:
+        return
+
+    MovimientoInventario.objects.using(alias).bulk_create(
+        (MovimientoInventario(inventario_id=pk, tipo='ajuste', cantidad=saldo, motivo='Saldo inicial') for pk, (saldo, _) in aperturas.items()),
+        batch_size=500,
+    )
+    # ``fecha`` es auto_now_add y bulk_create la deja en ahora; cada material
+    # tenía cero ajustes, así que el suyo es el único que coincide.
+    for pk, (_, fecha) in aperturas.items():
+        MovimientoInventario.objects.using(alias).filter(inventario_id=pk, tipo='ajuste').update(fecha=fecha)
+    PuntoControlStock.objects.using(alias).filter(inventario_id__in=list(aperturas)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_plan_empleado_fin'),
+    ]
+
+    operations = [
+        migrations.RunPython(registrar_saldos_iniciales, migrations.RunPython.noop),
+    ]
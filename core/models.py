@@ -1,9 +1,49 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from decimal import Decimal
-class Cliente(models.Model):
+
+from . import contadores, resumenes, stock
+
+
+class ValoresGuardadosMixin:
+    campos_rastreados = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._recordar_valores()
+        return instance
+
+    def _recordar_valores(self):
+        self._valores_guardados = {campo: self.__dict__.get(campo) for campo in self.campos_rastreados}
+
+    def _valores_actuales(self):
+        return {campo: getattr(self, campo) for campo in self.campos_rastreados}
+
+    def _campos_escritos(self, update_fields=None):
+        if update_fields is None:
+            return set(self.campos_rastreados)
+        nombres = set(update_fields)
+        return {campo for campo in self.campos_rastreados if campo in nombres or self._meta.get_field(campo).name in nombres}
+
+    def _previos_bloqueados(self):
+        """Valores rastreados según la base, con la fila bloqueada hasta el final de la transacción.
+
+        Dos procesos que guardan la misma fila desde el mismo estado quedan en
+        fila: el segundo ve lo que escribió el primero y no repite la transición.
+        """
+        if self._state.adding:
+            return {}
+        return type(self).objects.select_for_update().filter(pk=self.pk).values(*self.campos_rastreados).first() or {}
+
+    def _valores_escritos(self, previos, escritos):
+        # Lo que no entra en ``update_fields`` sigue en la base como estaba.
+        return {campo: getattr(self, campo) if campo in escritos else previos.get(campo) for campo in self.campos_rastreados}
+
+
+class Cliente(ValoresGuardadosMixin, models.Model):
     nombre = models.CharField(max_length=255, verbose_name="Nombre completo")
     telefono = models.CharField(max_length=20, blank=True, null=True, verbose_name="Teléfono")
     email = models.EmailField(max_length=255, blank=True, null=True, verbose_name="Correo electrónico")
@@ -12,11 +52,17 @@ class Cliente(models.Model):
     es_frecuente = models.BooleanField(default=False, verbose_name="Cliente frecuente")
     cantidad_pedidos = models.IntegerField(default=0, verbose_name="Cantidad de pedidos")
     fecha_registro = models.DateField(auto_now_add=True, verbose_name="Fecha de registro")
+
+    campos_rastreados = ('nombre',)
     
     class Meta:
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
         ordering = ['-fecha_registro']
+        indexes = [
+            models.Index(fields=['-fecha_registro', '-id'], name='cliente_registro_id_idx'),
+            models.Index(fields=['nombre', 'id'], name='cliente_nombre_id_idx'),
+        ]
     
     def __str__(self):
         return self.nombre
@@ -32,7 +78,7 @@ class Cliente(models.Model):
         return 10 if self.es_frecuente else 0
 
 
-class Producto(models.Model):
+class Producto(ValoresGuardadosMixin, models.Model):
     TIPOS_PRODUCTO = [
         ('tarjetas', 'Tarjetas de presentación'),
         ('volantes', 'Volantes'),
@@ -54,17 +100,22 @@ class Producto(models.Model):
     )
     imagen = models.ImageField(upload_to='productos/', blank=True, null=True, verbose_name="Imagen")
     activo = models.BooleanField(default=True, verbose_name="Producto activo")
+
+    campos_rastreados = ('nombre',)
     
     class Meta:
         verbose_name = "Producto"
         verbose_name_plural = "Productos"
         ordering = ['nombre']
+        indexes = [
+            models.Index(fields=['nombre', 'id'], name='producto_nombre_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nombre} - {self.get_tipo_display()}"
 
 
-class Inventario(models.Model):
+class Inventario(ValoresGuardadosMixin, models.Model):
     UNIDADES = [
         ('unidad', 'Unidad'),
         ('kg', 'Kilogramo'),
@@ -86,14 +137,27 @@ class Inventario(models.Model):
         verbose_name="Precio unitario"
     )
     ultima_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Última actualización")
+
+    campos_rastreados = ('nombre',)
     
     class Meta:
         verbose_name = "Material de Inventario"
         verbose_name_plural = "Inventario"
         ordering = ['nombre']
+        indexes = [
+            models.Index(fields=['cantidad'], condition=models.Q(cantidad__lte=models.F('cantidad_minima')), name='inventario_bajo_stock_idx'),
+            models.Index(fields=['nombre', 'id'], name='inventario_nombre_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nombre} ({self.cantidad} {self.unidad})"
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            nuevo = self._state.adding
+            super().save(*args, **kwargs)
+            if nuevo and self.cantidad:
+                stock.registrar_saldo_inicial(self)
     
     def necesita_reposicion(self):
         return self.cantidad <= self.cantidad_minima
@@ -107,7 +171,7 @@ class Inventario(models.Model):
             return 'normal'
 
 
-class Pedido(models.Model):
+class Pedido(ValoresGuardadosMixin, models.Model):
     ESTADOS = [
         ('pendiente', 'Pendiente'),
         ('en_proceso', 'En Proceso'),
@@ -133,11 +197,18 @@ class Pedido(models.Model):
     fecha_entregado = models.DateField(blank=True, null=True, verbose_name="Fecha de entrega real")
     
     usuario_registro = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='pedidos_registrados', verbose_name="Registrado por")
+
+    campos_rastreados = ('cliente_id', 'estado', 'cantidad', 'precio_total', 'fecha_creacion')
     
     class Meta:
         verbose_name = "Pedido"
         verbose_name_plural = "Pedidos"
         ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', '-fecha_creacion', '-id'], name='pedido_estado_fecha_id_idx'),
+            models.Index(fields=['-fecha_creacion', '-id'], name='pedido_fecha_id_idx'),
+            models.Index(fields=['fecha_entrega'], name='pedido_fecha_entrega_idx'),
+        ]
     
     def __str__(self):
         mat = getattr(self, 'inventario', None)
@@ -149,11 +220,15 @@ class Pedido(models.Model):
         descuento_monto = subtotal * (self.descuento / 100)
         self.precio_total = subtotal - descuento_monto
         
-        super().save(*args, **kwargs)
-
-        self.cliente.cantidad_pedidos = self.cliente.pedidos.filter(estado='entregado').count()
-        self.cliente.save(update_fields=['cantidad_pedidos'])
-        self.cliente.actualizar_frecuencia()
+        escritos = self._campos_escritos(kwargs.get('update_fields'))
+        with transaction.atomic(savepoint=False):
+            previos = self._previos_bloqueados() if escritos else {}
+            super().save(*args, **kwargs)
+            if escritos:
+                actuales = self._valores_escritos(previos, escritos)
+                contadores.registrar_transicion(previos.get('cliente_id'), previos.get('estado'), actuales['cliente_id'], actuales['estado'])
+                resumenes.registrar_cambio(self, previos, actuales)
+        self._recordar_valores()
 
 
 class Produccion(models.Model):
@@ -208,6 +283,48 @@ class Produccion(models.Model):
         self.pedido.save()
 
 
+class PlanProduccion(models.Model):
+    produccion = models.OneToOneField(Produccion, on_delete=models.CASCADE, related_name='plan', verbose_name="Producción")
+    empleado = models.ForeignKey(User, on_delete=models.CASCADE, related_name='plan_produccion', verbose_name="Empleado")
+    posicion = models.IntegerField(verbose_name="Posición en la cola")
+    horas = models.DecimalField(max_digits=7, decimal_places=2, verbose_name="Horas pendientes")
+    inicio = models.DateTimeField(verbose_name="Inicio previsto")
+    fin = models.DateTimeField(verbose_name="Fin previsto")
+    fecha_entrega = models.DateField(verbose_name="Fecha de entrega")
+    atrasada = models.BooleanField(default=False, verbose_name="No llega a la entrega")
+    fecha_calculo = models.DateTimeField(auto_now=True, verbose_name="Calculado")
+
+    class Meta:
+        verbose_name = "Plan de producción"
+        verbose_name_plural = "Plan de producción"
+        ordering = ['empleado', 'posicion']
+        indexes = [
+            models.Index(fields=['empleado', 'posicion'], name='plan_empleado_posicion_idx'),
+            models.Index(fields=['empleado', 'fin'], name='plan_empleado_fin_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.empleado.username} #{self.posicion}: {self.produccion}"
+
+
+class CoeficienteTiempo(models.Model):
+    inventario = models.OneToOneField(Inventario, on_delete=models.CASCADE, null=True, blank=True, related_name='coeficiente_tiempo', verbose_name="Material")
+    intercepto = models.DecimalField(max_digits=9, decimal_places=4, verbose_name="Horas fijas")
+    por_unidad = models.DecimalField(max_digits=12, decimal_places=8, verbose_name="Horas por unidad")
+    muestras = models.IntegerField(verbose_name="Producciones usadas")
+    error = models.DecimalField(max_digits=9, decimal_places=4, verbose_name="Error típico (horas)")
+    fecha_ajuste = models.DateTimeField(auto_now=True, verbose_name="Ajustado")
+
+    class Meta:
+        verbose_name = "Coeficiente de tiempo"
+        verbose_name_plural = "Coeficientes de tiempo"
+        ordering = ['inventario__nombre']
+
+    def __str__(self):
+        material = self.inventario.nombre if self.inventario_id else 'General'
+        return f"{material}: {self.intercepto} h + {self.por_unidad} h/u"
+
+
 class MovimientoInventario(models.Model):
     TIPOS_MOVIMIENTO = [
         ('entrada', 'Entrada'),
@@ -227,20 +344,36 @@ class MovimientoInventario(models.Model):
         verbose_name = "Movimiento de Inventario"
         verbose_name_plural = "Movimientos de Inventario"
         ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['inventario', 'fecha', 'id'], name='movimiento_inv_fecha_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.inventario.nombre} ({self.cantidad})"
     
     def save(self, *args, **kwargs):
-        if self.tipo == 'entrada':
-            self.inventario.cantidad += self.cantidad
-        elif self.tipo == 'salida':
-            self.inventario.cantidad -= self.cantidad
-        elif self.tipo == 'ajuste':
-            self.inventario.cantidad = self.cantidad
-        
-        self.inventario.save()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if self._state.adding:
+                stock.aplicar_movimientos([(self.inventario_id, self.tipo, self.cantidad)])
+            super().save(*args, **kwargs)
+
+
+class PuntoControlStock(models.Model):
+    inventario = models.ForeignKey(Inventario, on_delete=models.CASCADE, related_name='puntos_control', verbose_name="Material")
+    fecha = models.DateTimeField(verbose_name="Fecha de corte")
+    cantidad = models.IntegerField(verbose_name="Cantidad según movimientos")
+    movimientos = models.IntegerField(default=0, verbose_name="Movimientos desde el punto anterior")
+
+    class Meta:
+        verbose_name = "Punto de control de stock"
+        verbose_name_plural = "Puntos de control de stock"
+        ordering = ['-fecha']
+        constraints = [
+            models.UniqueConstraint(fields=['inventario', 'fecha'], name='punto_control_inv_fecha_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.inventario.nombre} @ {self.fecha:%Y-%m-%d %H:%M}: {self.cantidad}"
 
 
 class PerfilUsuario(models.Model):
@@ -269,7 +402,7 @@ class PerfilUsuario(models.Model):
         return self.rol == 'empleado'
 
 
-class Proveedor(models.Model):
+class Proveedor(ValoresGuardadosMixin, models.Model):
     nombre = models.CharField(max_length=255, verbose_name="Nombre del proveedor")
     contacto = models.CharField(max_length=255, blank=True, null=True, verbose_name="Persona de contacto")
     telefono = models.CharField(max_length=20, blank=True, null=True, verbose_name="Teléfono")
@@ -278,16 +411,21 @@ class Proveedor(models.Model):
     activo = models.BooleanField(default=True, verbose_name="Proveedor activo")
     fecha_creacion = models.DateField(auto_now_add=True, verbose_name="Fecha de registro")
 
+    campos_rastreados = ('nombre',)
+
     class Meta:
         verbose_name = "Proveedor"
         verbose_name_plural = "Proveedores"
         ordering = ['nombre']
+        indexes = [
+            models.Index(fields=['nombre', 'id'], name='proveedor_nombre_id_idx'),
+        ]
 
     def __str__(self):
         return self.nombre
 
 
-class Compra(models.Model):
+class Compra(ValoresGuardadosMixin, models.Model):
     ESTADOS_COMPRA = [
         ('pendiente', 'Pendiente'),
         ('ordenado', 'Ordenado'),
@@ -311,37 +449,49 @@ class Compra(models.Model):
 
     stock_aplicado = models.BooleanField(default=False, verbose_name="Stock aplicado")
 
+    campos_rastreados = ('estado', 'cantidad', 'costo_total', 'fecha_creacion')
+
     class Meta:
         verbose_name = "Compra a Proveedor"
         verbose_name_plural = "Compras a Proveedores"
         ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', '-fecha_creacion', '-id'], name='compra_estado_fecha_id_idx'),
+            models.Index(fields=['-fecha_creacion', '-id'], name='compra_fecha_id_idx'),
+        ]
 
     def __str__(self):
         return f"Compra #{self.id} - {self.proveedor.nombre} - {self.inventario.nombre}"
 
     def save(self, *args, **kwargs):
         self.costo_total = (self.precio_unitario or Decimal('0')) * (self.cantidad or 0)
-        estado_anterior = None
-        if self.pk:
-            try:
-                estado_anterior = Compra.objects.only('estado', 'stock_aplicado').get(pk=self.pk).estado
-            except Compra.DoesNotExist:
-                estado_anterior = None
-
-        super().save(*args, **kwargs)
+        if not self._state.adding and not self.stock_aplicado and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != 'stock_aplicado'
+            ]
+
+        escritos = self._campos_escritos(kwargs.get('update_fields'))
+        with transaction.atomic(savepoint=False):
+            previos = self._previos_bloqueados() if escritos else {}
+            super().save(*args, **kwargs)
+            if escritos:
+                resumenes.registrar_cambio(self, previos, self._valores_escritos(previos, escritos))
+        self._recordar_valores()
         if self.estado == 'recibido' and not self.stock_aplicado:
-            movimiento = MovimientoInventario(
-                inventario=self.inventario,
-                tipo='entrada',
-                cantidad=self.cantidad,
-                motivo=f'Compra #{self.id} recibida',
-                usuario=self.usuario_registro
-            )
-            movimiento.save()
-            Compra.objects.filter(pk=self.pk).update(stock_aplicado=True)
-
-
-class Trabajo(models.Model):
+            with transaction.atomic():
+                if Compra.objects.filter(pk=self.pk, stock_aplicado=False).update(stock_aplicado=True):
+                    MovimientoInventario(
+                        inventario=self.inventario,
+                        tipo='entrada',
+                        cantidad=self.cantidad,
+                        motivo=f'Compra #{self.id} recibida',
+                        usuario=self.usuario_registro
+                    ).save()
+            self.stock_aplicado = True
+
+
+class Trabajo(ValoresGuardadosMixin, models.Model):
     ESTADOS = [
         ('pendiente', 'Pendiente'),
         ('en_proceso', 'En Proceso'),
@@ -368,10 +518,17 @@ class Trabajo(models.Model):
 
     usuario_registro = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='trabajos_registrados', verbose_name="Registrado por")
 
+    campos_rastreados = ('cliente_id', 'estado', 'cantidad', 'precio_total', 'fecha_creacion')
+
     class Meta:
         verbose_name = "Trabajo"
         verbose_name_plural = "Trabajos"
         ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', '-fecha_creacion', '-id'], name='trabajo_estado_fecha_id_idx'),
+            models.Index(fields=['-fecha_creacion', '-id'], name='trabajo_fecha_id_idx'),
+            models.Index(fields=['fecha_entrega'], name='trabajo_fecha_entrega_idx'),
+        ]
 
     def __str__(self):
         prod = getattr(self, 'producto', None)
@@ -383,8 +540,111 @@ class Trabajo(models.Model):
         descuento_monto = subtotal * (self.descuento / 100)
         self.precio_total = subtotal - descuento_monto
 
-        super().save(*args, **kwargs)
-        self.cliente.cantidad_pedidos = self.cliente.pedidos.filter(estado='entregado').count() + \
-                                        self.cliente.trabajos.filter(estado='entregado').count()
-        self.cliente.save(update_fields=['cantidad_pedidos'])
-        self.cliente.actualizar_frecuencia()
+        escritos = self._campos_escritos(kwargs.get('update_fields'))
+        with transaction.atomic(savepoint=False):
+            previos = self._previos_bloqueados() if escritos else {}
+            super().save(*args, **kwargs)
+            if escritos:
+                actuales = self._valores_escritos(previos, escritos)
+                contadores.registrar_transicion(previos.get('cliente_id'), previos.get('estado'), actuales['cliente_id'], actuales['estado'])
+                resumenes.registrar_cambio(self, previos, actuales)
+        self._recordar_valores()
+
+
+class EstadisticaDiaria(models.Model):
+    ENTIDADES = [
+        ('pedido', 'Pedidos'),
+        ('trabajo', 'Trabajos'),
+        ('compra', 'Compras'),
+    ]
+
+    fecha = models.DateField(verbose_name="Fecha")
+    entidad = models.CharField(max_length=20, choices=ENTIDADES, verbose_name="Entidad")
+    estado = models.CharField(max_length=50, verbose_name="Estado")
+    cantidad = models.IntegerField(default=0, verbose_name="Cantidad de registros")
+    unidades = models.IntegerField(default=0, verbose_name="Unidades")
+    monto = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Monto")
+
+    class Meta:
+        verbose_name = "Estadística diaria"
+        verbose_name_plural = "Estadísticas diarias"
+        ordering = ['-fecha']
+        constraints = [
+            models.UniqueConstraint(fields=['entidad', 'fecha', 'estado'], name='estadistica_diaria_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_entidad_display()} {self.fecha} {self.estado}: {self.cantidad}"
+
+
+class Tarea(models.Model):
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En Proceso'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    ]
+    EN_CURSO = ('pendiente', 'en_proceso')
+
+    tipo = models.CharField(max_length=50, verbose_name="Tipo")
+    parametros = models.JSONField(default=dict, blank=True, verbose_name="Parámetros")
+    clave = models.CharField(max_length=64, db_index=True, verbose_name="Clave de deduplicación")
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente', verbose_name="Estado")
+    archivo = models.CharField(max_length=255, blank=True, verbose_name="Archivo generado")
+    nombre_archivo = models.CharField(max_length=255, blank=True, verbose_name="Nombre de descarga")
+    error = models.TextField(blank=True, verbose_name="Error")
+    intentos = models.IntegerField(default=0, verbose_name="Intentos")
+    trabajador = models.CharField(max_length=100, blank=True, verbose_name="Trabajador")
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Solicitada por")
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+    fecha_inicio = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de inicio")
+    fecha_fin = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de finalización")
+
+    class Meta:
+        verbose_name = "Tarea en segundo plano"
+        verbose_name_plural = "Tareas en segundo plano"
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion'], name='tarea_estado_fecha_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['clave'], condition=models.Q(estado__in=['pendiente', 'en_proceso']), name='tarea_en_curso_unica',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Tarea #{self.id} {self.tipo} ({self.get_estado_display()})"
+
+    @property
+    def en_curso(self):
+        return self.estado in self.EN_CURSO
+
+
+class Evento(models.Model):
+    modelo = models.CharField(max_length=30, verbose_name="Modelo")
+    accion = models.CharField(max_length=20, verbose_name="Acción")
+    ids = models.JSONField(default=list, verbose_name="Registros")
+    datos = models.JSONField(default=dict, blank=True, verbose_name="Datos")
+    fecha = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Fecha")
+
+    class Meta:
+        verbose_name = "Evento"
+        verbose_name_plural = "Eventos"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"#{self.pk} {self.modelo} {self.accion} {self.ids}"
+
+
+class VersionDatos(models.Model):
+    modelo = models.CharField(max_length=100, primary_key=True, verbose_name="Modelo")
+    version = models.BigIntegerField(verbose_name="Versión")
+    modificado = models.DateTimeField(null=True, blank=True, verbose_name="Última modificación")
+
+    class Meta:
+        verbose_name = "Versión de datos"
+        verbose_name_plural = "Versiones de datos"
+
+    def __str__(self):
+        return f"{self.modelo} v{self.version}"
@@ -0,0 +1,104 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+def _campos(orden):
+    return [(campo.lstrip('-'), campo.startswith('-')) for campo in orden]
+
+
+def codificar(valores):
+    crudo = json.dumps(valores, default=str, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip('=')
+
+
+def decodificar(cursor):
+    """Lista de valores del cursor, o None si no es uno que hayamos emitido."""
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    return valores if isinstance(valores, list) else None
+
+
+def _decodificar(cursor, modelo, campos):
+    valores = decodificar(cursor)
+    if valores is None or len(valores) != len(campos):
+        return None
+    try:
+        return [modelo._meta.get_field(campo).to_python(valor) for (campo, _), valor in zip(campos, valores)]
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def _despues_de(campos, valores, invertir=False):
+    condicion = Q()
+    iguales = {}
+    for (campo, descendente), valor in zip(campos, valores):
+        operador = 'lt' if descendente != invertir else 'gt'
+        condicion |= Q(**iguales, **{f'{campo}__{operador}': valor})
+        iguales[campo] = valor
+    return condicion
+
+
+class PaginaCursor:
+    def __init__(self, elementos, parametros, campos, hay_siguiente, hay_anterior):
+        self.elementos = elementos
+        self.hay_siguiente = hay_siguiente and bool(elementos)
+        self.hay_anterior = hay_anterior and bool(elementos)
+        self._parametros = parametros
+        self._campos = campos
+
+    def __iter__(self):
+        return iter(self.elementos)
+
+    def __len__(self):
+        return len(self.elementos)
+
+    def _enlace(self, elemento, direccion):
+        parametros = self._parametros.copy()
+        parametros['cursor'] = codificar([getattr(elemento, campo) for campo, _ in self._campos])
+        parametros['dir'] = direccion
+        return '?' + parametros.urlencode()
+
+    @property
+    def url_siguiente(self):
+        return self._enlace(self.elementos[-1], 'sig') if self.hay_siguiente else ''
+
+    @property
+    def url_anterior(self):
+        return self._enlace(self.elementos[0], 'ant') if self.hay_anterior else ''
+
+    @property
+    def url_inicio(self):
+        parametros = self._parametros.copy()
+        return '?' + parametros.urlencode() if parametros else '?'
+
+
+def paginar(queryset, request, orden, por_pagina=None):
+    por_pagina = por_pagina or getattr(settings, 'LISTADOS_POR_PAGINA', 50)
+    campos = _campos(orden)
+    parametros = request.GET.copy()
+    cursor = parametros.pop('cursor', [''])[-1]
+    hacia_atras = parametros.pop('dir', ['sig'])[-1] == 'ant'
+
+    valores = _decodificar(cursor, queryset.model, campos) if cursor else None
+    if valores is None:
+        hacia_atras = False
+    else:
+        queryset = queryset.filter(_despues_de(campos, valores, invertir=hacia_atras))
+
+    if hacia_atras:
+        invertido = [campo[1:] if campo.startswith('-') else f'-{campo}' for campo in orden]
+        filas = list(queryset.order_by(*invertido)[:por_pagina + 1])
+        hay_mas = len(filas) > por_pagina
+        elementos = filas[:por_pagina][::-1]
+        return PaginaCursor(elementos, parametros, campos, hay_siguiente=True, hay_anterior=hay_mas)
+
+    filas = list(queryset.order_by(*orden)[:por_pagina + 1])
+    hay_mas = len(filas) > por_pagina
+    return PaginaCursor(filas[:por_pagina], parametros, campos, hay_siguiente=hay_mas, hay_anterior=valores is not None)
@@ -0,0 +1,234 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+JORNADA_POR_DEFECTO = {'dias': (0, 1, 2, 3, 4), 'horas': ((8, 12), (14, 18))}
+ABIERTAS = ('no_iniciado', 'en_proceso', 'pausado')
+MAX_DIAS = 3660
+
+
+def jornada(empleado=None):
+    """Calendario laboral: días de la semana (0 = lunes) y tramos horarios.
+
+    ``PLANIFICACION_JORNADA`` define el calendario general y
+    ``PLANIFICACION_JORNADAS_EMPLEADO`` lo reemplaza por nombre de usuario.
+    """
+    propias = getattr(settings, 'PLANIFICACION_JORNADAS_EMPLEADO', {})
+    if empleado is not None and empleado.username in propias:
+        return propias[empleado.username]
+    return getattr(settings, 'PLANIFICACION_JORNADA', JORNADA_POR_DEFECTO)
+
+
+def _tramos(desde, calendario):
+    desde = timezone.localtime(desde)
+    dia = desde.date()
+    for _ in range(MAX_DIAS):
+        if dia.weekday() in calendario['dias']:
+            for inicio, fin in calendario['horas']:
+                apertura = timezone.make_aware(datetime.combine(dia, time(inicio)))
+                cierre = timezone.make_aware(datetime.combine(dia, time(fin))) if fin < 24 else timezone.make_aware(datetime.combine(dia + timedelta(days=1), time(0)))
+                if cierre > desde:
+                    yield max(apertura, desde), cierre
+        dia += timedelta(days=1)
+    raise ValueError('El calendario laboral no tiene horas disponibles')
+
+
+def avanzar(desde, horas, calendario):
+    """Devuelve (inicio, fin) de un trabajo de ``horas`` laborables que empieza en ``desde``."""
+    restante = timedelta(hours=float(horas))
+    inicio = None
+    for apertura, cierre in _tramos(desde, calendario):
+        inicio = inicio or apertura
+        if restante <= cierre - apertura:
+            return inicio, apertura + restante
+        restante -= cierre - apertura
+
+
+def horas_laborables(desde, hasta, calendario):
+    total = timedelta()
+    if hasta <= desde:
+        return Decimal('0')
+    for apertura, cierre in _tramos(desde, calendario):
+        if apertura >= hasta:
+            break
+        total += min(cierre, hasta) - apertura
+    return Decimal(total.total_seconds() / 3600).quantize(Decimal('0.01'))
+
+
+def empleados_disponibles():
+    return User.objects.filter(is_active=True, perfil__rol='empleado', perfil__activo=True).order_by('pk')
+
+
+def _abiertas():
+    from .models import Produccion
+
+    return Produccion.objects.filter(estado__in=ABIERTAS).select_related('pedido')
+
+
+def _vencimiento(fecha_entrega):
+    return timezone.make_aware(datetime.combine(fecha_entrega, time.max))
+
+
+def _pendiente(produccion, ahora, calendario):
+    horas = produccion.tiempo_estimado or Decimal('0')
+    if produccion.estado == 'en_proceso' and produccion.fecha_inicio:
+        horas -= horas_laborables(produccion.fecha_inicio, ahora, calendario)
+    return max(horas, Decimal('0'))
+
+
+def _orden(produccion):
+    # Lo que ya está en marcha va primero; el resto por fecha de entrega (EDD).
+    return (produccion.estado != 'en_proceso', produccion.pedido.fecha_entrega, produccion.pedido_id)
+
+
+def _programar_cola(empleado, producciones, ahora):
+    from .models import PlanProduccion
+
+    calendario = jornada(empleado)
+    filas = []
+    cursor = ahora
+    for posicion, produccion in enumerate(sorted(producciones, key=_orden)):
+        horas = _pendiente(produccion, ahora, calendario)
+        inicio, fin = avanzar(cursor, horas, calendario)
+        filas.append(PlanProduccion(
+            produccion=produccion, empleado=empleado, posicion=posicion, horas=horas, inicio=inicio, fin=fin,
+            fecha_entrega=produccion.pedido.fecha_entrega, atrasada=fin > _vencimiento(produccion.pedido.fecha_entrega),
+        ))
+        cursor = fin
+    return filas
+
+
+def _guardar(empleados, colas, ahora):
+    from .models import PlanProduccion, Produccion
+
+    filas = [fila for empleado in empleados for fila in _programar_cola(empleado, colas.get(empleado.pk, []), ahora)]
+    nuevas = [fila.produccion_id for fila in filas if fila.produccion.empleado_id != fila.empleado.pk]
+    with transaction.atomic():
+        PlanProduccion.objects.filter(empleado__in=empleados).delete()
+        PlanProduccion.objects.filter(produccion_id__in=[fila.produccion_id for fila in filas]).delete()
+        for empleado in empleados:
+            ids = [fila.produccion_id for fila in filas if fila.empleado.pk == empleado.pk and fila.produccion_id in nuevas]
+            if ids:
+                Produccion.objects.filter(pk__in=ids).update(empleado=empleado)
+        PlanProduccion.objects.bulk_create(filas)
+    return filas
+
+
+def fin_de_colas():
+    """``{empleado_id: fin previsto de su último trabajo}`` según el plan guardado.
+
+    Se lee siempre de ``PlanProduccion`` (índice ``empleado, fin``) para ver
+    también lo que replanificaron otros procesos.
+    """
+    from .models import PlanProduccion
+
+    return dict(PlanProduccion.objects.order_by().values('empleado_id').annotate(fin=Max('fin')).values_list('empleado_id', 'fin'))
+
+
+def _asignar(pendientes, colas, cargas):
+    for produccion in sorted(pendientes, key=_orden):
+        empleado_id = min(cargas, key=lambda pk: (cargas[pk], pk))
+        colas.setdefault(empleado_id, []).append(produccion)
+        cargas[empleado_id] += produccion.tiempo_estimado or Decimal('0')
+
+
+def planificar(ahora=None):
+    """Replanifica todas las producciones abiertas.
+
+    Los trabajos con empleado asignado se quedan con él (si no es personal de
+    producción quedan fuera del plan); los demás se reparten
+    en orden de entrega (EDD) al empleado con menos horas en cola (list
+    scheduling). Cada cola se ordena por entrega y se recorre el calendario
+    laboral del empleado para fijar inicio y fin.
+    """
+    from .models import PlanProduccion
+
+    ahora = ahora or timezone.now()
+    empleados = list(empleados_disponibles())
+    if not empleados:
+        PlanProduccion.objects.all().delete()
+        return []
+    por_id = {empleado.pk: empleado for empleado in empleados}
+    colas = {}
+    sin_asignar = []
+    for produccion in _abiertas():
+        if produccion.empleado_id in por_id:
+            colas.setdefault(produccion.empleado_id, []).append(produccion)
+        elif produccion.empleado_id is None:
+            sin_asignar.append(produccion)
+    cargas = {pk: sum((p.tiempo_estimado or Decimal('0') for p in colas.get(pk, [])), Decimal('0')) for pk in por_id}
+    _asignar(sin_asignar, colas, cargas)
+    PlanProduccion.objects.exclude(empleado__in=empleados).delete()
+    return _guardar(empleados, colas, ahora)
+
+
+def replanificar(produccion_id, ahora=None):
+    return replanificar_lote([produccion_id], ahora)
+
+
+def replanificar_lote(produccion_ids, ahora=None):
+    """Actualiza el plan tras el cambio de unas pocas producciones.
+
+    Sólo se recalculan las colas de los empleados que tenían o reciben alguna
+    de ellas; la carga de los demás se lee del plan guardado.
+    """
+    from .models import PlanProduccion, Produccion
+
+    ahora = ahora or timezone.now()
+    empleados = {empleado.pk: empleado for empleado in empleados_disponibles()}
+    if not empleados or not produccion_ids:
+        return []
+    anteriores = dict(PlanProduccion.objects.filter(produccion_id__in=produccion_ids).values_list('produccion_id', 'empleado_id'))
+    afectados = {pk for pk in anteriores.values() if pk in empleados}
+    fuera_del_plan = set(anteriores)
+    sin_asignar = []
+    for produccion in Produccion.objects.filter(pk__in=produccion_ids).select_related('pedido'):
+        if produccion.estado not in ABIERTAS:
+            continue
+        if produccion.empleado_id in empleados:
+            afectados.add(produccion.empleado_id)
+            fuera_del_plan.discard(produccion.pk)
+        elif produccion.empleado_id is None:
+            sin_asignar.append(produccion)
+            fuera_del_plan.discard(produccion.pk)
+    if fuera_del_plan:
+        PlanProduccion.objects.filter(produccion_id__in=fuera_del_plan).delete()
+
+    if sin_asignar:
+        cargas = dict.fromkeys(empleados, Decimal('0'))
+        cargas.update(
+            PlanProduccion.objects.filter(empleado_id__in=empleados).exclude(produccion_id__in=[p.pk for p in sin_asignar])
+            .values('empleado_id').annotate(total=Sum('horas')).values_list('empleado_id', 'total')
+        )
+        nuevas = {}
+        _asignar(sin_asignar, nuevas, cargas)
+        for empleado_id, producciones in nuevas.items():
+            Produccion.objects.filter(pk__in=[p.pk for p in producciones]).update(empleado_id=empleado_id)
+            afectados.add(empleado_id)
+
+    if not afectados:
+        return []
+    colas = {pk: [] for pk in afectados}
+    for abierta in _abiertas().filter(empleado_id__in=afectados):
+        colas[abierta.empleado_id].append(abierta)
+    return _guardar([empleados[pk] for pk in sorted(afectados)], colas, ahora)
+
+
+def programar_replanificacion(*produccion_ids):
+    if getattr(settings, 'PLANIFICACION_AUTOMATICA', True):
+        ids = list(produccion_ids)
+        transaction.on_commit(lambda: replanificar_lote(ids))
+
+
+def plan_por_empleado():
+    from .models import PlanProduccion
+
+    colas = {}
+    for fila in PlanProduccion.objects.select_related('empleado', 'produccion__pedido__cliente').order_by('empleado_id', 'posicion'):
+        colas.setdefault(fila.empleado, []).append(fila)
+    return colas
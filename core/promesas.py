@@ -0,0 +1,61 @@
+from datetime import datetime, time
+
+from django.utils import timezone
+
+from . import estimacion, planificacion
+
+ESTADOS_POR_RECIBIR = ('pendiente', 'ordenado')
+
+
+def material_disponible(inventario_id, cantidad, ahora):
+    """Momento desde el que hay ``cantidad`` del material y lo que falta si no alcanza.
+
+    Usa el stock actual y, si no basta, las compras pendientes u ordenadas en
+    orden de ``fecha_estimada``.
+    """
+    from .models import Compra, Inventario
+
+    acumulado = Inventario.objects.filter(pk=inventario_id).values_list('cantidad', flat=True).first()
+    if acumulado is None:
+        raise ValueError(f'Material {inventario_id} no existe')
+    if acumulado >= cantidad:
+        return ahora, 0
+    llegadas = Compra.objects.filter(
+        inventario_id=inventario_id, estado__in=ESTADOS_POR_RECIBIR, fecha_estimada__isnull=False,
+    ).order_by('fecha_estimada', 'id').values_list('fecha_estimada', 'cantidad')
+    for fecha, recibida in llegadas:
+        acumulado += recibida
+        if acumulado >= cantidad:
+            return max(ahora, timezone.make_aware(datetime.combine(fecha, time.min))), 0
+    return None, cantidad - max(acumulado, 0)
+
+
+def prometer(cantidad, inventario_id=None, ahora=None):
+    """Fecha de entrega más temprana posible para un pedido o trabajo nuevo.
+
+    Combina la llegada del material, las horas estimadas por ``estimacion`` y
+    el fin de la cola de cada empleado (``planificacion.fin_de_colas``); se
+    elige el empleado que termina antes según su jornada.
+    """
+    ahora = ahora or timezone.now()
+    listo, faltante = (ahora, 0) if inventario_id is None else material_disponible(inventario_id, cantidad, ahora)
+    horas = estimacion.estimar(inventario_id, cantidad)
+    respuesta = {
+        'fecha_entrega': None, 'fin_estimado': None, 'horas': horas, 'empleado': None,
+        'material_disponible': listo, 'faltante': faltante,
+    }
+    if listo is None:
+        return respuesta
+
+    colas = planificacion.fin_de_colas()
+    opciones = []
+    for empleado in planificacion.empleados_disponibles():
+        inicio = max(listo, colas.get(empleado.pk) or listo)
+        opciones.append((planificacion.avanzar(inicio, horas, planificacion.jornada(empleado))[1], empleado.pk, empleado))
+    if opciones:
+        fin, _, empleado = min(opciones)
+        respuesta['empleado'] = empleado.username
+    else:
+        fin = planificacion.avanzar(listo, horas, planificacion.jornada())[1]
+    respuesta.update(fecha_entrega=timezone.localdate(fin), fin_estimado=fin)
+    return respuesta
@@ -0,0 +1,250 @@
+from django.conf import settings
+from django.db.models import Count, F, Sum
+from django.utils.dateparse import parse_date
+
+from . import resumenes
+
+
+def filtros_compras(datos):
+    filtros = {
+        'start_date': (datos.get('start_date') or '').strip(),
+        'end_date': (datos.get('end_date') or '').strip(),
+        'estado': (datos.get('estado') or '').strip(),
+    }
+    for campo in ('start_date', 'end_date'):
+        if filtros[campo] and parse_date(filtros[campo]) is None:
+            filtros[campo] = ''
+    return filtros
+
+
+def compras_filtradas(filtros):
+    from .models import Compra
+
+    qs = Compra.objects.select_related('proveedor', 'inventario')
+    if filtros.get('start_date'):
+        qs = qs.filter(fecha_creacion__gte=parse_date(filtros['start_date']))
+    if filtros.get('end_date'):
+        qs = qs.filter(fecha_creacion__lte=parse_date(filtros['end_date']))
+    if filtros.get('estado'):
+        qs = qs.filter(estado=filtros['estado'])
+    return qs
+
+
+def resumen_compras(filtros):
+    return resumenes.resumen_compras(*_fechas(filtros))
+
+
+def _fechas(filtros):
+    return (
+        parse_date(filtros['start_date']) if filtros.get('start_date') else None,
+        parse_date(filtros['end_date']) if filtros.get('end_date') else None,
+        filtros.get('estado') or None,
+    )
+
+
+def _desglose(queryset, *campos, **grupo):
+    return list(
+        queryset.order_by()
+        .values(*campos, **grupo)
+        .annotate(compras=Count('pk'), cantidad=Sum('cantidad'), costo_total=Sum('costo_total'))
+        .order_by('-costo_total', 'nombre')
+    )
+
+
+def reporte_compras(filtros):
+    """Resumen y desgloses por proveedor, material y mes en una consulta cada uno.
+
+    El resumen y el desglose mensual salen de ``EstadisticaDiaria``; los de
+    proveedor y material agrupan las compras filtradas con ``values().annotate()``.
+    """
+    compras = compras_filtradas(filtros)
+    return {
+        'resumen': resumen_compras(filtros),
+        'por_proveedor': _desglose(compras, 'proveedor_id', nombre=F('proveedor__nombre')),
+        'por_material': _desglose(compras, 'inventario_id', nombre=F('inventario__nombre'), unidad=F('inventario__unidad')),
+        'por_mes': resumenes.compras_por_mes(*_fechas(filtros)),
+    }
+
+
+def nombre_pdf_compras(filtros):
+    suffix = ''
+    if filtros.get('start_date') or filtros.get('end_date'):
+        suffix = f"_{filtros.get('start_date') or ''}_a_{filtros.get('end_date') or ''}"
+    return f'compras{suffix}.pdf'
+
+
+FILAS_POR_TABLA = 55
+BYTES_POR_FILA = 4096
+COLUMNAS_PDF_COMPRAS = [
+    ('ID', 36), ('Proveedor', 95), ('Material', 105), ('Cant.', 36), ('Unit.', 50),
+    ('Total', 55), ('Estado', 58), ('F. Creación', 56), ('F. Recepción', 56),
+]
+
+
+def filas_en_memoria():
+    presupuesto = getattr(settings, 'REPORTES_PDF_MEMORIA_MB', 32) * 1024 * 1024
+    return max(FILAS_POR_TABLA, presupuesto // BYTES_POR_FILA)
+
+
+def _recortar(texto, largo):
+    return texto if len(texto) <= largo else texto[:largo - 3] + '...'
+
+
+def _filas_compras(filtros, tamano_lote):
+    from .models import Compra
+
+    estados = dict(Compra.ESTADOS_COMPRA)
+    filas = compras_filtradas(filtros).order_by('-fecha_creacion', '-id').values_list(
+        'id', 'proveedor__nombre', 'inventario__nombre', 'cantidad', 'precio_unitario',
+        'costo_total', 'estado', 'fecha_creacion', 'fecha_recepcion',
+    )
+    for pk, proveedor, material, cantidad, unitario, total, estado, creada, recibida in filas.iterator(chunk_size=tamano_lote):
+        yield [
+            str(pk),
+            _recortar(proveedor or '', 24),
+            _recortar(material or '', 26),
+            str(cantidad),
+            f"{unitario}",
+            f"{total}",
+            estados.get(estado, estado),
+            creada.strftime('%Y-%m-%d') if creada else '',
+            recibida.strftime('%Y-%m-%d') if recibida else '',
+        ]
+
+
+def _tablas_compras(filtros, tamano_lote):
+    from reportlab.platypus import Table, TableStyle
+    from reportlab.lib import colors
+
+    estilo = TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#e9ecef')),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.HexColor('#212529')),
+        ('GRID', (0,0), (-1,-1), 0.25, colors.grey),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0,0), (-1,-1), 7),
+        ('ALIGN', (0,0), (-1,0), 'CENTER'),
+        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ])
+    encabezado = [titulo for titulo, _ in COLUMNAS_PDF_COMPRAS]
+    anchos = [ancho for _, ancho in COLUMNAS_PDF_COMPRAS]
+    bloque = [encabezado]
+    for fila in _filas_compras(filtros, tamano_lote):
+        bloque.append(fila)
+        if len(bloque) > FILAS_POR_TABLA:
+            yield Table(bloque, colWidths=anchos, rowHeights=13, repeatRows=1, style=estilo)
+            bloque = [encabezado]
+    if len(bloque) > 1:
+        yield Table(bloque, colWidths=anchos, rowHeights=13, repeatRows=1, style=estilo)
+
+
+def _paginar(lienzo, nuevo_marco, pendientes, siguientes):
+    """Dibuja ``pendientes`` y luego ``siguientes`` en páginas de ``lienzo``.
+
+    Sólo usa la API pública de ReportLab: ``Frame.add`` dibuja un flowable si
+    cabe, ``Frame.split`` parte el que no entra y ``showPage`` cierra la página.
+    ``siguientes`` se consume de a un flowable, cuando el búfer se vacía.
+    """
+    from itertools import islice
+
+    from reportlab.platypus.doctemplate import LayoutError
+
+    marco, vacia = nuevo_marco(), True
+    while True:
+        if not pendientes:
+            pendientes.extend(islice(siguientes, 1))
+            if not pendientes:
+                break
+        actual = pendientes[0]
+        if marco.add(actual, lienzo):
+            del pendientes[0]
+        else:
+            partes = marco.split(actual, lienzo)
+            if partes and marco.add(partes[0], lienzo):
+                pendientes[0:1] = partes[1:]
+            elif vacia:
+                raise LayoutError(f'{actual!r} no cabe en una página')
+            else:
+                lienzo.showPage()
+                marco, vacia = nuevo_marco(), True
+                continue
+        vacia = False
+    lienzo.showPage()
+
+
+def pdf_compras(filtros, destino):
+    """Escribe el PDF de compras en ``destino`` sin cargar todas las filas a la vez.
+
+    Las compras se leen con ``iterator()`` en lotes acotados por
+    ``REPORTES_PDF_MEMORIA_MB`` y se agrupan en tablas de una página que se
+    dibujan y descartan una a una. Hasta ``save()`` el lienzo sólo conserva el
+    contenido ya dibujado de cada página.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen.canvas import Canvas
+    from reportlab.platypus import Frame, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    reporte = reporte_compras(filtros)
+    resumen = reporte['resumen']
+    ancho, alto = A4
+    lienzo = Canvas(destino, pagesize=A4, pageCompression=1)
+    elements = []
+    styles = getSampleStyleSheet()
+
+    elements.append(Paragraph('Reporte de Compras', styles['Title']))
+    elements.append(Spacer(1, 8))
+    filtros_txt = f"Rango: {filtros.get('start_date') or '-'} a {filtros.get('end_date') or '-'} | Estado: {filtros.get('estado') or 'Todos'}"
+    elements.append(Paragraph(filtros_txt, styles['Normal']))
+    elements.append(Spacer(1, 12))
+
+    res_data = [
+        ['Total', 'Pendientes', 'Ordenadas', 'Recibidas', 'Canceladas', 'Costo Total (Bs.)'],
+        [
+            str(resumen['total']),
+            str(resumen['pendientes']),
+            str(resumen['ordenadas']),
+            str(resumen['recibidas']),
+            str(resumen['canceladas']),
+            f"{resumen['costo_total']}",
+        ]
+    ]
+    res_table = Table(res_data)
+    res_table.setStyle(TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#f1f3f5')),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.HexColor('#495057')),
+        ('GRID', (0,0), (-1,-1), 0.25, colors.grey),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+        ('BOTTOMPADDING', (0,0), (-1,0), 6),
+    ]))
+    elements.append(res_table)
+    elements.append(Spacer(1, 16))
+
+    desgloses = [
+        ('Por proveedor', 'Proveedor', reporte['por_proveedor'], lambda f: f['nombre']),
+        ('Por material', 'Material', reporte['por_material'], lambda f: f['nombre']),
+        ('Por mes', 'Mes', reporte['por_mes'], lambda f: f['mes'].strftime('%Y-%m')),
+    ]
+    for titulo, columna, filas, etiqueta in desgloses:
+        if not filas:
+            continue
+        elements.append(Paragraph(titulo, styles['Heading3']))
+        datos = [[columna, 'Compras', 'Cantidad', 'Costo Total (Bs.)']]
+        datos.extend([etiqueta(f), str(f['compras']), str(f['cantidad']), f"{f['costo_total']}"] for f in filas)
+        tabla = Table(datos, colWidths=[220, 80, 80, 110], repeatRows=1)
+        tabla.setStyle(TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#f1f3f5')),
+            ('GRID', (0,0), (-1,-1), 0.25, colors.grey),
+            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0,0), (-1,-1), 8),
+            ('ALIGN', (1,0), (-1,-1), 'RIGHT'),
+        ]))
+        elements.append(tabla)
+        elements.append(Spacer(1, 12))
+
+    limite = filas_en_memoria()
+    tablas = _tablas_compras(filtros, min(limite, 2000))
+    _paginar(lienzo, lambda: Frame(24, 24, ancho - 48, alto - 48), elements, tablas)
+    lienzo.save()
+    return nombre_pdf_compras(filtros)
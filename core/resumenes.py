@@ -0,0 +1,163 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+
+CAMPOS_MONTO = {
+    'pedido': 'precio_total',
+    'trabajo': 'precio_total',
+    'compra': 'costo_total',
+}
+CENTAVOS = Decimal('0.01')
+
+
+def _modelos():
+    from .models import Compra, Pedido, Trabajo
+
+    return {'pedido': Pedido, 'trabajo': Trabajo, 'compra': Compra}
+
+
+def entidad_de(modelo):
+    nombre = modelo._meta.model_name
+    return nombre if nombre in CAMPOS_MONTO else None
+
+
+def _aporte(entidad, valores):
+    if not valores or valores.get('fecha_creacion') is None:
+        return None
+    monto = Decimal(valores.get(CAMPOS_MONTO[entidad]) or 0).quantize(CENTAVOS)
+    return valores['fecha_creacion'], valores['estado'], valores.get('cantidad') or 0, monto
+
+
+def _sumar(entidad, fecha, estado, cantidad, unidades, monto):
+    from .models import EstadisticaDiaria
+
+    fila = EstadisticaDiaria.objects.filter(entidad=entidad, fecha=fecha, estado=estado)
+    cambios = {
+        'cantidad': F('cantidad') + cantidad,
+        'unidades': F('unidades') + unidades,
+        'monto': F('monto') + monto,
+    }
+    if fila.update(**cambios):
+        return
+    try:
+        with transaction.atomic():
+            EstadisticaDiaria.objects.create(
+                entidad=entidad, fecha=fecha, estado=estado, cantidad=cantidad, unidades=unidades, monto=monto,
+            )
+    except IntegrityError:
+        fila.update(**cambios)
+
+
+def registrar_cambio(instancia, previos, actuales):
+    entidad = entidad_de(type(instancia))
+    if entidad is None:
+        return
+    anterior = _aporte(entidad, previos)
+    nuevo = _aporte(entidad, actuales)
+    if anterior == nuevo:
+        return
+    if anterior:
+        fecha, estado, unidades, monto = anterior
+        _sumar(entidad, fecha, estado, -1, -unidades, -monto)
+    if nuevo:
+        fecha, estado, unidades, monto = nuevo
+        _sumar(entidad, fecha, estado, 1, unidades, monto)
+
+
+def _filas_agregadas(entidad, queryset):
+    from .models import EstadisticaDiaria
+
+    agregados = (
+        queryset.order_by()
+        .values('fecha_creacion', 'estado')
+        .annotate(n=Count('pk'), u=Coalesce(Sum('cantidad'), 0), m=Coalesce(Sum(CAMPOS_MONTO[entidad]), Decimal('0')))
+    )
+    for fila in agregados.iterator():
+        yield EstadisticaDiaria(
+            entidad=entidad, fecha=fila['fecha_creacion'], estado=fila['estado'],
+            cantidad=fila['n'], unidades=fila['u'], monto=fila['m'],
+        )
+
+
+def reconstruir_dias(entidad, fechas):
+    from .models import EstadisticaDiaria
+
+    fechas = {f for f in fechas if f}
+    if not fechas:
+        return
+    modelo = _modelos()[entidad]
+    with transaction.atomic():
+        EstadisticaDiaria.objects.filter(entidad=entidad, fecha__in=fechas).delete()
+        EstadisticaDiaria.objects.bulk_create(_filas_agregadas(entidad, modelo.objects.filter(fecha_creacion__in=fechas)))
+
+
+def reconstruir_todo(entidades=None, batch_size=1000):
+    from .models import EstadisticaDiaria
+
+    total = 0
+    for entidad in entidades or CAMPOS_MONTO:
+        modelo = _modelos()[entidad]
+        with transaction.atomic():
+            EstadisticaDiaria.objects.filter(entidad=entidad).delete()
+            creadas = EstadisticaDiaria.objects.bulk_create(_filas_agregadas(entidad, modelo.objects.all()), batch_size=batch_size)
+        total += len(creadas)
+    return total
+
+
+def reconstruir_por_pks(modelo, pks):
+    entidad = entidad_de(modelo)
+    if entidad is None or not pks:
+        return
+    fechas = modelo.objects.filter(pk__in=pks).order_by().values_list('fecha_creacion', flat=True).distinct()
+    reconstruir_dias(entidad, list(fechas))
+
+
+def totales_del_dia(fecha):
+    from .models import EstadisticaDiaria
+
+    filas = (
+        EstadisticaDiaria.objects.filter(fecha=fecha)
+        .order_by()
+        .values('entidad')
+        .annotate(total=Sum('cantidad'))
+    )
+    return {fila['entidad']: fila['total'] for fila in filas}
+
+
+def _estadisticas_compra(desde=None, hasta=None, estado=None):
+    from .models import EstadisticaDiaria
+
+    filas = EstadisticaDiaria.objects.filter(entidad='compra')
+    if desde:
+        filas = filas.filter(fecha__gte=desde)
+    if hasta:
+        filas = filas.filter(fecha__lte=hasta)
+    if estado:
+        filas = filas.filter(estado=estado)
+    return filas
+
+
+def resumen_compras(desde=None, hasta=None, estado=None):
+    resumen = _estadisticas_compra(desde, hasta, estado).aggregate(
+        total=Sum('cantidad'),
+        pendientes=Sum('cantidad', filter=Q(estado='pendiente')),
+        ordenadas=Sum('cantidad', filter=Q(estado='ordenado')),
+        recibidas=Sum('cantidad', filter=Q(estado='recibido')),
+        canceladas=Sum('cantidad', filter=Q(estado='cancelado')),
+        costo_total=Sum('monto'),
+    )
+    resumen = {clave: valor or 0 for clave, valor in resumen.items()}
+    resumen['costo_total'] = Decimal(resumen['costo_total'])
+    return resumen
+
+
+def compras_por_mes(desde=None, hasta=None, estado=None):
+    return list(
+        _estadisticas_compra(desde, hasta, estado)
+        .order_by()
+        .values(mes=TruncMonth('fecha'))
+        .annotate(compras=Sum('cantidad'), cantidad=Sum('unidades'), costo_total=Sum('monto'))
+        .order_by('mes')
+    )
@@ -1,7 +1,15 @@
+from functools import partial
+
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
-from django.dispatch import receiver
+from django.dispatch import Signal, receiver
 from django.contrib.auth.models import User
-from .models import PerfilUsuario, Pedido, Produccion, Trabajo
+from . import busqueda, contadores, estimacion, eventos, planificacion, resumenes, versiones
+from .models import Cliente, Compra, Inventario, PerfilUsuario, Pedido, Produccion, Producto, Proveedor, Trabajo
+
+cambios_masivos = Signal()
+
+MODELOS_VERSIONADOS = (Pedido, Trabajo, Compra, Inventario, Produccion, Cliente, Producto, Proveedor)
 
 
 @receiver(post_save, sender=User)
@@ -21,35 +29,104 @@ def crear_produccion_automatica(sender, instance, created, **kwargs):
     if created:
         Produccion.objects.get_or_create(
             pedido=instance,
-            defaults={'tiempo_estimado': 0}
+            defaults={'tiempo_estimado': estimacion.estimar(instance.inventario_id, instance.cantidad)}
         )
 
 
+@receiver(post_save, sender=Produccion)
+def replanificar_produccion(sender, instance, **kwargs):
+    planificacion.programar_replanificacion(instance.pk)
+
+
+@receiver(post_save, sender=Pedido)
+def replanificar_por_pedido(sender, instance, created, **kwargs):
+    # La fecha de entrega del pedido decide el orden de la cola.
+    if not created:
+        produccion_id = Produccion.objects.filter(pedido=instance).values_list('pk', flat=True).first()
+        if produccion_id is not None:
+            planificacion.programar_replanificacion(produccion_id)
+
+
+@receiver(cambios_masivos)
+def replanificar_producciones(sender, pks=None, **kwargs):
+    if sender is Produccion and pks:
+        planificacion.programar_replanificacion(*pks)
+
+
 @receiver(post_delete, sender=Pedido)
-def actualizar_contador_cliente_al_eliminar_pedido(sender, instance, **kwargs):
-    cliente = getattr(instance, 'cliente', None)
-    if not cliente:
-        return
-    from .models import Cliente as ClienteModel
-    if not ClienteModel.objects.filter(pk=cliente.pk).exists():
-        return
-    pedidos_entregados = cliente.pedidos.filter(estado='entregado').count()
-    trabajos_entregados = cliente.trabajos.filter(estado='entregado').count()
-    cliente.cantidad_pedidos = pedidos_entregados + trabajos_entregados
-    cliente.save(update_fields=['cantidad_pedidos'])
-    cliente.actualizar_frecuencia()
+@receiver(post_delete, sender=Trabajo)
+def actualizar_contador_cliente_al_eliminar(sender, instance, **kwargs):
+    contadores.aplicar_delta(instance.cliente_id, -contadores.delta_transicion(None, instance.estado))
 
 
+@receiver(post_delete, sender=Pedido)
 @receiver(post_delete, sender=Trabajo)
-def actualizar_contador_cliente_al_eliminar_trabajo(sender, instance, **kwargs):
-    cliente = getattr(instance, 'cliente', None)
-    if not cliente:
-        return
-    from .models import Cliente as ClienteModel
-    if not ClienteModel.objects.filter(pk=cliente.pk).exists():
-        return
-    pedidos_entregados = cliente.pedidos.filter(estado='entregado').count()
-    trabajos_entregados = cliente.trabajos.filter(estado='entregado').count()
-    cliente.cantidad_pedidos = pedidos_entregados + trabajos_entregados
-    cliente.save(update_fields=['cantidad_pedidos'])
-    cliente.actualizar_frecuencia()
+@receiver(post_delete, sender=Compra)
+def descontar_resumen_diario_al_eliminar(sender, instance, **kwargs):
+    valores = getattr(instance, '_valores_guardados', None) or instance._valores_actuales()
+    resumenes.registrar_cambio(instance, valores, {})
+
+
+@receiver(cambios_masivos)
+def reconstruir_resumen_diario(sender, pks=None, **kwargs):
+    resumenes.reconstruir_por_pks(sender, pks)
+
+
+def _incrementar_version(sender, **kwargs):
+    if sender in MODELOS_VERSIONADOS:
+        transaction.on_commit(partial(versiones.incrementar, sender))
+
+
+for _modelo in MODELOS_VERSIONADOS:
+    post_save.connect(_incrementar_version, sender=_modelo, dispatch_uid=f'version_{_modelo.__name__}_save')
+    post_delete.connect(_incrementar_version, sender=_modelo, dispatch_uid=f'version_{_modelo.__name__}_delete')
+cambios_masivos.connect(_incrementar_version, dispatch_uid='version_cambios_masivos')
+
+
+def _cambio_en_dependientes(sender, instance, update_fields):
+    campos = busqueda.campos_de_dependencia(sender)
+    if not campos or (update_fields is not None and not campos & set(update_fields)):
+        return False
+    guardados = getattr(instance, '_valores_guardados', None)
+    if hasattr(instance, '_recordar_valores'):
+        instance._recordar_valores()
+    return guardados is None or any(guardados.get(campo) != getattr(instance, campo) for campo in campos)
+
+
+def _indexar_busqueda(sender, instance, created=False, update_fields=None, **kwargs):
+    busqueda.indexar(sender, [instance.pk])
+    if _cambio_en_dependientes(sender, instance, update_fields) and not created:
+        busqueda.indexar_dependientes(sender, [instance.pk])
+
+
+def _eliminar_de_busqueda(sender, instance, **kwargs):
+    busqueda.eliminar(sender, [instance.pk])
+
+
+@receiver(cambios_masivos)
+def actualizar_indice_busqueda(sender, pks=None, campos=None, **kwargs):
+    busqueda.indexar_cambios(sender, pks, campos)
+
+
+for _modelo in busqueda.modelos_indexados():
+    post_save.connect(_indexar_busqueda, sender=_modelo, dispatch_uid=f'busqueda_{_modelo.__name__}_save')
+    post_delete.connect(_eliminar_de_busqueda, sender=_modelo, dispatch_uid=f'busqueda_{_modelo.__name__}_delete')
+
+
+def _publicar_guardado(sender, instance, created=False, **kwargs):
+    eventos.publicar(sender, [instance.pk], 'creado' if created else 'guardado', eventos.datos_de(instance))
+
+
+def _publicar_eliminado(sender, instance, **kwargs):
+    eventos.publicar(sender, [instance.pk], 'eliminado')
+
+
+@receiver(cambios_masivos)
+def publicar_cambios_masivos(sender, pks=None, campos=None, valores=None, **kwargs):
+    # ``valores``: lo que quedó igual en todas las filas, para que las pantallas no recarguen.
+    eventos.publicar(sender, pks, 'masivo', {'campos': list(campos or []), **(valores or {})})
+
+
+for _modelo in (Produccion, Pedido, Trabajo, Inventario):
+    post_save.connect(_publicar_guardado, sender=_modelo, dispatch_uid=f'eventos_{_modelo.__name__}_save')
+    post_delete.connect(_publicar_eliminado, sender=_modelo, dispatch_uid=f'eventos_{_modelo.__name__}_delete')
@@ -0,0 +1,203 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Value, When
+from django.utils import timezone
+
+SIGNOS = {'entrada': 1, 'salida': -1}
+MATERIALES_POR_CONSULTA = 200
+MOTIVO_SALDO_INICIAL = 'Saldo inicial'
+
+
+def efectos_por_material(movimientos):
+    efectos = {}
+    for inventario_id, tipo, cantidad in movimientos:
+        if tipo == 'ajuste':
+            efectos[inventario_id] = ('ajuste', cantidad)
+        elif tipo in SIGNOS:
+            modo, valor = efectos.get(inventario_id, ('delta', 0))
+            efectos[inventario_id] = (modo, valor + SIGNOS[tipo] * cantidad)
+        else:
+            raise ValueError(f'Tipo de movimiento desconocido: {tipo}')
+    return efectos
+
+
+def aplicar_movimientos(movimientos):
+    from .models import Inventario
+    from .signals import cambios_masivos
+
+    efectos = efectos_por_material(movimientos)
+    if not efectos:
+        return 0
+
+    with transaction.atomic(savepoint=False):
+        ajustados = [pk for pk, (modo, _) in efectos.items() if modo == 'ajuste']
+        if ajustados:
+            list(Inventario.objects.select_for_update().filter(pk__in=ajustados).order_by().values_list('pk', flat=True))
+
+        casos = [
+            When(pk=pk, then=Value(valor) if modo == 'ajuste' else F('cantidad') + valor)
+            for pk, (modo, valor) in efectos.items()
+        ]
+        actualizados = Inventario.objects.filter(pk__in=list(efectos)).update(
+            cantidad=Case(*casos, default=F('cantidad')),
+            ultima_actualizacion=timezone.now(),
+        )
+    cambios_masivos.send(sender=Inventario, pks=list(efectos), campos=('cantidad', 'ultima_actualizacion'))
+    return actualizados
+
+
+def registrar_movimientos(movimientos, batch_size=500):
+    from .models import MovimientoInventario
+
+    movimientos = list(movimientos)
+    if not movimientos:
+        return []
+    with transaction.atomic():
+        aplicar_movimientos((m.inventario_id, m.tipo, m.cantidad) for m in movimientos)
+        return MovimientoInventario.objects.bulk_create(movimientos, batch_size=batch_size)
+
+
+def registrar_saldo_inicial(material, usuario=None):
+    """Ajuste de apertura para un material creado con stock.
+
+    La cantidad ya está en la fila, así que el movimiento sólo se anota en el
+    libro (``bulk_create`` no pasa por ``MovimientoInventario.save``); sin él,
+    el libro partiría de cero.
+    """
+    from .models import MovimientoInventario
+
+    movimiento = MovimientoInventario(
+        inventario=material, tipo='ajuste', cantidad=material.cantidad, motivo=MOTIVO_SALDO_INICIAL, usuario=usuario,
+    )
+    return MovimientoInventario.objects.bulk_create([movimiento])[0]
+
+
+def _puntos_control(momento, ids=None):
+    from .models import Inventario, PuntoControlStock
+
+    ultimos = PuntoControlStock.objects.filter(inventario=OuterRef('pk'), fecha__lte=momento).order_by('-fecha')
+    materiales = Inventario.objects.all() if ids is None else Inventario.objects.filter(pk__in=ids)
+    filas = materiales.order_by('pk').annotate(
+        punto_fecha=Subquery(ultimos.values('fecha')[:1]),
+        punto_cantidad=Subquery(ultimos.values('cantidad')[:1]),
+    ).values_list('pk', 'punto_fecha', 'punto_cantidad')
+    return {pk: (fecha, cantidad or 0) for pk, fecha, cantidad in filas}
+
+
+def _contando(filas, contador):
+    for fila in filas:
+        contador[fila[0]] += 1
+        yield fila
+
+
+def stock_en(momento, ids=None):
+    """Stock de cada material en ``momento`` según el libro de movimientos.
+
+    Parte del último punto de control anterior a ``momento`` y reproduce sólo
+    los movimientos posteriores a él; sin punto de control parte de cero, y el
+    stock con que se creó el material entra como su ajuste de apertura. Devuelve
+    ``{inventario_id: (cantidad, fecha_punto_control, movimientos_reproducidos)}``.
+    """
+    from .models import MovimientoInventario
+
+    puntos = _puntos_control(momento, ids)
+    pks = list(puntos)
+    resultado = {}
+    for inicio in range(0, len(pks), MATERIALES_POR_CONSULTA):
+        condicion = Q()
+        for pk in pks[inicio:inicio + MATERIALES_POR_CONSULTA]:
+            fecha = puntos[pk][0]
+            condicion |= Q(inventario_id=pk, fecha__gt=fecha) if fecha else Q(inventario_id=pk)
+        movimientos = (
+            MovimientoInventario.objects.filter(condicion, fecha__lte=momento)
+            .order_by('inventario_id', 'fecha', 'id')
+            .values_list('inventario_id', 'tipo', 'cantidad')
+        )
+        reproducidos = Counter()
+        efectos = efectos_por_material(_contando(movimientos.iterator(chunk_size=5000), reproducidos))
+        for pk in pks[inicio:inicio + MATERIALES_POR_CONSULTA]:
+            fecha, base = puntos[pk]
+            modo, valor = efectos.get(pk, ('delta', 0))
+            resultado[pk] = (valor if modo == 'ajuste' else base + valor, fecha, reproducidos[pk])
+    return resultado
+
+
+def crear_puntos_control(hasta=None, ids=None):
+    """Guarda un punto de control en ``hasta`` para cada material con movimientos nuevos.
+
+    Por defecto el corte queda ``STOCK_MARGEN_PUNTO_CONTROL`` segundos antes de
+    ahora: un movimiento toma su ``fecha`` al insertarse pero sólo se ve al
+    confirmarse la transacción, y uno anterior al corte que aún no se ve
+    quedaría fuera del punto de control y de toda reproducción posterior.
+    """
+    from .models import PuntoControlStock
+
+    limite = timezone.now() - timedelta(seconds=getattr(settings, 'STOCK_MARGEN_PUNTO_CONTROL', 300))
+    hasta = hasta or limite
+    if hasta > limite:
+        raise ValueError(f'El corte debe ser anterior a {timezone.localtime(limite):%Y-%m-%d %H:%M:%S}')
+    nuevos = [
+        PuntoControlStock(inventario_id=pk, fecha=hasta, cantidad=cantidad, movimientos=reproducidos)
+        for pk, (cantidad, _, reproducidos) in stock_en(hasta, ids).items()
+        if reproducidos
+    ]
+    return PuntoControlStock.objects.bulk_create(nuevos, batch_size=500, ignore_conflicts=True)
+
+
+SQL_ESPERADO = """
+SELECT inventario_id,
+       SUM(CASE tipo WHEN 'salida' THEN -cantidad ELSE cantidad END)
+FROM (
+    SELECT inventario_id, tipo, cantidad, grupo, MAX(grupo) OVER (PARTITION BY inventario_id) AS ultimo
+    FROM (
+        SELECT inventario_id, tipo, cantidad,
+               SUM(CASE WHEN tipo = 'ajuste' THEN 1 ELSE 0 END)
+                   OVER (PARTITION BY inventario_id ORDER BY fecha, id ROWS UNBOUNDED PRECEDING) AS grupo
+        FROM {tabla}
+        WHERE tipo IN ('entrada', 'salida', 'ajuste')
+    ) numerados
+) agrupados
+WHERE grupo = ultimo
+GROUP BY inventario_id
+"""
+
+
+def esperado_por_material():
+    """Stock que dicta el libro de movimientos para cada material, en una sola consulta.
+
+    Cada ``ajuste`` abre un grupo nuevo (suma acumulada de ajustes por material);
+    sólo el último grupo cuenta: el valor del ajuste más las entradas y salidas
+    posteriores, o la suma de todo si el material nunca tuvo ajustes.
+    """
+    from django.db import connection
+    from .models import MovimientoInventario
+
+    with connection.cursor() as cursor:
+        cursor.execute(SQL_ESPERADO.format(tabla=connection.ops.quote_name(MovimientoInventario._meta.db_table)))
+        return {pk: int(esperado) for pk, esperado in cursor.fetchall()}
+
+
+def discrepancias():
+    from .models import Inventario
+
+    esperado = esperado_por_material()
+    return [
+        (pk, nombre, cantidad, esperado[pk])
+        for pk, nombre, cantidad in Inventario.objects.filter(pk__in=list(esperado)).order_by('pk').values_list('pk', 'nombre', 'cantidad')
+        if cantidad != esperado[pk]
+    ]
+
+
+def corregir_discrepancias(usuario=None, motivo='Conciliación con el libro de movimientos'):
+    from .models import MovimientoInventario
+
+    with transaction.atomic():
+        pendientes = discrepancias()
+        registrar_movimientos(
+            MovimientoInventario(inventario_id=pk, tipo='ajuste', cantidad=esperado, motivo=motivo, usuario=usuario)
+            for pk, _, _, esperado in pendientes
+        )
+    return pendientes
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import reportes, ventas
+
+logger = logging.getLogger(__name__)
+
+TIPOS = {
+    'compras_pdf': reportes.pdf_compras,
+    'ventas_pdf': ventas.pdf_ventas,
+}
+
+
+def directorio():
+    ruta = Path(getattr(settings, 'REPORTES_DIR', Path(settings.BASE_DIR) / 'media' / 'reportes'))
+    ruta.mkdir(parents=True, exist_ok=True)
+    return ruta
+
+
+def clave_de(tipo, parametros):
+    crudo = json.dumps([tipo, parametros], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(crudo.encode()).hexdigest()
+
+
+def encolar(tipo, parametros, usuario=None):
+    from .models import Tarea
+
+    if tipo not in TIPOS:
+        raise ValueError(f'Tipo de tarea desconocido: {tipo}')
+    clave = clave_de(tipo, parametros)
+    existente = Tarea.objects.filter(clave=clave, estado__in=Tarea.EN_CURSO).first()
+    if existente:
+        return existente, False
+    try:
+        with transaction.atomic():
+            return Tarea.objects.create(tipo=tipo, parametros=parametros, clave=clave, usuario=usuario), True
+    except IntegrityError:
+        return Tarea.objects.get(clave=clave, estado__in=Tarea.EN_CURSO), False
+
+
+def reclamar(trabajador):
+    from .models import Tarea
+
+    while True:
+        pk = Tarea.objects.filter(estado='pendiente').order_by('fecha_creacion', 'id').values_list('pk', flat=True).first()
+        if pk is None:
+            return None
+        tomadas = Tarea.objects.filter(pk=pk, estado='pendiente').update(
+            estado='en_proceso', trabajador=trabajador, fecha_inicio=timezone.now(), intentos=F('intentos') + 1,
+        )
+        if tomadas:
+            return Tarea.objects.get(pk=pk)
+
+
+def ejecutar(tarea):
+    """Genera el archivo de ``tarea`` y registra el resultado si la tarea sigue siendo suya.
+
+    Si mientras tanto ``recuperar_abandonadas`` la reencoló o la dio por
+    fallida, el resultado se descarta y no se pisa el estado.
+    """
+    from .models import Tarea
+
+    propia = Tarea.objects.filter(pk=tarea.pk, estado='en_proceso', trabajador=tarea.trabajador)
+    destino = directorio() / f'tarea_{tarea.pk}_{tarea.intentos}_{tarea.clave[:12]}'
+    temporal = destino.with_suffix('.tmp')
+    try:
+        nombre = TIPOS[tarea.tipo](tarea.parametros, str(temporal))
+        os.replace(temporal, destino)
+    except Exception:
+        logger.exception('La tarea %s falló', tarea.pk)
+        temporal.unlink(missing_ok=True)
+        propia.update(estado='fallida', error=traceback.format_exc(limit=5), fecha_fin=timezone.now())
+        return False
+    registrada = propia.update(
+        estado='completada', archivo=destino.name, nombre_archivo=nombre, error='', fecha_fin=timezone.now(),
+    )
+    if not registrada:
+        logger.warning('La tarea %s ya no pertenece a %s; se descarta su resultado', tarea.pk, tarea.trabajador)
+        destino.unlink(missing_ok=True)
+    return bool(registrada)
+
+
+def recuperar_abandonadas():
+    from .models import Tarea
+
+    limite = timezone.now() - timedelta(seconds=getattr(settings, 'TAREAS_TIEMPO_MAXIMO', 1800))
+    abandonadas = Tarea.objects.filter(estado='en_proceso', fecha_inicio__lt=limite)
+    fallidas = abandonadas.filter(intentos__gte=getattr(settings, 'TAREAS_MAX_INTENTOS', 3)).update(
+        estado='fallida', error='Tiempo máximo de ejecución excedido', fecha_fin=timezone.now(),
+    )
+    reintentos = abandonadas.update(estado='pendiente', trabajador='')
+    return reintentos, fallidas
+
+
+def purgar_antiguas():
+    """Borra las tareas terminadas hace más de ``TAREAS_RETENCION_HORAS`` y los archivos sin tarea."""
+    from .models import Tarea
+
+    limite = timezone.now() - timedelta(hours=getattr(settings, 'TAREAS_RETENCION_HORAS', 24))
+    tareas = Tarea.objects.filter(estado__in=('completada', 'fallida'), fecha_fin__lt=limite).delete()[0]
+    vigentes = set(Tarea.objects.exclude(archivo='').values_list('archivo', flat=True))
+    archivos = 0
+    for ruta in directorio().iterdir():
+        if ruta.is_file() and ruta.name not in vigentes and ruta.stat().st_mtime < limite.timestamp():
+            ruta.unlink(missing_ok=True)
+            archivos += 1
+    return tareas, archivos
+
+
+def ruta_archivo(tarea):
+    return directorio() / tarea.archivo if tarea.archivo else None
+
+
+def nombre_trabajador(indice=0):
+    return f'{socket.gethostname()}:{os.getpid()}:{indice}'
+
+
+def trabajar(indice=0, intervalo=2.0, una_vez=False):
+    trabajador = nombre_trabajador(indice)
+    procesadas = 0
+    ultima_revision = time.monotonic()
+    while True:
+        close_old_connections()
+        if indice == 0 and time.monotonic() - ultima_revision > 60:
+            recuperar_abandonadas()
+            purgar_antiguas()
+            ultima_revision = time.monotonic()
+        tarea = reclamar(trabajador)
+        if tarea is None:
+            if una_vez:
+                break
+            time.sleep(intervalo)
+            continue
+        logger.info('%s ejecuta la tarea %s (%s)', trabajador, tarea.pk, tarea.tipo)
+        ejecutar(tarea)
+        procesadas += 1
+    return procesadas
@@ -1,10 +1,13 @@
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
 
 from .models import Proveedor
-from .models import Cliente, Inventario, Pedido
+from .models import Cliente, Inventario, Pedido, MovimientoInventario, Compra
 from decimal import Decimal
+from io import StringIO
 
 
 class ComprasUITest(TestCase):
@@ -147,3 +150,1440 @@ class ClientePedidosCountTest(TestCase):
 		self.cliente.refresh_from_db()
 		self.assertEqual(self.cliente.cantidad_pedidos, 1)
 
+
+
+class ContadorIncrementalTest(TestCase):
+	def setUp(self):
+		self.cliente = Cliente.objects.create(nombre='Corp')
+		self.otro = Cliente.objects.create(nombre='Otro')
+		self.material = Inventario.objects.create(nombre='Papel', cantidad=100, precio_unitario=Decimal('2.00'))
+		self.pedido = Pedido.objects.create(
+			cliente=self.cliente, inventario=self.material, cantidad=2, descripcion='x',
+			precio_unitario=Decimal('2.00'), descuento=Decimal('0'), fecha_entrega='2025-10-30', estado='entregado',
+		)
+
+	def test_editar_sin_cambio_de_estado_no_toca_cliente(self):
+		pedido = Pedido.objects.get(pk=self.pedido.pk)
+		pedido.descripcion = 'nueva'
+		with CaptureQueriesContext(connection) as consultas:
+			pedido.save()
+		# Lectura bloqueante del estado previo, UPDATE, la producción a replanificar
+		# y el reindexado del pedido (DELETE, SELECT, INSERT).
+		self.assertEqual(len(consultas), 6)
+		self.assertFalse([q for q in consultas.captured_queries if 'core_cliente' in q['sql'] and not q['sql'].startswith('SELECT')])
+		self.cliente.refresh_from_db()
+		self.assertEqual(self.cliente.cantidad_pedidos, 1)
+
+	def test_dos_copias_entregan_una_sola_vez(self):
+		Pedido.objects.filter(pk=self.pedido.pk).update(estado='terminado')
+		Cliente.objects.filter(pk=self.cliente.pk).update(cantidad_pedidos=0)
+		primera = Pedido.objects.get(pk=self.pedido.pk)
+		segunda = Pedido.objects.get(pk=self.pedido.pk)
+		for copia in (primera, segunda):
+			copia.estado = 'entregado'
+			copia.save()
+		self.cliente.refresh_from_db()
+		self.assertEqual(self.cliente.cantidad_pedidos, 1)
+
+	def test_update_fields_sin_estado_no_aplica_delta(self):
+		pedido = Pedido.objects.get(pk=self.pedido.pk)
+		pedido.estado = 'cancelado'
+		pedido.descripcion = 'nueva'
+		pedido.save(update_fields=['descripcion'])
+		self.cliente.refresh_from_db()
+		self.assertEqual(self.cliente.cantidad_pedidos, 1)
+		self.assertEqual(Pedido.objects.get(pk=self.pedido.pk).estado, 'entregado')
+
+	def test_cambio_de_cliente_mueve_el_contador(self):
+		pedido = Pedido.objects.get(pk=self.pedido.pk)
+		pedido.cliente = self.otro
+		pedido.save()
+		self.cliente.refresh_from_db()
+		self.otro.refresh_from_db()
+		self.assertEqual(self.cliente.cantidad_pedidos, 0)
+		self.assertEqual(self.otro.cantidad_pedidos, 1)
+
+	def test_reconciliacion_corrige_desfase(self):
+		from django.core.management import call_command
+		Cliente.objects.filter(pk=self.cliente.pk).update(cantidad_pedidos=9, es_frecuente=True)
+		call_command('reconcile_clientes', stdout=StringIO())
+		self.cliente.refresh_from_db()
+		self.assertEqual(self.cliente.cantidad_pedidos, 1)
+		self.assertFalse(self.cliente.es_frecuente)
+
+
+class StockAtomicoTest(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='almacen', password='s3cret')
+		self.papel = Inventario.objects.create(nombre='Papel', cantidad=10)
+		self.tinta = Inventario.objects.create(nombre='Tinta', cantidad=5)
+
+	def test_movimiento_usa_valor_actual_de_la_base(self):
+		obsoleto = Inventario.objects.get(pk=self.papel.pk)
+		MovimientoInventario.objects.create(inventario=self.papel, tipo='entrada', cantidad=4, motivo='a')
+		MovimientoInventario.objects.create(inventario=obsoleto, tipo='salida', cantidad=3, motivo='b')
+		self.papel.refresh_from_db()
+		self.assertEqual(self.papel.cantidad, 11)
+
+	def test_registro_masivo_respeta_ajustes(self):
+		from .stock import registrar_movimientos
+		movimientos = [
+			MovimientoInventario(inventario=self.papel, tipo='entrada', cantidad=5, motivo='x'),
+			MovimientoInventario(inventario=self.papel, tipo='ajuste', cantidad=2, motivo='x'),
+			MovimientoInventario(inventario=self.papel, tipo='entrada', cantidad=1, motivo='x'),
+			MovimientoInventario(inventario=self.tinta, tipo='salida', cantidad=5, motivo='x'),
+		]
+		with self.assertNumQueries(5):
+			registrar_movimientos(movimientos)
+		self.papel.refresh_from_db()
+		self.tinta.refresh_from_db()
+		self.assertEqual(self.papel.cantidad, 3)
+		self.assertEqual(self.tinta.cantidad, 0)
+		self.assertEqual(MovimientoInventario.objects.exclude(motivo='Saldo inicial').count(), 4)
+
+	def test_compra_recibida_dos_veces_aplica_stock_una_vez(self):
+		proveedor = Proveedor.objects.create(nombre='Prov')
+		compra = Compra.objects.create(
+			proveedor=proveedor, inventario=self.papel, cantidad=7,
+			precio_unitario=Decimal('1.00'), usuario_registro=self.user,
+		)
+		primera = Compra.objects.get(pk=compra.pk)
+		segunda = Compra.objects.get(pk=compra.pk)
+		for c in (primera, segunda):
+			c.estado = 'recibido'
+			c.save()
+		self.papel.refresh_from_db()
+		self.assertEqual(self.papel.cantidad, 17)
+		self.assertEqual(MovimientoInventario.objects.filter(inventario=self.papel).exclude(motivo='Saldo inicial').count(), 1)
+
+
+class ImportacionPedidosTest(TestCase):
+	def setUp(self):
+		self.cliente = Cliente.objects.create(nombre='Mayorista')
+		self.material = Inventario.objects.create(nombre='Couché', cantidad=50, precio_unitario=Decimal('4.00'))
+
+	def _csv(self, contenido):
+		import os
+		import tempfile
+		archivo = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8')
+		archivo.write(contenido)
+		archivo.close()
+		self.addCleanup(os.remove, archivo.name)
+		return archivo.name
+
+	def test_importa_valida_y_recalcula_contador(self):
+		from django.core.management import call_command
+		from .models import Produccion
+		ruta = self._csv(
+			'cliente_id,inventario_id,cantidad,descripcion,precio_unitario,descuento,fecha_entrega,estado\n'
+			f'{self.cliente.pk},{self.material.pk},10,Volantes,,10,2025-11-01,entregado\n'
+			f'{self.cliente.pk},{self.material.pk},5,Afiches,3.50,,2025-11-02,pendiente\n'
+			f'999,{self.material.pk},5,Sin cliente,1,,2025-11-02,pendiente\n'
+			f'{self.cliente.pk},{self.material.pk},0,Cantidad mala,1,,2025-11-02,pendiente\n'
+		)
+		err = StringIO()
+		call_command('import_pedidos', ruta, stdout=StringIO(), stderr=err)
+		self.assertEqual(Pedido.objects.count(), 2)
+		self.assertEqual(Produccion.objects.count(), 2)
+		self.assertIn('Fila 4', err.getvalue())
+		self.assertIn('Fila 5', err.getvalue())
+		volantes = Pedido.objects.get(descripcion='Volantes')
+		self.assertEqual(volantes.precio_total, Decimal('36.00'))
+		self.cliente.refresh_from_db()
+		self.assertEqual(self.cliente.cantidad_pedidos, 1)
+
+	def test_json_por_bloques_y_fecha_entregado_invalida(self):
+		import io
+		import json
+		from .importacion import ImportadorPedidos, leer_arreglo_json
+		base = {'cliente_id': self.cliente.pk, 'inventario_id': self.material.pk, 'cantidad': 2, 'descripcion': 'Tarjetas', 'fecha_entrega': '2025-11-01'}
+		filas = [dict(base, estado='entregado', fecha_entregado='2025-11-03'), dict(base, estado='entregado', fecha_entregado='03/11/2025')]
+		leidas = list(enumerate(leer_arreglo_json(io.StringIO(json.dumps(filas)), tamano=7), start=1))
+		self.assertEqual([fila for _, fila in leidas], filas)
+		creados, errores = ImportadorPedidos().importar(leidas)
+		self.assertEqual(creados, 1)
+		self.assertEqual(errores, [(2, 'Fecha de entregado inválida')])
+		with self.assertRaises(ValueError):
+			list(leer_arreglo_json(io.StringIO('[{"cliente_id": 1}'), tamano=4))
+
+
+class TransicionLoteTest(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='jefe', password='s3cret')
+		self.cliente = Cliente.objects.create(nombre='Lote')
+		self.material = Inventario.objects.create(nombre='Vinil', cantidad=10, precio_unitario=Decimal('1.00'))
+		self.pedidos = [
+			Pedido.objects.create(
+				cliente=self.cliente, inventario=self.material, cantidad=1, descripcion='x',
+				precio_unitario=Decimal('1.00'), descuento=Decimal('0'), fecha_entrega='2025-10-30', estado=estado,
+			)
+			for estado in ('terminado', 'terminado', 'cancelado')
+		]
+
+	def test_transicion_masiva_reporta_por_id_y_recuenta(self):
+		from .transiciones import transicionar_lote
+		ids = [p.pk for p in self.pedidos] + [9999]
+		resultados = transicionar_lote(Pedido, ids, 'entregado')
+		self.assertEqual([r['resultado'] for r in resultados], ['ok', 'ok', 'rechazado', 'no_encontrado'])
+		self.cliente.refresh_from_db()
+		self.assertEqual(self.cliente.cantidad_pedidos, 2)
+		self.assertIsNotNone(Pedido.objects.get(pk=self.pedidos[0].pk).fecha_entregado)
+
+	def test_api_transicion(self):
+		self.client.login(username='jefe', password='s3cret')
+		resp = self.client.post(
+			reverse('core:api_pedidos_transicion'),
+			{'ids': [self.pedidos[0].pk], 'estado': 'entregado'},
+			content_type='application/json',
+		)
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(resp.json()['resumen'], {'ok': 1})
+
+	def test_api_rechaza_ids_que_no_son_lista(self):
+		self.client.login(username='jefe', password='s3cret')
+		for url, datos in (
+			(reverse('core:api_pedidos_transicion'), {'ids': str(self.pedidos[0].pk), 'estado': 'entregado'}),
+			(reverse('core:api_produccion_lote'), {'ids': str(self.pedidos[0].pk), 'accion': 'iniciar'}),
+		):
+			resp = self.client.post(url, datos, content_type='application/json')
+			self.assertEqual(resp.status_code, 400)
+		self.assertEqual(Pedido.objects.get(pk=self.pedidos[0].pk).estado, 'terminado')
+
+	def test_api_reporta_ids_no_enteros(self):
+		self.client.login(username='jefe', password='s3cret')
+		resp = self.client.post(
+			reverse('core:api_pedidos_transicion'),
+			{'ids': [self.pedidos[0].pk, 'abc', True, str(self.pedidos[1].pk)], 'estado': 'entregado'},
+			content_type='application/json',
+		)
+		self.assertEqual(resp.json()['resumen'], {'ok': 2, 'invalido': 2})
+		self.assertEqual([r['id'] for r in resp.json()['resultados'] if r['resultado'] == 'invalido'], ['abc', True])
+
+	def test_api_requiere_rol(self):
+		from .models import PerfilUsuario
+		PerfilUsuario.objects.filter(user=self.user).delete()
+		self.client.login(username='jefe', password='s3cret')
+		for url, datos in (
+			(reverse('core:api_pedidos_transicion'), {'ids': [self.pedidos[0].pk], 'estado': 'entregado'}),
+			(reverse('core:api_trabajos_transicion'), {'ids': [1], 'estado': 'entregado'}),
+			(reverse('core:api_produccion_lote'), {'ids': [self.pedidos[0].produccion.pk], 'accion': 'iniciar'}),
+		):
+			resp = self.client.post(url, datos, content_type='application/json')
+			self.assertEqual(resp.status_code, 302)
+		self.assertEqual(Pedido.objects.get(pk=self.pedidos[0].pk).estado, 'terminado')
+
+
+class EstadisticasDashboardTest(TestCase):
+	def setUp(self):
+		from django.core.cache import cache
+		cache.clear()
+		self.user = User.objects.create_user(username='panel', password='s3cret')
+		cliente = Cliente.objects.create(nombre='Stats')
+		material = Inventario.objects.create(nombre='Sobre', cantidad=1, cantidad_minima=5)
+		for estado in ('pendiente', 'pendiente', 'en_produccion', 'terminado'):
+			Pedido.objects.create(
+				cliente=cliente, inventario=material, cantidad=1, descripcion='x',
+				precio_unitario=Decimal('1.00'), descuento=Decimal('0'), fecha_entrega='2025-10-30', estado=estado,
+			)
+
+	def test_una_consulta_por_modelo(self):
+		from .estadisticas import calcular_estadisticas
+		with self.assertNumQueries(8):
+			stats = calcular_estadisticas()
+		self.assertEqual(stats['pedidos'], {'total': 4, 'pendientes': 2, 'en_produccion': 1, 'terminados': 1, 'hoy': 4})
+		self.assertEqual(stats['inventario'], {'total_materiales': 1, 'bajo_stock': 1})
+
+	def test_api_y_dashboard_usan_el_mismo_servicio(self):
+		self.client.login(username='panel', password='s3cret')
+		api = self.client.get(reverse('core:api_dashboard_stats')).json()
+		self.assertEqual(api['pedidos']['pendientes'], 2)
+		resp = self.client.get(reverse('core:dashboard'))
+		self.assertEqual(resp.context['pedidos_pendientes'], 2)
+		self.assertEqual(resp.context['materiales_bajo_stock'], 1)
+
+
+class EstadisticasCacheTest(TestCase):
+	def setUp(self):
+		from django.core.cache import cache
+		cache.clear()
+		self.cliente = Cliente.objects.create(nombre='Cache')
+
+	def test_snapshot_se_reutiliza_e_invalida_al_guardar(self):
+		from .estadisticas import estadisticas_dashboard, metricas_cache
+		self.assertEqual(estadisticas_dashboard()['clientes']['total'], 1)
+		# Sólo se leen las versiones.
+		with self.assertNumQueries(1):
+			estadisticas_dashboard()
+		self.assertEqual(metricas_cache(), {'aciertos': 1, 'fallos': 1})
+
+		with self.captureOnCommitCallbacks(execute=True):
+			Cliente.objects.create(nombre='Nuevo')
+		self.assertEqual(estadisticas_dashboard()['clientes']['total'], 2)
+		self.assertEqual(metricas_cache()['fallos'], 2)
+
+	def test_version_cambiada_por_otro_proceso_invalida(self):
+		from django.db.models import F
+		from .estadisticas import estadisticas_dashboard
+		from .models import VersionDatos
+		self.assertEqual(estadisticas_dashboard()['clientes']['total'], 1)
+		# Otro proceso guarda un cliente: su caché local no llega aquí, la versión en la base sí.
+		Cliente.objects.bulk_create([Cliente(nombre='Otro proceso')])
+		VersionDatos.objects.filter(modelo='core.cliente').update(version=F('version') + 1)
+		self.assertEqual(estadisticas_dashboard()['clientes']['total'], 2)
+
+	def test_cambios_masivos_invalidan(self):
+		from .estadisticas import estadisticas_dashboard
+		material = Inventario.objects.create(nombre='Bond', cantidad=50, cantidad_minima=10)
+		with self.captureOnCommitCallbacks(execute=True):
+			pass
+		self.assertEqual(estadisticas_dashboard()['inventario']['bajo_stock'], 0)
+		with self.captureOnCommitCallbacks(execute=True):
+			MovimientoInventario.objects.create(inventario=material, tipo='salida', cantidad=45, motivo='x')
+		self.assertEqual(estadisticas_dashboard()['inventario']['bajo_stock'], 1)
+
+
+class EstadisticaDiariaTest(TestCase):
+	def setUp(self):
+		self.cliente = Cliente.objects.create(nombre='Rollup')
+		self.material = Inventario.objects.create(nombre='Cartón', cantidad=100, precio_unitario=Decimal('3.00'))
+		self.proveedor = Proveedor.objects.create(nombre='Prov')
+
+	def _pedido(self, estado='pendiente', cantidad=2):
+		return Pedido.objects.create(
+			cliente=self.cliente, inventario=self.material, cantidad=cantidad, descripcion='x',
+			precio_unitario=Decimal('3.00'), descuento=Decimal('0'), fecha_entrega='2025-10-30', estado=estado,
+		)
+
+	def _filas(self):
+		from .models import EstadisticaDiaria
+		return sorted(
+			(f.entidad, f.estado, f.cantidad, f.unidades, f.monto)
+			for f in EstadisticaDiaria.objects.all() if f.cantidad
+		)
+
+	def test_mantenimiento_incremental_coincide_con_reconstruccion(self):
+		from .resumenes import reconstruir_todo
+		p1 = self._pedido()
+		p2 = self._pedido(cantidad=5)
+		p1.estado = 'terminado'
+		p1.save()
+		p2.cantidad = 4
+		p2.save()
+		self._pedido().delete()
+		Compra.objects.create(proveedor=self.proveedor, inventario=self.material, cantidad=3, precio_unitario=Decimal('2.50'))
+		incremental = self._filas()
+		reconstruir_todo()
+		self.assertEqual(incremental, self._filas())
+		self.assertIn(('pedido', 'pendiente', 1, 4, Decimal('12.00')), incremental)
+
+	def test_comando_sin_argumentos_reconstruye_todo(self):
+		from django.core.management import CommandError, call_command
+		self._pedido()
+		Compra.objects.create(proveedor=self.proveedor, inventario=self.material, cantidad=3, precio_unitario=Decimal('2.50'))
+		incremental = self._filas()
+		salida = StringIO()
+		call_command('rebuild_rollups', stdout=salida)
+		self.assertIn('2 filas', salida.getvalue())
+		self.assertEqual(incremental, self._filas())
+		call_command('rebuild_rollups', 'compra', stdout=StringIO())
+		with self.assertRaisesMessage(CommandError, 'Entidades desconocidas: ventas'):
+			call_command('rebuild_rollups', 'ventas')
+
+	def test_reportes_compras_leen_del_resumen(self):
+		from .resumenes import resumen_compras
+		Compra.objects.create(proveedor=self.proveedor, inventario=self.material, cantidad=3, precio_unitario=Decimal('2.00'))
+		Compra.objects.create(proveedor=self.proveedor, inventario=self.material, cantidad=1, precio_unitario=Decimal('1.00'), estado='ordenado')
+		with self.assertNumQueries(1):
+			resumen = resumen_compras()
+		self.assertEqual(resumen['total'], 2)
+		self.assertEqual(resumen['ordenadas'], 1)
+		self.assertEqual(resumen['costo_total'], Decimal('7.00'))
+
+
+@override_settings(LISTADOS_POR_PAGINA=2)
+class PaginacionCursorTest(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='paginador', password='secret123')
+		self.client.login(username='paginador', password='secret123')
+		for i in range(5):
+			Cliente.objects.create(nombre=f'Cliente {i}')
+
+	def _recorrer(self, url):
+		vistos = []
+		while url:
+			resp = self.client.get(url)
+			pagina = resp.context['pagina']
+			vistos.extend(c.nombre for c in pagina)
+			url = reverse('core:clientes_lista') + pagina.url_siguiente if pagina.hay_siguiente else None
+		return vistos
+
+	def test_recorrido_completo_sin_duplicados(self):
+		vistos = self._recorrer(reverse('core:clientes_lista'))
+		self.assertEqual(vistos, [f'Cliente {i}' for i in range(4, -1, -1)])
+
+	def test_insercion_concurrente_no_desplaza_paginas(self):
+		resp = self.client.get(reverse('core:clientes_lista'))
+		pagina = resp.context['pagina']
+		Cliente.objects.create(nombre='Cliente nuevo')
+		resp = self.client.get(reverse('core:clientes_lista') + pagina.url_siguiente)
+		self.assertEqual([c.nombre for c in resp.context['pagina']], ['Cliente 2', 'Cliente 1'])
+		anterior = resp.context['pagina'].url_anterior
+		resp = self.client.get(reverse('core:clientes_lista') + anterior)
+		self.assertEqual([c.nombre for c in resp.context['pagina']], ['Cliente 4', 'Cliente 3'])
+
+	def test_filtros_se_conservan_en_los_enlaces(self):
+		resp = self.client.get(reverse('core:clientes_lista'), {'q': 'Cliente'})
+		self.assertIn('q=Cliente', resp.context['pagina'].url_siguiente)
+
+	def test_cursor_invalido_vuelve_al_inicio(self):
+		resp = self.client.get(reverse('core:clientes_lista'), {'cursor': 'xx!', 'dir': 'ant'})
+		self.assertEqual([c.nombre for c in resp.context['pagina']], ['Cliente 4', 'Cliente 3'])
+
+
+class BusquedaTextoTest(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='buscador', password='secret123')
+		self.client.login(username='buscador', password='secret123')
+		self.ana = Cliente.objects.create(nombre='Ana Pérez', email='ana@imprenta.bo')
+		self.beto = Cliente.objects.create(nombre='Beto Anaya')
+		self.material = Inventario.objects.create(nombre='Papel couché', cantidad=10, precio_unitario=Decimal('1.00'))
+
+	def _pedido(self, cliente, descripcion):
+		return Pedido.objects.create(
+			cliente=cliente, inventario=self.material, cantidad=1, descripcion=descripcion,
+			precio_unitario=Decimal('1.00'), descuento=Decimal('0'), fecha_entrega='2030-01-01',
+		)
+
+	def test_prefijo_y_acentos(self):
+		from . import busqueda
+		self.assertEqual(set(busqueda.filtrar(Cliente.objects.all(), 'pere')), {self.ana})
+		self.assertEqual(set(busqueda.filtrar(Cliente.objects.all(), 'ana')), {self.ana, self.beto})
+		self.assertEqual(busqueda.buscar(Cliente.objects.all(), 'ana perez'), [self.ana.pk])
+
+	def test_indice_sigue_cambios_de_dependencias(self):
+		from . import busqueda
+		pedido = self._pedido(self.beto, 'Tarjetas de visita')
+		self.assertEqual(list(busqueda.filtrar(Pedido.objects.all(), 'couche tarjetas')), [pedido])
+		self.beto.nombre = 'Roberto Quispe'
+		self.beto.save()
+		self.assertEqual(list(busqueda.filtrar(Pedido.objects.all(), 'quispe')), [pedido])
+		pedido.delete()
+		self.assertEqual(list(busqueda.filtrar(Pedido.objects.all(), 'quispe')), [])
+
+	def test_dependientes_solo_se_reindexan_si_cambia_el_nombre(self):
+		self._pedido(self.beto, 'Tarjetas de visita')
+
+		def consultas_indice_pedidos(instancia, **kwargs):
+			with CaptureQueriesContext(connection) as consultas:
+				instancia.save(**kwargs)
+			return [q['sql'] for q in consultas.captured_queries if 'busqueda_pedido' in q['sql']]
+
+		beto = Cliente.objects.get(pk=self.beto.pk)
+		beto.telefono = '70000000'
+		self.assertEqual(consultas_indice_pedidos(beto), [])
+		self.material.cantidad = 3
+		self.assertEqual(consultas_indice_pedidos(self.material, update_fields=['cantidad']), [])
+		self.assertEqual(consultas_indice_pedidos(self.material), [])
+		beto.nombre = 'Roberto'
+		self.assertTrue(consultas_indice_pedidos(beto))
+		self.assertEqual(consultas_indice_pedidos(beto), [])
+
+	def test_listado_usa_el_indice(self):
+		self._pedido(self.ana, 'Afiches')
+		self._pedido(self.beto, 'Volantes')
+		resp = self.client.get(reverse('core:pedidos_lista'), {'q': 'volan'})
+		self.assertEqual([p.descripcion for p in resp.context['pedidos']], ['Volantes'])
+
+	@override_settings(BUSQUEDA_BACKEND='core.busqueda.BackendLike')
+	def test_backend_like(self):
+		from . import busqueda
+		self.assertEqual(list(busqueda.filtrar(Cliente.objects.all(), 'anaya')), [self.beto])
+		self.assertEqual(busqueda.buscar(Cliente.objects.all(), 'ana'), [self.beto.pk, self.ana.pk])
+
+	def test_reconstruir_indice(self):
+		from django.core.management import call_command
+		from . import busqueda
+		self._pedido(self.ana, 'Afiches')
+		out = StringIO()
+		call_command('rebuild_search_index', stdout=out)
+		self.assertIn('pedido: 1 documentos', out.getvalue())
+		self.assertEqual(busqueda.filtrar(Pedido.objects.all(), 'afiches').count(), 1)
+
+
+class AutocompletarTest(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='tipeador', password='secret123')
+		self.client.login(username='tipeador', password='secret123')
+		for i in range(30):
+			Cliente.objects.create(nombre=f'Gráfica Norte {i:02d}')
+		self.marta = Cliente.objects.create(nombre='Marta Gómez', nit_ci='123')
+		self.agotado = Inventario.objects.create(nombre='Cartulina hilo', cantidad=0, precio_unitario=Decimal('4.50'))
+		self.hilo = Inventario.objects.create(nombre='Papel hilo', cantidad=5, precio_unitario=Decimal('2.00'))
+
+	def _get(self, fuente, **params):
+		resp = self.client.get(reverse('core:api_autocompletar', args=[fuente]), params)
+		self.assertEqual(resp.status_code, 200)
+		return resp.json()
+
+	def test_prefijo_limite_y_cursor(self):
+		primera = self._get('clientes', q='graf nor', limite=20)
+		self.assertEqual(len(primera['resultados']), 20)
+		segunda = self._get('clientes', q='graf nor', limite=20, cursor=primera['siguiente'])
+		self.assertEqual(len(segunda['resultados']), 10)
+		self.assertIsNone(segunda['siguiente'])
+		ids = {r['id'] for r in primera['resultados'] + segunda['resultados']}
+		self.assertEqual(len(ids), 30)
+		self.assertEqual(self._get('clientes', q='gom')['resultados'][0]['nit_ci'], '123')
+
+	def test_cursor_por_clave_sin_offset(self):
+		from .autocompletar import autocompletar
+		vistos, cursor = [], None
+		while True:
+			with CaptureQueriesContext(connection) as consultas:
+				pagina = autocompletar('clientes', '', limite=7, cursor=cursor)
+			self.assertFalse([q for q in consultas.captured_queries if 'OFFSET' in q['sql']])
+			vistos += [r['texto'] for r in pagina['resultados']]
+			cursor = pagina['siguiente']
+			if cursor is None:
+				break
+		self.assertEqual(vistos, sorted(Cliente.objects.values_list('nombre', flat=True)))
+		# Un cursor ajeno (p. ej. el desplazamiento numérico de antes) vuelve al principio.
+		self.assertEqual(autocompletar('clientes', '', limite=3, cursor='20')['resultados'][0]['texto'], vistos[0])
+		plan = Cliente.objects.order_by('nombre', 'id')[:8].explain()
+		self.assertIn('cliente_nombre_id_idx', plan)
+
+	def test_fuentes_respetan_filtros(self):
+		self.assertEqual([r['id'] for r in self._get('materiales_disponibles', q='hilo')['resultados']], [self.hilo.pk])
+		self.assertEqual({r['id'] for r in self._get('materiales', q='hilo')['resultados']}, {self.hilo.pk, self.agotado.pk})
+		resp = self.client.get(reverse('core:api_autocompletar', args=['nada']))
+		self.assertEqual(resp.status_code, 404)
+
+	def test_formulario_solo_envia_la_opcion_seleccionada(self):
+		from .forms import PedidoForm
+		pedido = Pedido(cliente=self.marta, inventario=self.hilo)
+		html = str(PedidoForm(instance=pedido)['cliente'])
+		self.assertIn('Marta Gómez', html)
+		self.assertNotIn('Gráfica Norte', html)
+		self.assertIn('data-autocompletar="/api/autocompletar/clientes/"', html)
+		html = str(PedidoForm(instance=pedido)['inventario'])
+		self.assertIn('data-precio_unitario="2.00"', html)
+		form = PedidoForm(data={'cliente': 'x', 'inventario': self.hilo.pk})
+		self.assertNotIn('Gráfica Norte', str(form['cliente']))
+
+
+class CatalogoPreciosTest(TestCase):
+	def setUp(self):
+		from django.core.cache import cache
+		cache.clear()
+		self.user = User.objects.create_user(username='catalogo', password='secret123')
+		self.client.login(username='catalogo', password='secret123')
+		self.material = Inventario.objects.create(nombre='Vinilo', cantidad=3, precio_unitario=Decimal('7.00'))
+
+	def _url(self):
+		return reverse('core:api_catalogo', args=['materiales'])
+
+	def test_etag_y_cache_inmutable(self):
+		resp = self.client.get(self._url())
+		self.assertEqual(resp.status_code, 200)
+		datos = resp.json()
+		self.assertEqual(datos['materiales'], [{'id': self.material.pk, 'precio_unitario': '7.00', 'proveedor': None}])
+		self.assertEqual(resp['ETag'], f'"{datos["version"]}"')
+		self.assertIn('no-cache', resp['Cache-Control'])
+		resp = self.client.get(self._url(), {'v': datos['version']})
+		self.assertIn('immutable', resp['Cache-Control'])
+		resp = self.client.get(self._url(), HTTP_IF_NONE_MATCH=f'"{datos["version"]}"')
+		self.assertEqual(resp.status_code, 304)
+
+	def test_version_cambia_con_los_precios(self):
+		version = self.client.get(self._url()).json()['version']
+		with self.captureOnCommitCallbacks(execute=True):
+			self.material.precio_unitario = Decimal('8.00')
+			self.material.save()
+		resp = self.client.get(self._url(), HTTP_IF_NONE_MATCH=f'"{version}"')
+		self.assertEqual(resp.status_code, 200)
+		self.assertNotEqual(resp.json()['version'], version)
+
+	def test_precio_cambiado_en_otro_proceso_cambia_la_version(self):
+		from django.db.models import F
+		from . import catalogo
+		from .models import VersionDatos
+		url = catalogo.url('materiales')
+		# Otro proceso guarda el precio y sube la versión en la base; su caché local no llega aquí.
+		Inventario.objects.filter(pk=self.material.pk).update(precio_unitario=Decimal('9.50'))
+		VersionDatos.objects.filter(modelo='core.inventario').update(version=F('version') + 1)
+		self.assertNotEqual(catalogo.url('materiales'), url)
+		self.assertEqual(catalogo.catalogo('materiales')['items'][0]['precio_unitario'], Decimal('9.50'))
+
+	def test_formulario_referencia_la_version(self):
+		from . import catalogo
+		resp = self.client.get(reverse('core:pedido_crear'))
+		html = resp.content.decode('utf-8')
+		self.assertIn('/api/catalogo/materiales/', html)
+		self.assertIn(catalogo.version('materiales'), html)
+		self.assertNotIn('productos-data-json', html)
+		self.assertEqual(self.client.get(reverse('core:api_catalogo', args=['nada'])).status_code, 404)
+
+
+class CompraFormularioTest(TestCase):
+	def setUp(self):
+		from django.core.cache import cache
+		cache.clear()
+		self.user = User.objects.create_user(username='comprador', password='secret123')
+		self.client.login(username='comprador', password='secret123')
+		self.proveedor = Proveedor.objects.create(nombre='Papelera Andina')
+
+	def _material_nuevo(self, **extra):
+		datos = {
+			'material_nuevo': 'on', 'nombre_material': 'Papel kraft', 'unidad_material': 'resma',
+			'proveedor': self.proveedor.pk, 'cantidad': 4, 'precio_unitario': '12.50', 'estado': 'pendiente',
+		}
+		datos.update(extra)
+		return self.client.post(reverse('core:compra_crear'), datos)
+
+	def test_material_nuevo_se_crea_con_la_compra(self):
+		resp = self._material_nuevo()
+		self.assertRedirects(resp, reverse('core:compras_lista'))
+		compra = Compra.objects.get()
+		self.assertEqual(compra.inventario.nombre, 'Papel kraft')
+		self.assertEqual(compra.usuario_registro, self.user)
+
+	def test_compra_invalida_no_deja_material_huerfano(self):
+		resp = self._material_nuevo(cantidad='')
+		self.assertEqual(resp.status_code, 200)
+		self.assertFalse(Inventario.objects.exists())
+		resp = self._material_nuevo(cantidad_minima_material='muchos')
+		self.assertEqual(resp.status_code, 200)
+		self.assertFalse(Inventario.objects.exists())
+
+	def test_contexto_cacheado_por_version(self):
+		from . import catalogo
+		self.assertEqual(catalogo.contexto_compra()['proveedores_nombres'], ['Papelera Andina'])
+		with self.assertNumQueries(2):
+			catalogo.contexto_compra()
+		with self.captureOnCommitCallbacks(execute=True):
+			Proveedor.objects.create(nombre='Tintas SRL')
+		self.assertEqual(catalogo.proveedores_activos(), ['Papelera Andina', 'Tintas SRL'])
+
+
+class TareasReporteTest(TestCase):
+	def setUp(self):
+		import tempfile
+		self.directorio = tempfile.TemporaryDirectory()
+		self.addCleanup(self.directorio.cleanup)
+		ajustes = override_settings(REPORTES_DIR=self.directorio.name)
+		ajustes.enable()
+		self.addCleanup(ajustes.disable)
+		User.objects.create_user(username='reportes', password='secret123')
+		self.client.login(username='reportes', password='secret123')
+		proveedor = Proveedor.objects.create(nombre='Papelera Andina')
+		material = Inventario.objects.create(nombre='Papel bond', cantidad=10, cantidad_minima=1, unidad='resma', precio_unitario=Decimal('5.00'))
+		Compra.objects.create(proveedor=proveedor, inventario=material, cantidad=3, precio_unitario=Decimal('5.00'))
+
+	def test_solicitudes_identicas_comparten_tarea(self):
+		from .models import Tarea
+		url = reverse('core:compras_reportes')
+		r1 = self.client.get(url, {'export': 'pdf', 'estado': 'pendiente', 'start_date': ''})
+		r2 = self.client.get(url, {'estado': 'pendiente', 'export': 'pdf'})
+		tarea = Tarea.objects.get()
+		self.assertRedirects(r1, reverse('core:tarea_estado', args=[tarea.pk]))
+		self.assertEqual(r1['Location'], r2['Location'])
+		resp = self.client.post(reverse('core:api_reportes_compras'), {'estado': 'recibido'})
+		self.assertEqual(resp.status_code, 202)
+		self.assertEqual(Tarea.objects.count(), 2)
+
+	def test_trabajador_genera_pdf_descargable(self):
+		from django.core.management import call_command
+		from .models import Tarea
+		self.client.get(reverse('core:compras_reportes'), {'export': 'pdf'})
+		tarea = Tarea.objects.get()
+		self.assertEqual(self.client.get(reverse('core:tarea_descargar', args=[tarea.pk])).status_code, 404)
+		call_command('run_workers', '--procesos', '1', '--una-vez', stdout=StringIO())
+		tarea.refresh_from_db()
+		self.assertEqual(tarea.estado, 'completada')
+		datos = self.client.get(reverse('core:api_tarea_estado', args=[tarea.pk])).json()
+		self.assertEqual(datos['url_descarga'], reverse('core:tarea_descargar', args=[tarea.pk]))
+		resp = self.client.get(datos['url_descarga'])
+		self.assertEqual(resp.status_code, 200)
+		self.assertIn('attachment; filename="compras.pdf"', resp['Content-Disposition'])
+		self.assertTrue(b''.join(resp.streaming_content).startswith(b'%PDF'))
+		# Una vez terminada, la misma solicitud vuelve a encolarse.
+		self.client.get(reverse('core:compras_reportes'), {'export': 'pdf'})
+		self.assertEqual(Tarea.objects.filter(estado='pendiente').count(), 1)
+
+	def test_resultado_tardio_no_pisa_la_tarea_recuperada(self):
+		import os
+		from datetime import timedelta
+		from pathlib import Path
+		from django.utils import timezone
+		from . import tareas
+		from .models import Tarea
+		self.client.get(reverse('core:compras_reportes'), {'export': 'pdf'})
+		tarea = tareas.reclamar('lento')
+		Tarea.objects.filter(pk=tarea.pk).update(fecha_inicio=timezone.now() - timedelta(hours=1))
+		self.assertEqual(tareas.recuperar_abandonadas(), (1, 0))
+		with self.assertLogs('core.tareas', 'WARNING'):
+			self.assertFalse(tareas.ejecutar(tarea))
+		tarea.refresh_from_db()
+		self.assertEqual((tarea.estado, tarea.archivo), ('pendiente', ''))
+		self.assertEqual(os.listdir(self.directorio.name), [])
+
+		self.assertTrue(tareas.ejecutar(tareas.reclamar('rapido')))
+		huerfano = Path(self.directorio.name) / 'tarea_99_1_abc.tmp'
+		huerfano.write_bytes(b'x')
+		viejo = (timezone.now() - timedelta(hours=30)).timestamp()
+		os.utime(huerfano, (viejo, viejo))
+		self.assertEqual(tareas.purgar_antiguas(), (0, 1))
+		Tarea.objects.update(fecha_fin=timezone.now() - timedelta(hours=30))
+		for ruta in Path(self.directorio.name).iterdir():
+			os.utime(ruta, (viejo, viejo))
+		self.assertEqual(tareas.purgar_antiguas(), (1, 1))
+		self.assertEqual(os.listdir(self.directorio.name), [])
+
+
+class PdfComprasPorPaginasTest(TestCase):
+	def _lienzo(self):
+		import io
+		from reportlab.lib.pagesizes import A4
+		from reportlab.pdfgen.canvas import Canvas
+		from reportlab.platypus import Frame
+		return Canvas(io.BytesIO(), pagesize=A4), lambda: Frame(24, 24, A4[0] - 48, A4[1] - 48)
+
+	def test_paginar_consume_el_generador_de_a_uno(self):
+		from reportlab.lib.styles import getSampleStyleSheet
+		from reportlab.platypus import Paragraph
+		from .reportes import _paginar
+		estilo = getSampleStyleSheet()['Normal']
+		pendientes = [Paragraph('Título', estilo)]
+		en_bufer = []
+
+		def parrafos():
+			for i in range(300):
+				en_bufer.append(len(pendientes))
+				yield Paragraph(f'Fila {i}', estilo)
+
+		lienzo, marco = self._lienzo()
+		_paginar(lienzo, marco, pendientes, parrafos())
+		self.assertEqual(len(en_bufer), 300)
+		self.assertEqual(max(en_bufer), 0)
+		self.assertEqual(pendientes, [])
+		self.assertGreater(lienzo.getPageNumber(), 3)
+
+	def test_paginar_rechaza_lo_que_no_cabe_en_una_pagina(self):
+		from reportlab.platypus import Spacer
+		from reportlab.platypus.doctemplate import LayoutError
+		from .reportes import _paginar
+		lienzo, marco = self._lienzo()
+		with self.assertRaises(LayoutError):
+			_paginar(lienzo, marco, [Spacer(1, 10)], iter([Spacer(1, 5000)]))
+
+	@override_settings(REPORTES_PDF_MEMORIA_MB=0)
+	def test_pdf_con_varias_tablas(self):
+		import tempfile
+		from . import reportes
+		proveedor = Proveedor.objects.create(nombre='Papelera Andina')
+		material = Inventario.objects.create(nombre='Papel bond', cantidad=10, cantidad_minima=1, unidad='resma', precio_unitario=Decimal('5.00'))
+		Compra.objects.bulk_create(
+			Compra(proveedor=proveedor, inventario=material, cantidad=2, precio_unitario=Decimal('5.00'), costo_total=Decimal('10.00'))
+			for _ in range(reportes.FILAS_POR_TABLA * 3)
+		)
+		self.assertEqual(reportes.filas_en_memoria(), reportes.FILAS_POR_TABLA)
+		self.assertEqual(sum(1 for _ in reportes._tablas_compras({}, 50)), 3)
+		with tempfile.NamedTemporaryFile(suffix='.pdf') as destino:
+			self.assertEqual(reportes.pdf_compras({}, destino.name), 'compras.pdf')
+			contenido = destino.read()
+		self.assertTrue(contenido.startswith(b'%PDF'))
+		self.assertGreaterEqual(contenido.count(b'/Type /Page\n'), 3)
+
+
+class DesglosesComprasTest(TestCase):
+	def setUp(self):
+		User.objects.create_user(username='compras', password='secret123')
+		self.client.login(username='compras', password='secret123')
+		andina = Proveedor.objects.create(nombre='Papelera Andina')
+		tintas = Proveedor.objects.create(nombre='Tintas SRL')
+		papel = Inventario.objects.create(nombre='Papel bond', cantidad=10, cantidad_minima=1, unidad='resma', precio_unitario=Decimal('5.00'))
+		tinta = Inventario.objects.create(nombre='Tinta negra', cantidad=10, cantidad_minima=1, unidad='litro', precio_unitario=Decimal('20.00'))
+		Compra.objects.create(proveedor=andina, inventario=papel, cantidad=3, precio_unitario=Decimal('5.00'))
+		Compra.objects.create(proveedor=andina, inventario=papel, cantidad=1, precio_unitario=Decimal('5.00'), estado='ordenado')
+		Compra.objects.create(proveedor=tintas, inventario=tinta, cantidad=2, precio_unitario=Decimal('20.00'))
+
+	def test_reporte_en_una_consulta_por_dimension(self):
+		from . import reportes
+		with self.assertNumQueries(4):
+			reporte = reportes.reporte_compras(reportes.filtros_compras({}))
+		self.assertEqual(reporte['resumen']['total'], 3)
+		self.assertEqual(reporte['resumen']['pendientes'], 2)
+		self.assertEqual(
+			[(f['nombre'], f['compras'], f['cantidad'], f['costo_total']) for f in reporte['por_proveedor']],
+			[('Tintas SRL', 1, 2, Decimal('40.00')), ('Papelera Andina', 2, 4, Decimal('20.00'))],
+		)
+		self.assertEqual([f['unidad'] for f in reporte['por_material']], ['litro', 'resma'])
+		self.assertEqual(len(reporte['por_mes']), 1)
+		self.assertEqual(reporte['por_mes'][0]['costo_total'], Decimal('60.00'))
+
+	def test_api_y_html_comparten_filtros(self):
+		datos = self.client.get(reverse('core:api_reportes_compras'), {'estado': 'ordenado'}).json()
+		self.assertEqual(datos['filtros']['estado'], 'ordenado')
+		self.assertEqual(datos['resumen']['total'], 1)
+		self.assertEqual([f['nombre'] for f in datos['por_material']], ['Papel bond'])
+		resp = self.client.get(reverse('core:compras_reportes'))
+		self.assertContains(resp, 'Tinta negra')
+		self.assertContains(resp, 'Por proveedor')
+
+
+class ReporteVentasTest(TestCase):
+	def setUp(self):
+		from django.core.cache import cache
+		from .models import Producto, Trabajo
+		cache.clear()
+		User.objects.create_user(username='ventas', password='secret123')
+		self.client.login(username='ventas', password='secret123')
+		self.cliente = Cliente.objects.create(nombre='Librería Sol')
+		otro = Cliente.objects.create(nombre='Colegio Andes')
+		material = Inventario.objects.create(nombre='Papel', cantidad=100, precio_unitario=Decimal('2.00'))
+		producto = Producto.objects.create(nombre='Tarjetas', tipo='tarjetas', precio_unitario=Decimal('1.00'))
+		comunes = {'descripcion': 'x', 'fecha_entrega': '2025-10-30'}
+		Pedido.objects.create(cliente=self.cliente, inventario=material, cantidad=10, precio_unitario=Decimal('2.00'), descuento=Decimal('10'), **comunes)
+		comunes['descuento'] = Decimal('0')
+		Pedido.objects.create(cliente=otro, inventario=material, cantidad=5, precio_unitario=Decimal('2.00'), estado='cancelado', **comunes)
+		Trabajo.objects.create(cliente=self.cliente, producto=producto, cantidad=100, precio_unitario=Decimal('1.00'), **comunes)
+
+	def test_ingresos_descuentos_y_unidades(self):
+		from . import ventas
+		reporte = ventas.reporte_ventas(ventas.filtros_ventas({}))
+		total = reporte['resumen']['total']
+		self.assertEqual((total['ventas'], total['unidades']), (2, 110))
+		self.assertEqual(total['ingresos'], Decimal('118.00'))
+		self.assertEqual(total['descuentos'], Decimal('2.00'))
+		self.assertEqual([(f['nombre'], f['ventas']) for f in reporte['por_cliente']], [('Librería Sol', 2)])
+		self.assertEqual([f['nombre'] for f in reporte['por_material']], ['Papel'])
+		self.assertEqual([f['nombre'] for f in reporte['por_producto']], ['Tarjetas'])
+		self.assertEqual(len(reporte['por_periodo']), 1)
+		solo_pedidos = ventas.reporte_ventas(ventas.filtros_ventas({'tipo': 'pedido', 'periodo': 'anio', 'cliente': 'x'}))
+		self.assertEqual(solo_pedidos['filtros']['periodo'], 'mes')
+		self.assertEqual(solo_pedidos['resumen']['total']['ingresos'], Decimal('18.00'))
+
+	def test_cache_por_filtros_se_invalida_con_cambios(self):
+		from . import ventas
+		filtros = ventas.filtros_ventas({'tipo': 'pedido'})
+		ventas.reporte_ventas(filtros)
+		with self.assertNumQueries(1):
+			ventas.reporte_ventas(ventas.filtros_ventas({'tipo': 'pedido', 'estado': ''}))
+		with self.captureOnCommitCallbacks(execute=True):
+			Pedido.objects.filter(cliente=self.cliente).update(estado='entregado')
+			from .signals import cambios_masivos
+			cambios_masivos.send(sender=Pedido, pks=None)
+		self.assertEqual(ventas.reporte_ventas(filtros)['resumen']['total']['ventas'], 1)
+		self.assertNotEqual(ventas.clave_cache(filtros), ventas.clave_cache(ventas.filtros_ventas({'tipo': 'trabajo'})))
+
+	def test_exportar_csv_y_pdf(self):
+		from .models import Tarea
+		resp = self.client.get(reverse('core:ventas_reportes'), {'export': 'csv'})
+		self.assertEqual(resp['Content-Type'], 'text/csv; charset=utf-8')
+		lineas = resp.content.decode('utf-8').splitlines()
+		self.assertEqual(lineas[0], 'seccion,clave,nombre,ventas,unidades,ingresos,descuentos')
+		self.assertIn('por_producto', resp.content.decode('utf-8'))
+		resp = self.client.get(reverse('core:ventas_reportes'), {'export': 'pdf'})
+		tarea = Tarea.objects.get(tipo='ventas_pdf')
+		self.assertRedirects(resp, reverse('core:tarea_estado', args=[tarea.pk]))
+		import tempfile
+		from . import ventas
+		from unittest import mock
+		# El PDF se arma en otro proceso: no debe depender de la caché de reportes.
+		with tempfile.NamedTemporaryFile(suffix='.pdf') as destino, mock.patch.object(ventas, 'cache') as cache:
+			self.assertEqual(ventas.pdf_ventas(tarea.parametros, destino.name), 'ventas.pdf')
+			self.assertTrue(destino.read().startswith(b'%PDF'))
+		self.assertFalse(cache.method_calls)
+		self.assertContains(self.client.get(reverse('core:ventas_reportes')), 'Librería Sol')
+		self.assertEqual(self.client.get(reverse('core:api_reportes_ventas')).json()['resumen']['total']['ventas'], 2)
+
+
+class ExportacionListadosTest(TestCase):
+	def setUp(self):
+		User.objects.create_user(username='exporta', password='secret123')
+		self.client.login(username='exporta', password='secret123')
+		proveedor = Proveedor.objects.create(nombre='Papelera Andina')
+		papel = Inventario.objects.create(nombre='Papel bond', cantidad=10, cantidad_minima=1, unidad='resma', precio_unitario=Decimal('5.00'))
+		Compra.objects.create(proveedor=proveedor, inventario=papel, cantidad=3, precio_unitario=Decimal('5.00'))
+		Compra.objects.create(proveedor=proveedor, inventario=papel, cantidad=1, precio_unitario=Decimal('5.00'), estado='ordenado')
+
+	def _contenido(self, resp):
+		return b''.join(resp.streaming_content).decode('utf-8')
+
+	def test_csv_respeta_filtros(self):
+		resp = self.client.get(reverse('core:compras_lista'), {'estado': 'ordenado', 'export': 'csv'})
+		self.assertTrue(resp.streaming)
+		self.assertEqual(resp['Content-Type'], 'text/csv; charset=utf-8')
+		lineas = self._contenido(resp).splitlines()
+		self.assertEqual(lineas[0].split(',')[:3], ['id', 'proveedor', 'material'])
+		self.assertEqual(len(lineas), 2)
+		self.assertIn('Papelera Andina,Papel bond,1,5.00', lineas[1])
+
+	def test_csv_neutraliza_formulas(self):
+		Proveedor.objects.create(nombre='=HYPERLINK("http://x","y")', telefono='+59170000000')
+		Proveedor.objects.create(nombre='@SUM(A1)', telefono='-1')
+		lineas = self._contenido(self.client.get(reverse('core:proveedores_lista'), {'export': 'csv'})).splitlines()
+		contenido = '\n'.join(lineas[1:])
+		self.assertIn('"\'=HYPERLINK(""http://x"",""y"")",,\'+59170000000', contenido)
+		self.assertIn("'@SUM(A1)", contenido)
+		self.assertIn(",'-1,", contenido)
+		self.assertNotIn(',=', contenido)
+
+	def test_ndjson_con_busqueda(self):
+		import json
+		Cliente.objects.create(nombre='Librería Sol', nit_ci='123')
+		Cliente.objects.create(nombre='Colegio Andes')
+		resp = self.client.get(reverse('core:clientes_lista'), {'q': 'librer', 'export': 'ndjson'})
+		self.assertEqual(resp['Content-Type'], 'application/x-ndjson')
+		filas = [json.loads(linea) for linea in self._contenido(resp).splitlines()]
+		self.assertEqual([(f['nombre'], f['nit_ci']) for f in filas], [('Librería Sol', '123')])
+
+	@override_settings(EXPORTACION_LOTE=1)
+	def test_todas_las_filas_sin_paginar(self):
+		resp = self.client.get(reverse('core:inventario_lista'), {'export': 'csv', 'cursor': 'basura'})
+		self.assertEqual(len(self._contenido(resp).splitlines()), 2)
+		resp = self.client.get(reverse('core:proveedores_lista'), {'export': 'ndjson'})
+		self.assertIn('"activo":true', self._contenido(resp))
+		self.assertContains(self.client.get(reverse('core:pedidos_lista')), 'export=csv')
+
+
+class StockHistoricoTest(TestCase):
+	def setUp(self):
+		from datetime import datetime
+		from django.utils import timezone
+		User.objects.create_user(username='almacen', password='secret123')
+		self.client.login(username='almacen', password='secret123')
+		self.cartulina = Inventario.objects.create(nombre='Cartulina', cantidad=0, precio_unitario=Decimal('1.00'))
+		self.tinta = Inventario.objects.create(nombre='Tinta', cantidad=0, precio_unitario=Decimal('1.00'))
+		self.dia = lambda d, h=12: timezone.make_aware(datetime(2025, 3, d, h))
+		for material, tipo, cantidad, dia in [
+			(self.cartulina, 'entrada', 100, 1), (self.cartulina, 'salida', 30, 2), (self.cartulina, 'ajuste', 50, 3),
+			(self.cartulina, 'entrada', 5, 4), (self.tinta, 'entrada', 7, 2),
+		]:
+			mov = MovimientoInventario.objects.create(inventario=material, tipo=tipo, cantidad=cantidad, motivo='x')
+			MovimientoInventario.objects.filter(pk=mov.pk).update(fecha=self.dia(dia))
+
+	def _cantidades(self, momento, ids=None):
+		from . import stock
+		return {pk: cantidad for pk, (cantidad, _, _) in stock.stock_en(momento, ids).items()}
+
+	def test_reproduce_el_libro_con_ajustes(self):
+		self.assertEqual(self._cantidades(self.dia(1, 23)), {self.cartulina.pk: 100, self.tinta.pk: 0})
+		self.assertEqual(self._cantidades(self.dia(2, 23))[self.cartulina.pk], 70)
+		self.assertEqual(self._cantidades(self.dia(3, 23))[self.cartulina.pk], 50)
+		self.assertEqual(self._cantidades(self.dia(5), [self.cartulina.pk]), {self.cartulina.pk: 55})
+
+	def test_puntos_control_acortan_la_reproduccion(self):
+		from django.core.management import call_command
+		from . import stock
+		from .models import PuntoControlStock
+		call_command('checkpoint_stock', '--hasta', '2025-03-02T18:00:00', stdout=StringIO())
+		self.assertEqual(PuntoControlStock.objects.count(), 2)
+		self.assertEqual(stock.crear_puntos_control(self.dia(2, 18)), [])
+		cantidad, punto, reproducidos = stock.stock_en(self.dia(5))[self.cartulina.pk]
+		self.assertEqual((cantidad, punto, reproducidos), (55, self.dia(2, 18), 2))
+		self.assertEqual(stock.stock_en(self.dia(1, 23))[self.cartulina.pk], (100, None, 1))
+
+	def test_corte_futuro_o_reciente_se_rechaza(self):
+		from datetime import timedelta
+		from django.core.management import CommandError, call_command
+		from django.utils import timezone
+		from . import stock
+		from .models import PuntoControlStock
+		with self.assertRaises(CommandError):
+			call_command('checkpoint_stock', '--hasta', '2999-01-01T00:00:00', stdout=StringIO())
+		with self.assertRaises(ValueError):
+			stock.crear_puntos_control(timezone.now() - timedelta(seconds=10))
+		self.assertFalse(PuntoControlStock.objects.exists())
+		# Un movimiento recién insertado queda después del corte por defecto.
+		MovimientoInventario.objects.create(inventario=self.tinta, tipo='entrada', cantidad=1, motivo='x')
+		stock.crear_puntos_control()
+		self.assertEqual(PuntoControlStock.objects.get(inventario=self.tinta).cantidad, 7)
+		self.assertEqual(stock.stock_en(timezone.now())[self.tinta.pk][0], 8)
+
+	def test_stock_inicial_distinto_de_cero(self):
+		from django.core.management import call_command
+		from . import stock
+		sobres = Inventario.objects.create(nombre='Sobres', cantidad=40, precio_unitario=Decimal('1.00'))
+		MovimientoInventario.objects.filter(inventario=sobres).update(fecha=self.dia(1))
+		for tipo, cantidad, dia in [('entrada', 10, 2), ('salida', 15, 4)]:
+			mov = MovimientoInventario.objects.create(inventario=sobres, tipo=tipo, cantidad=cantidad, motivo='x')
+			MovimientoInventario.objects.filter(pk=mov.pk).update(fecha=self.dia(dia))
+		self.assertEqual(self._cantidades(self.dia(1, 23), [sobres.pk]), {sobres.pk: 40})
+		self.assertEqual(self._cantidades(self.dia(3), [sobres.pk]), {sobres.pk: 50})
+		call_command('checkpoint_stock', '--hasta', '2025-03-03T00:00:00', stdout=StringIO())
+		self.assertEqual(stock.stock_en(self.dia(5), [sobres.pk])[sobres.pk], (35, self.dia(3, 0), 1))
+
+	def test_api_por_fecha(self):
+		url = reverse('core:api_stock_historico')
+		datos = self.client.get(url, {'momento': '2025-03-02', 'materiales': f'{self.cartulina.pk}'}).json()
+		self.assertEqual([(f['nombre'], f['cantidad']) for f in datos['stock']], [('Cartulina', 70)])
+		self.assertEqual(self.client.get(url, {'momento': 'ayer'}).status_code, 400)
+		self.assertEqual(self.client.get(url, {'materiales': '1,x'}).status_code, 400)
+
+
+class ConciliacionStockTest(TestCase):
+	def setUp(self):
+		self.papel = Inventario.objects.create(nombre='Papel', cantidad=0, precio_unitario=Decimal('1.00'))
+		self.tinta = Inventario.objects.create(nombre='Tinta', cantidad=0, precio_unitario=Decimal('1.00'))
+		self.sobres = Inventario.objects.create(nombre='Sobres', cantidad=40, precio_unitario=Decimal('1.00'))
+		for material, tipo, cantidad in [
+			(self.papel, 'entrada', 100), (self.papel, 'ajuste', 80), (self.papel, 'salida', 5),
+			(self.tinta, 'entrada', 10), (self.tinta, 'salida', 3),
+		]:
+			MovimientoInventario.objects.create(inventario=material, tipo=tipo, cantidad=cantidad, motivo='x')
+		# Ediciones directas (admin) que el libro no registra.
+		Inventario.objects.filter(pk=self.papel.pk).update(cantidad=90)
+
+	def test_esperado_respeta_el_ultimo_ajuste(self):
+		from . import stock
+		self.assertEqual(stock.esperado_por_material(), {self.papel.pk: 75, self.tinta.pk: 7, self.sobres.pk: 40})
+		self.assertEqual(stock.discrepancias(), [(self.papel.pk, 'Papel', 90, 75)])
+
+	def test_comando_informa_y_corrige(self):
+		from django.core.management import call_command
+		salida = StringIO()
+		call_command('reconcile_stock', stdout=salida)
+		self.assertIn('Material #%d Papel: 90 -> 75 (-15)' % self.papel.pk, salida.getvalue())
+		self.assertNotIn('sin movimientos', salida.getvalue())
+		self.papel.refresh_from_db()
+		self.assertEqual(self.papel.cantidad, 90)
+
+		call_command('reconcile_stock', '--corregir', stdout=StringIO())
+		self.papel.refresh_from_db()
+		self.assertEqual(self.papel.cantidad, 75)
+		self.assertTrue(MovimientoInventario.objects.filter(inventario=self.papel, tipo='ajuste', cantidad=75).exists())
+		self.sobres.refresh_from_db()
+		self.assertEqual(self.sobres.cantidad, 40)
+		from . import stock
+		self.assertEqual(stock.discrepancias(), [])
+
+	def test_stock_inicial_no_se_pierde_al_corregir(self):
+		from django.core.management import call_command
+		MovimientoInventario.objects.create(inventario=self.sobres, tipo='entrada', cantidad=10, motivo='x')
+		self.assertEqual(
+			list(self.sobres.movimientos.order_by('fecha', 'id').values_list('tipo', 'cantidad', 'motivo')),
+			[('ajuste', 40, 'Saldo inicial'), ('entrada', 10, 'x')],
+		)
+		salida = StringIO()
+		call_command('reconcile_stock', '--corregir', stdout=salida)
+		self.assertNotIn('Sobres', salida.getvalue())
+		self.sobres.refresh_from_db()
+		self.assertEqual(self.sobres.cantidad, 50)
+		# Sin stock inicial no hay nada que anotar.
+		self.assertFalse(self.tinta.movimientos.filter(motivo='Saldo inicial').exists())
+
+
+@override_settings(PLANIFICACION_AUTOMATICA=False)
+class PlanificacionProduccionTest(TestCase):
+	def setUp(self):
+		from django.utils import timezone
+		from datetime import datetime
+		self.ana = User.objects.create_user(username='ana', password='secret123')
+		self.beto = User.objects.create_user(username='beto', password='secret123')
+		self.lunes = timezone.make_aware(datetime(2025, 3, 3, 8))
+		cliente = Cliente.objects.create(nombre='Cliente Plan')
+		material = Inventario.objects.create(nombre='Papel', cantidad=10, precio_unitario=Decimal('1.00'))
+		self.producciones = {}
+		for clave, entrega, horas in [('a', '2025-03-03', 8), ('b', '2025-03-04', 4), ('c', '2025-03-04', 14), ('d', '2025-03-10', 2)]:
+			pedido = Pedido.objects.create(
+				cliente=cliente, inventario=material, cantidad=1, descripcion=clave,
+				precio_unitario=Decimal('1.00'), descuento=Decimal('0'), fecha_entrega=entrega,
+			)
+			pedido.produccion.tiempo_estimado = Decimal(horas)
+			pedido.produccion.save()
+			self.producciones[clave] = pedido.produccion
+
+	def momento(self, dia, hora):
+		from django.utils import timezone
+		from datetime import datetime
+		return timezone.make_aware(datetime(2025, 3, dia, hora))
+
+	def colas(self):
+		from . import planificacion
+		return {
+			empleado.username: [(f.produccion.pedido.descripcion, f.inicio, f.fin, f.atrasada) for f in filas]
+			for empleado, filas in planificacion.plan_por_empleado().items()
+		}
+
+	def test_avanzar_salta_noches_y_fines_de_semana(self):
+		from . import planificacion
+		calendario = planificacion.JORNADA_POR_DEFECTO
+		self.assertEqual(planificacion.avanzar(self.momento(7, 16), 4, calendario), (self.momento(7, 16), self.momento(10, 10)))
+		self.assertEqual(planificacion.avanzar(self.momento(8, 9), 1, calendario), (self.momento(10, 8), self.momento(10, 9)))
+		self.assertEqual(planificacion.horas_laborables(self.momento(7, 11), self.momento(10, 9), calendario), Decimal('6.00'))
+
+	def test_reparte_por_entrega_y_carga(self):
+		from . import planificacion
+		planificacion.planificar(self.lunes)
+		self.assertEqual(self.colas(), {
+			'ana': [('a', self.momento(3, 8), self.momento(3, 18), False), ('d', self.momento(4, 8), self.momento(4, 10), False)],
+			'beto': [('b', self.momento(3, 8), self.momento(3, 12), False), ('c', self.momento(3, 14), self.momento(5, 10), True)],
+		})
+		self.producciones['c'].refresh_from_db()
+		self.assertEqual(self.producciones['c'].empleado, self.beto)
+
+	def test_replanificar_solo_toca_la_cola_afectada(self):
+		from . import planificacion
+		from .models import PlanProduccion
+		planificacion.planificar(self.lunes)
+		filas_beto = list(PlanProduccion.objects.filter(empleado=self.beto).values_list('pk', 'fecha_calculo'))
+
+		Produccion = type(self.producciones['a'])
+		Produccion.objects.filter(pk=self.producciones['a'].pk).update(estado='terminado')
+		planificacion.replanificar(self.producciones['a'].pk, self.lunes)
+		self.assertEqual(self.colas()['ana'], [('d', self.momento(3, 8), self.momento(3, 10), False)])
+		self.assertEqual(list(PlanProduccion.objects.filter(empleado=self.beto).values_list('pk', 'fecha_calculo')), filas_beto)
+
+		pedido = Pedido.objects.create(
+			cliente=self.producciones['a'].pedido.cliente, inventario=self.producciones['a'].pedido.inventario, cantidad=1,
+			descripcion='e', precio_unitario=Decimal('1.00'), descuento=Decimal('0'), fecha_entrega='2025-03-06',
+		)
+		Produccion.objects.filter(pedido=pedido).update(tiempo_estimado=1)
+		planificacion.replanificar(pedido.produccion.pk, self.lunes)
+		self.assertEqual([fila[0] for fila in self.colas()['ana']], ['e', 'd'])
+		self.assertEqual(list(PlanProduccion.objects.filter(empleado=self.beto).values_list('pk', 'fecha_calculo')), filas_beto)
+
+	def test_fin_de_colas_lee_el_plan_guardado(self):
+		from datetime import timedelta
+		from django.db.models import F
+		from . import planificacion
+		from .models import PlanProduccion
+		planificacion.planificar(self.lunes)
+		self.assertEqual(planificacion.fin_de_colas(), {self.ana.pk: self.momento(4, 10), self.beto.pk: self.momento(5, 10)})
+		# Lo que otro proceso replanifica se ve en la siguiente lectura.
+		PlanProduccion.objects.filter(empleado=self.beto).update(fin=F('fin') + timedelta(days=2))
+		PlanProduccion.objects.filter(empleado=self.ana).delete()
+		with self.assertNumQueries(1):
+			self.assertEqual(planificacion.fin_de_colas(), {self.beto.pk: self.momento(7, 10)})
+
+	@override_settings(PLANIFICACION_AUTOMATICA=True)
+	def test_guardar_produccion_replanifica_y_panel_lo_muestra(self):
+		from .models import PlanProduccion
+		with self.captureOnCommitCallbacks(execute=True):
+			self.producciones['b'].save()
+		self.assertEqual(list(PlanProduccion.objects.values_list('produccion__pedido__descripcion', 'empleado__username')), [('b', 'ana')])
+
+		self.client.login(username='ana', password='secret123')
+		resp = self.client.post(reverse('core:produccion_planificar'))
+		self.assertRedirects(resp, reverse('core:produccion_panel'))
+		resp = self.client.get(reverse('core:api_produccion_plan'))
+		self.assertEqual(sorted(e['username'] for e in resp.json()['empleados']), ['ana', 'beto'])
+		self.assertEqual(sum(len(e['cola']) for e in resp.json()['empleados']), 4)
+		self.assertContains(self.client.get(reverse('core:produccion_panel')), 'Recalcular plan')
+
+
+@override_settings(PLANIFICACION_AUTOMATICA=False)
+class EstimacionTiempoTest(TestCase):
+	def setUp(self):
+		from django.core.cache import cache
+		from .models import Produccion
+		cache.clear()
+		self.cliente = Cliente.objects.create(nombre='Cliente Tiempos')
+		self.afiches = Inventario.objects.create(nombre='Afiches', cantidad=0, precio_unitario=Decimal('1.00'))
+		self.sellos = Inventario.objects.create(nombre='Sellos', cantidad=0, precio_unitario=Decimal('1.00'))
+		historial = [(self.afiches, q, Decimal(1) + Decimal('0.01') * q) for q in (100, 200, 300, 400, 500)]
+		historial += [(self.sellos, 10, Decimal('9')), (self.sellos, 20, Decimal('9'))]
+		for material, cantidad, horas in historial:
+			pedido = self.pedido(material, cantidad)
+			Produccion.objects.filter(pedido=pedido).update(estado='terminado', tiempo_real=horas)
+
+	def pedido(self, material, cantidad):
+		return Pedido.objects.create(
+			cliente=self.cliente, inventario=material, cantidad=cantidad, descripcion='x',
+			precio_unitario=Decimal('1.00'), descuento=Decimal('0'), fecha_entrega='2025-03-10',
+		)
+
+	def test_ajuste_vectorizado_por_grupo(self):
+		import numpy as np
+		from . import estimacion
+		coeficientes = estimacion.ajustar(
+			np.array([1, 1, 1, 2, 2]), np.array([1.0, 2.0, 3.0, 5.0, 5.0]), np.array([3.0, 5.0, 7.0, 4.0, 6.0]),
+		)
+		intercepto, por_unidad, muestras, error = coeficientes[1]
+		self.assertAlmostEqual(intercepto, 1.0)
+		self.assertAlmostEqual(por_unidad, 2.0)
+		self.assertEqual((muestras, round(error, 6)), (3, 0.0))
+		self.assertEqual(coeficientes[2], (5.0, 0.0, 2, 1.0))
+
+	def test_reajuste_y_prefill_al_crear_pedido(self):
+		from django.core.management import call_command
+		from .models import CoeficienteTiempo
+		self.assertEqual(self.pedido(self.afiches, 50).produccion.tiempo_estimado, 0)
+
+		salida = StringIO()
+		call_command('fit_tiempos', stdout=salida)
+		self.assertIn('2 coeficientes guardados', salida.getvalue())
+		self.assertEqual(set(CoeficienteTiempo.objects.values_list('inventario_id', flat=True)), {self.afiches.pk, None})
+
+		self.assertEqual(self.pedido(self.afiches, 1000).produccion.tiempo_estimado, Decimal('11.00'))
+		# Sellos tiene pocas muestras: usa la recta general.
+		general = CoeficienteTiempo.objects.get(inventario=None)
+		esperado = (general.intercepto + general.por_unidad * 15).quantize(Decimal('0.01'))
+		self.assertEqual(self.pedido(self.sellos, 15).produccion.tiempo_estimado, esperado)
+		with self.assertNumQueries(1):
+			from . import estimacion
+			estimacion.estimar(self.afiches.pk, 10)
+
+	def test_reajuste_de_otro_proceso_llega_sin_reiniciar(self):
+		from django.db.models import F
+		from . import estimacion
+		from .models import CoeficienteTiempo, VersionDatos
+		estimacion.reajustar()
+		self.assertEqual(estimacion.estimar(self.afiches.pk, 1000), Decimal('11.00'))
+		# ``fit_tiempos`` corre en su propio proceso: reescribe la tabla y sube la versión en la base.
+		CoeficienteTiempo.objects.filter(inventario=self.afiches).update(intercepto=Decimal('3'))
+		self.assertEqual(estimacion.estimar(self.afiches.pk, 1000), Decimal('11.00'))
+		VersionDatos.objects.filter(modelo='core.coeficientetiempo').update(version=F('version') + 1)
+		self.assertEqual(estimacion.estimar(self.afiches.pk, 1000), Decimal('13.00'))
+
+
+@override_settings(PLANIFICACION_AUTOMATICA=False)
+class PromesaEntregaTest(TestCase):
+	def setUp(self):
+		from datetime import datetime
+		from django.core.cache import cache
+		from django.utils import timezone
+		from . import planificacion, versiones
+		from .models import CoeficienteTiempo
+		cache.clear()
+		self.ana = User.objects.create_user(username='ana', password='secret123')
+		self.beto = User.objects.create_user(username='beto', password='secret123')
+		self.lunes = timezone.make_aware(datetime(2025, 3, 3, 8))
+		CoeficienteTiempo.objects.create(inventario=None, intercepto=Decimal('2'), por_unidad=Decimal('0.01'), muestras=10, error=Decimal('0'))
+		versiones.incrementar(CoeficienteTiempo)
+		self.papel = Inventario.objects.create(nombre='Papel', cantidad=50, precio_unitario=Decimal('1.00'))
+		proveedor = Proveedor.objects.create(nombre='Papelera')
+		Compra.objects.create(proveedor=proveedor, inventario=self.papel, cantidad=100, precio_unitario=Decimal('1.00'), fecha_estimada='2025-03-05')
+		Compra.objects.create(proveedor=proveedor, inventario=self.papel, cantidad=900, precio_unitario=Decimal('1.00'), estado='cancelado', fecha_estimada='2025-03-04')
+		pedido = Pedido.objects.create(
+			cliente=Cliente.objects.create(nombre='Cliente'), inventario=self.papel, cantidad=600, descripcion='x',
+			precio_unitario=Decimal('1.00'), descuento=Decimal('0'), fecha_entrega='2025-03-04',
+		)
+		self.produccion = pedido.produccion
+		planificacion.planificar(self.lunes)
+
+	def momento(self, dia, hora, minuto=0):
+		from datetime import datetime
+		from django.utils import timezone
+		return timezone.make_aware(datetime(2025, 3, dia, hora, minuto))
+
+	def test_usa_la_cola_mas_corta_y_las_compras_por_llegar(self):
+		from . import promesas
+		promesa = promesas.prometer(40, self.papel.pk, self.lunes)
+		self.assertEqual((promesa['empleado'], promesa['horas'], promesa['fin_estimado']), ('beto', Decimal('2.40'), self.momento(3, 10, 24)))
+
+		promesa = promesas.prometer(120, self.papel.pk, self.lunes)
+		self.assertEqual((promesa['material_disponible'], promesa['fin_estimado']), (self.momento(5, 0), self.momento(5, 11, 12)))
+		self.assertEqual(str(promesa['fecha_entrega']), '2025-03-05')
+
+		promesa = promesas.prometer(500, self.papel.pk, self.lunes)
+		self.assertEqual((promesa['fecha_entrega'], promesa['faltante']), (None, 350))
+
+	def test_cola_se_mantiene_al_replanificar(self):
+		from . import planificacion, promesas
+		self.assertEqual(planificacion.fin_de_colas(), {self.ana.pk: self.momento(3, 18)})
+		Pedido.objects.filter(pk=self.produccion.pedido_id).update(fecha_entrega='2025-03-03')
+		type(self.produccion).objects.filter(pk=self.produccion.pk).update(estado='terminado')
+		planificacion.replanificar(self.produccion.pk, self.lunes)
+		with self.assertNumQueries(4):
+			promesa = promesas.prometer(10, self.papel.pk, self.lunes)
+		self.assertEqual((promesa['empleado'], promesa['fin_estimado']), ('ana', self.momento(3, 10, 6)))
+
+	def test_plan_cambiado_por_otro_proceso(self):
+		from . import promesas
+		from .models import PlanProduccion
+		self.assertEqual(promesas.prometer(40, self.papel.pk, self.lunes)['empleado'], 'beto')
+		# Otro proceso pasa el trabajo de ana a beto y lo alarga hasta el viernes.
+		PlanProduccion.objects.filter(empleado=self.ana).update(empleado=self.beto, fin=self.momento(7, 18))
+		promesa = promesas.prometer(40, self.papel.pk, self.lunes)
+		self.assertEqual((promesa['empleado'], promesa['fin_estimado']), ('ana', self.momento(3, 10, 24)))
+
+	def test_api(self):
+		self.client.login(username='ana', password='secret123')
+		url = reverse('core:api_promesa_entrega')
+		datos = self.client.get(url, {'cantidad': 120, 'inventario': self.papel.pk}).json()
+		self.assertIn('fecha_entrega', datos)
+		self.assertEqual(self.client.get(url, {'cantidad': 10}).status_code, 200)
+		self.assertEqual(self.client.get(url, {'cantidad': 'x'}).status_code, 400)
+		self.assertEqual(self.client.get(url, {'cantidad': 0}).status_code, 400)
+		self.assertEqual(self.client.get(url, {'cantidad': 1, 'inventario': 9999}).status_code, 400)
+		self.assertContains(self.client.get(reverse('core:pedido_crear')), 'promesa-entrega')
+
+
+class ProduccionLoteTest(TestCase):
+	def setUp(self):
+		from .models import Produccion
+		self.user = User.objects.create_user(username='supervisor', password='secret123')
+		cliente = Cliente.objects.create(nombre='Cliente Lote')
+		material = Inventario.objects.create(nombre='Papel', cantidad=10, precio_unitario=Decimal('1.00'))
+		self.pedidos = [
+			Pedido.objects.create(
+				cliente=cliente, inventario=material, cantidad=2, descripcion=f'p{i}',
+				precio_unitario=Decimal('5.00'), descuento=Decimal('0'), fecha_entrega='2025-03-10',
+			)
+			for i in range(4)
+		]
+		self.ids = [p.produccion.pk for p in self.pedidos]
+		Produccion.objects.filter(pk=self.ids[1]).update(estado='en_proceso')
+		Pedido.objects.filter(pk=self.pedidos[2].pk).update(estado='cancelado')
+
+	def test_iniciar_y_finalizar_en_lote(self):
+		from datetime import timedelta
+		from django.utils import timezone
+		from . import transiciones
+		from .models import PlanProduccion, Produccion
+		inicio = timezone.now()
+		with self.captureOnCommitCallbacks(execute=True):
+			resultados = transiciones.transicionar_producciones([*self.ids, 9999, 'x', self.ids[0]], 'iniciar', inicio)
+		self.assertEqual([r['resultado'] for r in resultados], ['ok', 'sin_cambios', 'rechazado', 'ok', 'no_encontrado', 'invalido'])
+		self.assertEqual(
+			list(Produccion.objects.filter(pk__in=self.ids).order_by('pk').values_list('estado', 'pedido__estado')),
+			[('en_proceso', 'en_produccion'), ('en_proceso', 'pendiente'), ('no_iniciado', 'cancelado'), ('en_proceso', 'en_produccion')],
+		)
+		self.assertEqual(Pedido.objects.get(pk=self.pedidos[0].pk).precio_total, Decimal('10.00'))
+		self.assertEqual(set(PlanProduccion.objects.values_list('produccion_id', flat=True)), {self.ids[0], self.ids[3]})
+
+		resultados = transiciones.transicionar_producciones([self.ids[0], self.ids[2]], 'finalizar', inicio + timedelta(hours=2, minutes=30))
+		self.assertEqual([r['resultado'] for r in resultados], ['ok', 'rechazado'])
+		produccion = Produccion.objects.select_related('pedido').get(pk=self.ids[0])
+		self.assertEqual((produccion.estado, produccion.tiempo_real, produccion.pedido.estado), ('terminado', Decimal('2.50'), 'terminado'))
+		with self.assertRaises(ValueError):
+			transiciones.transicionar_producciones(self.ids, 'pausar')
+
+	def test_panel_y_api(self):
+		self.client.login(username='supervisor', password='secret123')
+		resp = self.client.post(reverse('core:produccion_lote'), {'ids': self.ids[:2], 'accion': 'iniciar'})
+		self.assertRedirects(resp, reverse('core:produccion_panel'))
+		resp = self.client.post(reverse('core:api_produccion_lote'), {'ids': self.ids, 'accion': 'finalizar'}, content_type='application/json')
+		self.assertEqual(resp.json()['resumen'], {'ok': 2, 'rechazado': 2})
+		resp = self.client.post(reverse('core:api_produccion_lote'), {'ids': self.ids, 'accion': 'x'}, content_type='application/json')
+		self.assertEqual(resp.status_code, 400)
+
+
+@override_settings(PLANIFICACION_AUTOMATICA=False, EVENTOS_ACTIVOS=True, EVENTOS_INTERVALO=60)
+class EventosTiempoRealTest(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='supervisor', password='secret123')
+
+	def test_senales_registran_eventos(self):
+		from . import transiciones
+		from .models import Evento
+		with self.captureOnCommitCallbacks(execute=True):
+			material = Inventario.objects.create(nombre='Papel', cantidad=3, cantidad_minima=5, precio_unitario=Decimal('1.00'))
+			pedido = Pedido.objects.create(
+				cliente=Cliente.objects.create(nombre='Cliente'), inventario=material, cantidad=1, descripcion='x',
+				precio_unitario=Decimal('1.00'), descuento=Decimal('0'), fecha_entrega='2025-03-10',
+			)
+		with self.captureOnCommitCallbacks(execute=True):
+			transiciones.transicionar_producciones([pedido.produccion.pk], 'iniciar')
+		self.assertEqual(
+			list(Evento.objects.values_list('modelo', 'accion', 'ids')),
+			[
+				('inventario', 'creado', [material.pk]), ('produccion', 'creado', [pedido.produccion.pk]),
+				('pedido', 'creado', [pedido.pk]),
+				('produccion', 'masivo', [pedido.produccion.pk]), ('pedido', 'masivo', [pedido.pk]),
+			],
+		)
+		self.assertEqual(Evento.objects.get(modelo='inventario').datos, {'cantidad': 3, 'bajo_minimo': True})
+		# Los cambios masivos llevan el estado nuevo para que el panel corrija las filas sin recargar.
+		self.assertEqual(
+			Evento.objects.get(modelo='produccion', accion='masivo').datos,
+			{'campos': ['estado', 'fecha_inicio'], 'estado': 'en_proceso'},
+		)
+		self.assertEqual(Evento.objects.get(modelo='pedido', accion='masivo').datos, {'campos': ['estado'], 'estado': 'en_produccion'})
+
+		self.client.login(username='supervisor', password='secret123')
+		resp = self.client.get(reverse('core:produccion_panel'))
+		self.assertContains(resp, f'data-produccion="{pedido.produccion.pk}" data-estado="en_proceso"')
+		self.assertEqual((resp.context['en_proceso'], resp.context['sin_iniciar']), (1, 0))
+
+	def test_una_lectura_para_varias_pantallas(self):
+		import asyncio
+		import json
+		from unittest import mock
+		from asgiref.sync import async_to_sync, sync_to_async
+		from . import eventos
+
+		async def escenario():
+			pantallas = [eventos.difusor.flujo() for _ in range(3)]
+			for pantalla in pantallas:
+				self.assertTrue((await pantalla.__anext__()).startswith('retry:'))
+			await sync_to_async(eventos.registrar)('pedido', [7], 'guardado', {'estado': 'terminado'})
+			recibidos = [await asyncio.wait_for(pantalla.__anext__(), 5) for pantalla in pantallas]
+			for pantalla in pantallas:
+				await pantalla.aclose()
+			await asyncio.sleep(0.01)
+			return recibidos
+
+		with mock.patch.object(eventos, 'leer', wraps=eventos.leer) as leer:
+			recibidos = async_to_sync(escenario)()
+		# Una lectura al arrancar y, como mucho, otra al publicar: no una por pantalla.
+		self.assertLessEqual(leer.call_count, 2)
+		self.assertEqual(len(set(recibidos)), 1)
+		cabecera, tipo, datos = recibidos[0].strip().split('\n')
+		self.assertEqual(tipo, 'event: pedido')
+		self.assertEqual(json.loads(datos[len('data: '):])['datos'], {'estado': 'terminado'})
+
+	def test_nueva_pantalla_no_recibe_eventos_sin_lector(self):
+		import asyncio
+		from asgiref.sync import async_to_sync, sync_to_async
+		from . import eventos
+
+		async def escenario():
+			primera = eventos.difusor.flujo()
+			await primera.__anext__()
+			await primera.aclose()
+			await asyncio.wait_for(eventos.difusor._tarea, 5)
+			await sync_to_async(eventos.registrar)('pedido', [1], 'guardado', {})
+			segunda = eventos.difusor.flujo()
+			await segunda.__anext__()
+			await sync_to_async(eventos.registrar)('pedido', [2], 'guardado', {})
+			recibido = await asyncio.wait_for(segunda.__anext__(), 5)
+			await segunda.aclose()
+			return recibido
+
+		self.assertIn('"ids":[2]', async_to_sync(escenario)())
+
+	def test_vista_requiere_sesion_y_asgi(self):
+		from asgiref.sync import async_to_sync
+		from django.test import AsyncRequestFactory
+		from . import views
+		url = reverse('core:eventos_stream')
+		self.assertEqual(self.client.get(url).status_code, 403)
+		self.client.login(username='supervisor', password='secret123')
+		self.assertEqual(self.client.get(url).status_code, 501)
+
+		request = AsyncRequestFactory().get(url, HTTP_LAST_EVENT_ID='12')
+		request.user = self.user
+		resp = async_to_sync(views.eventos_stream)(request)
+		self.assertEqual((resp.status_code, resp['Content-Type']), (200, 'text/event-stream'))
+
+		with override_settings(EVENTOS_ACTIVOS=False):
+			resp = async_to_sync(views.eventos_stream)(request)
+		self.assertEqual(resp.status_code, 501)
+
+	def test_sin_asgi_no_se_publica(self):
+		from .models import Evento
+		with override_settings(EVENTOS_ACTIVOS=False), self.captureOnCommitCallbacks(execute=True):
+			Inventario.objects.create(nombre='Papel', cantidad=3, cantidad_minima=5, precio_unitario=Decimal('1.00'))
+		self.assertFalse(Evento.objects.exists())
+
+	def test_purga_sin_pantallas_abiertas(self):
+		from datetime import timedelta
+		from unittest import mock
+		from django.core.management import call_command
+		from django.utils import timezone
+		from . import eventos
+		from .models import Evento
+		viejo = eventos.registrar('pedido', [1], 'guardado', {})
+		Evento.objects.filter(pk=viejo.pk).update(fecha=timezone.now() - timedelta(hours=2))
+		with mock.patch.object(eventos, '_proxima_purga', 0.0):
+			eventos.registrar('pedido', [2], 'guardado', {})
+		self.assertEqual(list(Evento.objects.values_list('ids', flat=True)), [[2]])
+
+		Evento.objects.update(fecha=timezone.now() - timedelta(hours=2))
+		salida = StringIO()
+		call_command('purge_eventos', stdout=salida)
+		self.assertIn('1 eventos eliminados', salida.getvalue())
+		self.assertFalse(Evento.objects.exists())
@@ -0,0 +1,160 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DateField, DateTimeField, DecimalField, F, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import contadores
+from .signals import cambios_masivos
+
+TRANSICIONES = {
+    'pendiente': {'en_proceso', 'en_produccion', 'terminado', 'entregado', 'cancelado'},
+    'en_proceso': {'pendiente', 'en_produccion', 'terminado', 'entregado', 'cancelado'},
+    'en_produccion': {'en_proceso', 'terminado', 'entregado', 'cancelado'},
+    'terminado': {'en_produccion', 'entregado'},
+    'entregado': {'terminado'},
+    'cancelado': {'pendiente'},
+}
+
+ACCIONES_PRODUCCION = {
+    'iniciar': {'desde': ('no_iniciado', 'pausado'), 'estado': 'en_proceso', 'pedido': 'en_produccion'},
+    'finalizar': {'desde': ('en_proceso', 'pausado'), 'estado': 'terminado', 'pedido': 'terminado'},
+}
+MAXIMO_HORAS = Decimal('999.99')
+
+
+def transicion_permitida(estado_actual, estado_destino):
+    return estado_destino in TRANSICIONES.get(estado_actual, ())
+
+
+def _entero(valor):
+    if isinstance(valor, bool):
+        return None
+    if isinstance(valor, int):
+        return valor
+    if isinstance(valor, str):
+        try:
+            return int(valor.strip())
+        except ValueError:
+            return None
+    return None
+
+
+def normalizar_ids(ids):
+    """Ids enteros sin repetir, en el orden recibido, y aparte los valores que no lo son."""
+    if not isinstance(ids, (list, tuple)):
+        raise ValueError('ids debe ser una lista')
+    vistos = []
+    invalidos = []
+    for valor in ids:
+        pk = _entero(valor)
+        if pk is None:
+            invalidos.append(valor)
+        elif pk not in vistos:
+            vistos.append(pk)
+    return vistos, invalidos
+
+
+def _listar(ids, resultados, invalidos):
+    filas = [{'id': pk, 'resultado': resultados[pk][0], 'mensaje': resultados[pk][1]} for pk in ids]
+    return filas + [{'id': valor, 'resultado': 'invalido', 'mensaje': 'El id debe ser un entero'} for valor in invalidos]
+
+
+def transicionar_lote(modelo, ids, estado_destino, fecha=None):
+    if estado_destino not in TRANSICIONES:
+        raise ValueError(f'Estado inválido: {estado_destino}')
+    ids, invalidos = normalizar_ids(ids)
+    fecha = fecha or timezone.now().date()
+    resultados = {pk: ('no_encontrado', 'No existe') for pk in ids}
+    validos = []
+    clientes = set()
+
+    with transaction.atomic():
+        filas = modelo.objects.select_for_update().filter(pk__in=ids).order_by().values_list('pk', 'estado', 'cliente_id')
+        for pk, estado, cliente_id in filas:
+            if estado == estado_destino:
+                resultados[pk] = ('sin_cambios', f'Ya está en {estado}')
+            elif not transicion_permitida(estado, estado_destino):
+                resultados[pk] = ('rechazado', f'No se permite pasar de {estado} a {estado_destino}')
+            else:
+                resultados[pk] = ('ok', f'{estado} -> {estado_destino}')
+                validos.append(pk)
+                if contadores.delta_transicion(estado, estado_destino):
+                    clientes.add(cliente_id)
+
+        if validos:
+            campos = {'estado': estado_destino}
+            if estado_destino == contadores.ESTADO_CONTABLE:
+                campos['fecha_entregado'] = Coalesce('fecha_entregado', Value(fecha, output_field=DateField()))
+            modelo.objects.filter(pk__in=validos).update(**campos)
+            cambios_masivos.send(sender=modelo, pks=validos, campos=list(campos), valores={'estado': estado_destino})
+            contadores.recalcular_contadores(clientes)
+
+    return _listar(ids, resultados, invalidos)
+
+
+def transicionar_producciones(ids, accion, momento=None):
+    """Inicia o finaliza varias producciones con un UPDATE por tabla.
+
+    Equivale a ``iniciar_produccion``/``finalizar_produccion`` de cada una,
+    pero el pedido sólo cambia de estado (nunca pasa por ni sale de
+    ``entregado``), así que no hace falta recalcular precio ni contadores.
+    """
+    from .models import Pedido, Produccion
+
+    if accion not in ACCIONES_PRODUCCION:
+        raise ValueError(f'Acción inválida: {accion}')
+    regla = ACCIONES_PRODUCCION[accion]
+    ids, invalidos = normalizar_ids(ids)
+    momento = momento or timezone.now()
+    resultados = {pk: ('no_encontrado', 'No existe') for pk in ids}
+    validos = []
+    pedidos = []
+    tiempos = {}
+
+    with transaction.atomic():
+        filas = Produccion.objects.select_for_update().filter(pk__in=ids).order_by().values_list(
+            'pk', 'estado', 'fecha_inicio', 'pedido_id', 'pedido__estado',
+        )
+        for pk, estado, inicio, pedido_id, estado_pedido in filas:
+            if estado == regla['estado']:
+                resultados[pk] = ('sin_cambios', f'Ya está en {estado}')
+            elif estado not in regla['desde']:
+                resultados[pk] = ('rechazado', f'No se puede {accion} una producción en {estado}')
+            elif estado_pedido == 'cancelado':
+                resultados[pk] = ('rechazado', f'El pedido #{pedido_id} está cancelado')
+            else:
+                resultados[pk] = ('ok', f"{estado} -> {regla['estado']}")
+                validos.append(pk)
+                if estado_pedido != contadores.ESTADO_CONTABLE and transicion_permitida(estado_pedido, regla['pedido']):
+                    pedidos.append(pedido_id)
+                if accion == 'finalizar' and inicio:
+                    horas = Decimal((momento - inicio).total_seconds() / 3600).quantize(Decimal('0.01'))
+                    tiempos[pk] = min(max(horas, Decimal('0')), MAXIMO_HORAS)
+
+        if validos:
+            campos = {'estado': regla['estado']}
+            if accion == 'iniciar':
+                campos['fecha_inicio'] = Coalesce('fecha_inicio', Value(momento, output_field=DateTimeField()))
+            else:
+                campos['fecha_finalizacion'] = momento
+                if tiempos:
+                    campos['tiempo_real'] = Case(
+                        *(When(pk=pk, then=Value(horas)) for pk, horas in tiempos.items()),
+                        default=F('tiempo_real'), output_field=DecimalField(max_digits=5, decimal_places=2),
+                    )
+            Produccion.objects.filter(pk__in=validos).update(**campos)
+            cambios_masivos.send(sender=Produccion, pks=validos, campos=list(campos), valores={'estado': regla['estado']})
+            if pedidos:
+                Pedido.objects.filter(pk__in=pedidos).update(estado=regla['pedido'])
+                cambios_masivos.send(sender=Pedido, pks=pedidos, campos=['estado'], valores={'estado': regla['pedido']})
+
+    return _listar(ids, resultados, invalidos)
+
+
+def resumir(resultados):
+    resumen = {}
+    for fila in resultados:
+        resumen[fila['resultado']] = resumen.get(fila['resultado'], 0) + 1
+    return resumen
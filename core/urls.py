@@ -15,12 +15,14 @@ urlpatterns = [
     path('clientes/<int:pk>/eliminar/', views.cliente_eliminar, name='cliente_eliminar'),
 
     path('pedidos/', views.pedidos_lista, name='pedidos_lista'),
+    path('pedidos/transicion/', views.pedidos_transicion, name='pedidos_transicion'),
     path('pedidos/crear/', views.pedido_crear, name='pedido_crear'),
     path('pedidos/<int:pk>/editar/', views.pedido_editar, name='pedido_editar'),
     path('pedidos/<int:pk>/eliminar/', views.pedido_eliminar, name='pedido_eliminar'),
     path('pedidos/<int:pk>/', views.pedido_detalle, name='pedido_detalle'),
 
     path('trabajos/', views.trabajos_lista, name='trabajos_lista'),
+    path('trabajos/transicion/', views.trabajos_transicion, name='trabajos_transicion'),
     path('trabajos/crear/', views.trabajo_crear, name='trabajo_crear'),
     path('trabajos/<int:pk>/', views.trabajo_detalle, name='trabajo_detalle'),
     path('trabajos/<int:pk>/editar/', views.trabajo_editar, name='trabajo_editar'),
@@ -39,10 +41,27 @@ urlpatterns = [
     path('compras/<int:pk>/eliminar/', views.compra_eliminar, name='compra_eliminar'),
     path('compras/<int:pk>/recibir/', views.compra_marcar_recibido, name='compra_marcar_recibido'),
     path('compras/reportes/', views.compras_reportes, name='compras_reportes'),
+    path('ventas/reportes/', views.ventas_reportes, name='ventas_reportes'),
+    path('reportes/tareas/<int:pk>/', views.tarea_estado, name='tarea_estado'),
+    path('reportes/tareas/<int:pk>/descargar/', views.tarea_descargar, name='tarea_descargar'),
 
     path('produccion/', views.produccion_panel, name='produccion_panel'),
+    path('produccion/lote/', views.produccion_lote, name='produccion_lote'),
+    path('produccion/planificar/', views.produccion_planificar, name='produccion_planificar'),
     path('produccion/<int:pk>/iniciar/', views.produccion_iniciar, name='produccion_iniciar'),
 
     path('api/status/', views.api_status, name='api_status'),
     path('api/dashboard/stats/', views.api_dashboard_stats, name='api_dashboard_stats'),
+    path('api/eventos/', views.eventos_stream, name='eventos_stream'),
+    path('api/pedidos/transicion/', views.api_pedidos_transicion, name='api_pedidos_transicion'),
+    path('api/trabajos/transicion/', views.api_trabajos_transicion, name='api_trabajos_transicion'),
+    path('api/autocompletar/<str:fuente>/', views.api_autocompletar, name='api_autocompletar'),
+    path('api/catalogo/<str:tipo>/', views.api_catalogo, name='api_catalogo'),
+    path('api/reportes/compras/', views.api_reportes_compras, name='api_reportes_compras'),
+    path('api/reportes/ventas/', views.api_reportes_ventas, name='api_reportes_ventas'),
+    path('api/tareas/<int:pk>/', views.api_tarea_estado, name='api_tarea_estado'),
+    path('api/stock/historico/', views.api_stock_historico, name='api_stock_historico'),
+    path('api/produccion/lote/', views.api_produccion_lote, name='api_produccion_lote'),
+    path('api/produccion/plan/', views.api_produccion_plan, name='api_produccion_plan'),
+    path('api/promesa-entrega/', views.api_promesa_entrega, name='api_promesa_entrega'),
 ]
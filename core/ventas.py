@@ -0,0 +1,218 @@
+import csv
+import hashlib
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils.dateparse import parse_date
+
+from . import versiones
+from .exportacion import celda_csv
+
+TIPOS = ('pedido', 'trabajo')
+PERIODOS = {'dia': TruncDay, 'semana': TruncWeek, 'mes': TruncMonth}
+SECCIONES = [
+    ('por_periodo', 'Por periodo', 'Periodo'),
+    ('por_cliente', 'Por cliente', 'Cliente'),
+    ('por_material', 'Por material (pedidos)', 'Material'),
+    ('por_producto', 'Por producto (trabajos)', 'Producto'),
+]
+METRICAS = ('ventas', 'unidades', 'ingresos', 'descuentos')
+
+
+def _modelos():
+    from .models import Pedido, Trabajo
+
+    return {
+        'pedido': (Pedido, ('core.pedido', 'core.cliente', 'core.inventario')),
+        'trabajo': (Trabajo, ('core.trabajo', 'core.cliente', 'core.producto')),
+    }
+
+
+def filtros_ventas(datos):
+    filtros = {
+        'start_date': (datos.get('start_date') or '').strip(),
+        'end_date': (datos.get('end_date') or '').strip(),
+        'estado': (datos.get('estado') or '').strip(),
+        'tipo': (datos.get('tipo') or '').strip(),
+        'cliente': (str(datos.get('cliente') or '')).strip(),
+        'periodo': (datos.get('periodo') or 'mes').strip(),
+    }
+    for campo in ('start_date', 'end_date'):
+        if filtros[campo] and parse_date(filtros[campo]) is None:
+            filtros[campo] = ''
+    if filtros['tipo'] not in TIPOS:
+        filtros['tipo'] = ''
+    if not filtros['cliente'].isdigit():
+        filtros['cliente'] = ''
+    if filtros['periodo'] not in PERIODOS:
+        filtros['periodo'] = 'mes'
+    return filtros
+
+
+def tipos(filtros):
+    return [filtros['tipo']] if filtros.get('tipo') else list(TIPOS)
+
+
+def ventas_filtradas(tipo, filtros):
+    modelo, _ = _modelos()[tipo]
+    qs = modelo.objects.all()
+    if filtros.get('start_date'):
+        qs = qs.filter(fecha_creacion__gte=parse_date(filtros['start_date']))
+    if filtros.get('end_date'):
+        qs = qs.filter(fecha_creacion__lte=parse_date(filtros['end_date']))
+    if filtros.get('estado'):
+        qs = qs.filter(estado=filtros['estado'])
+    else:
+        qs = qs.exclude(estado='cancelado')
+    if filtros.get('cliente'):
+        qs = qs.filter(cliente_id=int(filtros['cliente']))
+    return qs.order_by()
+
+
+def _metricas():
+    bruto = ExpressionWrapper(F('precio_unitario') * F('cantidad'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    return {
+        'ventas': Count('pk'),
+        'unidades': Sum('cantidad'),
+        'ingresos': Sum('precio_total'),
+        'descuentos': Sum(bruto - F('precio_total'), output_field=DecimalField(max_digits=14, decimal_places=2)),
+    }
+
+
+def _normalizar(fila):
+    fila['unidades'] = fila['unidades'] or 0
+    for campo in ('ingresos', 'descuentos'):
+        fila[campo] = Decimal(fila[campo] or 0).quantize(Decimal('0.01'))
+    return fila
+
+
+def _combinar(grupos, clave):
+    combinadas = {}
+    for fila in grupos:
+        fila = _normalizar(fila)
+        actual = combinadas.get(fila[clave])
+        if actual is None:
+            combinadas[fila[clave]] = fila
+            continue
+        for metrica in METRICAS:
+            actual[metrica] += fila[metrica]
+    return list(combinadas.values())
+
+
+def calcular(filtros):
+    agrupar = PERIODOS[filtros['periodo']]
+    resumen = {}
+    por_periodo, por_cliente, por_material, por_producto = [], [], [], []
+    for tipo in tipos(filtros):
+        qs = ventas_filtradas(tipo, filtros)
+        resumen[tipo] = _normalizar(qs.aggregate(**_metricas()))
+        por_periodo.extend(qs.values(clave=agrupar('fecha_creacion')).annotate(**_metricas()))
+        por_cliente.extend(qs.values(clave=F('cliente_id'), nombre=F('cliente__nombre')).annotate(**_metricas()))
+        if tipo == 'pedido':
+            por_material.extend(qs.values(clave=F('inventario_id'), nombre=F('inventario__nombre')).annotate(**_metricas()))
+        else:
+            por_producto.extend(qs.values(clave=F('producto_id'), nombre=F('producto__nombre')).annotate(**_metricas()))
+
+    total = {metrica: sum(r[metrica] for r in resumen.values()) for metrica in METRICAS}
+    por_periodo = sorted(_combinar(por_periodo, 'clave'), key=lambda f: f['clave'])
+    for fila in por_periodo:
+        fila['nombre'] = fila['clave'].strftime('%Y-%m' if filtros['periodo'] == 'mes' else '%Y-%m-%d')
+
+    def por_ingresos(filas):
+        return sorted(filas, key=lambda f: (-f['ingresos'], f['nombre'] or ''))
+
+    return {
+        'filtros': filtros,
+        'resumen': {**resumen, 'total': total},
+        'por_periodo': por_periodo,
+        'por_cliente': por_ingresos(_combinar(por_cliente, 'clave')),
+        'por_material': por_ingresos(_combinar(por_material, 'clave')),
+        'por_producto': por_ingresos(_combinar(por_producto, 'clave')),
+    }
+
+
+def clave_cache(filtros):
+    etiquetas = sorted({m for tipo in tipos(filtros) for m in _modelos()[tipo][1]})
+    huella = hashlib.sha1(json.dumps(filtros, sort_keys=True).encode()).hexdigest()[:16]
+    return versiones.clave_compuesta(f'ventas:{huella}', *etiquetas)
+
+
+def reporte_ventas(filtros):
+    """Reporte de ventas cacheado por filtros normalizados.
+
+    La clave incluye la versión de cada modelo consultado, así que cualquier
+    cambio en pedidos, trabajos o sus catálogos invalida los reportes afectados.
+    """
+    clave = clave_cache(filtros)
+    reporte = cache.get(clave)
+    if reporte is None:
+        reporte = calcular(filtros)
+        cache.set(clave, reporte, getattr(settings, 'REPORTES_CACHE_TTL', 3600))
+    return reporte
+
+
+def nombre_archivo(filtros, extension):
+    suffix = ''
+    if filtros.get('start_date') or filtros.get('end_date'):
+        suffix = f"_{filtros.get('start_date') or ''}_a_{filtros.get('end_date') or ''}"
+    return f'ventas{suffix}.{extension}'
+
+
+def escribir_csv(reporte, salida):
+    escritor = csv.writer(salida)
+    escritor.writerow(['seccion', 'clave', 'nombre', *METRICAS])
+    for tipo, fila in reporte['resumen'].items():
+        escritor.writerow(['resumen', tipo, '', *(fila[m] for m in METRICAS)])
+    for seccion, _, _ in SECCIONES:
+        for fila in reporte[seccion]:
+            escritor.writerow([seccion, fila['clave'], celda_csv(fila['nombre'] or ''), *(fila[m] for m in METRICAS)])
+
+
+def pdf_ventas(filtros, destino):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    # Cada PDF se pide una vez y corre en ``run_workers``: se calcula siempre
+    # desde la base en lugar de pasar por la caché de reportes.
+    reporte = calcular(filtros)
+    doc = SimpleDocTemplate(destino, pagesize=A4, rightMargin=24, leftMargin=24, topMargin=24, bottomMargin=24)
+    styles = getSampleStyleSheet()
+    estilo = TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#f1f3f5')),
+        ('GRID', (0,0), (-1,-1), 0.25, colors.grey),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0,0), (-1,-1), 8),
+        ('ALIGN', (1,0), (-1,-1), 'RIGHT'),
+    ])
+    encabezado = ['Ventas', 'Unidades', 'Ingresos (Bs.)', 'Descuentos (Bs.)']
+
+    elements = [Paragraph('Reporte de Ventas', styles['Title']), Spacer(1, 8)]
+    filtros_txt = (
+        f"Rango: {filtros.get('start_date') or '-'} a {filtros.get('end_date') or '-'} | "
+        f"Estado: {filtros.get('estado') or 'Todos salvo cancelados'} | Tipo: {filtros.get('tipo') or 'Pedidos y trabajos'}"
+    )
+    elements += [Paragraph(filtros_txt, styles['Normal']), Spacer(1, 12)]
+
+    datos = [['', *encabezado]]
+    datos.extend([tipo.capitalize(), *(str(fila[m]) for m in METRICAS)] for tipo, fila in reporte['resumen'].items())
+    tabla = Table(datos, colWidths=[130, 80, 80, 100, 100])
+    tabla.setStyle(estilo)
+    elements += [tabla, Spacer(1, 16)]
+
+    for seccion, titulo, columna in SECCIONES:
+        if not reporte[seccion]:
+            continue
+        datos = [[columna, *encabezado]]
+        datos.extend([fila['nombre'] or '-', *(str(fila[m]) for m in METRICAS)] for fila in reporte[seccion])
+        tabla = Table(datos, colWidths=[190, 60, 60, 100, 100], repeatRows=1)
+        tabla.setStyle(estilo)
+        elements += [Paragraph(titulo, styles['Heading3']), tabla, Spacer(1, 12)]
+
+    doc.build(elements)
+    return nombre_archivo(filtros, 'pdf')
@@ -0,0 +1,63 @@
+import time
+
+from django.db.models import F, Max
+from django.utils import timezone
+
+# Los contadores viven en la base (``VersionDatos``) para que un cambio hecho
+# en cualquier proceso (web, ``run_workers`` o un comando) invalide las claves
+# de caché de todos los demás.
+
+
+def _etiqueta(modelo):
+    return modelo if isinstance(modelo, str) else modelo._meta.label_lower
+
+
+def _inicial():
+    # Un valor nuevo nunca repite uno anterior aunque la fila se haya perdido.
+    return time.time_ns() // 1000
+
+
+def _crear(etiquetas, modificado=None):
+    from .models import VersionDatos
+
+    VersionDatos.objects.bulk_create(
+        [VersionDatos(modelo=etiqueta, version=_inicial(), modificado=modificado) for etiqueta in etiquetas],
+        ignore_conflicts=True,
+    )
+
+
+def version(modelo):
+    return versiones(modelo)[0]
+
+
+def versiones(*modelos):
+    from .models import VersionDatos
+
+    etiquetas = [_etiqueta(modelo) for modelo in modelos]
+    actuales = dict(VersionDatos.objects.filter(modelo__in=etiquetas).values_list('modelo', 'version'))
+    faltan = [etiqueta for etiqueta in etiquetas if etiqueta not in actuales]
+    if faltan:
+        _crear(faltan)
+        actuales.update(VersionDatos.objects.filter(modelo__in=faltan).values_list('modelo', 'version'))
+    return tuple(actuales[etiqueta] for etiqueta in etiquetas)
+
+
+def ultima_modificacion(*modelos):
+    from .models import VersionDatos
+
+    return VersionDatos.objects.filter(modelo__in=[_etiqueta(m) for m in modelos]).aggregate(fecha=Max('modificado'))['fecha']
+
+
+def incrementar(*modelos):
+    from .models import VersionDatos
+
+    ahora = timezone.now()
+    etiquetas = [_etiqueta(modelo) for modelo in modelos]
+    actualizadas = VersionDatos.objects.filter(modelo__in=etiquetas).update(version=F('version') + 1, modificado=ahora)
+    if actualizadas < len(set(etiquetas)):
+        existentes = set(VersionDatos.objects.filter(modelo__in=etiquetas).values_list('modelo', flat=True))
+        _crear([etiqueta for etiqueta in set(etiquetas) if etiqueta not in existentes], ahora)
+
+
+def clave_compuesta(prefijo, *modelos):
+    return f'{prefijo}:' + '.'.join(str(v) for v in versiones(*modelos))
@@ -2,20 +2,26 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Sum, Count
+from django.db import transaction
+from django.db.models import Q, F, Count
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
+from django.views.decorators.http import condition
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from decimal import Decimal
-import json
-from django.core.serializers.json import DjangoJSONEncoder
+from decimal import Decimal, InvalidOperation
 
-from .models import Cliente, Producto, Pedido, Inventario, Produccion, MovimientoInventario, Proveedor, Compra, Trabajo
+from .models import Cliente, Producto, Pedido, Inventario, Produccion, MovimientoInventario, Proveedor, Compra, Trabajo, Tarea
 from .forms import (
     LoginForm, ClienteForm, PedidoForm,
     ProveedorForm, CompraForm, TrabajoForm
 )
 from .decorators import administrador_o_empleado, solo_administrador
+from . import autocompletar, busqueda, catalogo, eventos, exportacion, planificacion, promesas, reportes, stock, tareas, transiciones, ventas
+from .estadisticas import estadisticas_dashboard, metricas_cache
+from .paginacion import paginar
 
 def user_login(request):
     if request.user.is_authenticated:
@@ -49,28 +55,7 @@ def user_logout(request):
 @login_required
 @administrador_o_empleado
 def dashboard(request):
-    
-    total_clientes = Cliente.objects.count()
-    total_productos = Producto.objects.filter(activo=True).count()
-    
-    pedidos_pendientes = Pedido.objects.filter(estado='pendiente').count()
-    pedidos_en_produccion = Pedido.objects.filter(estado='en_produccion').count()
-    pedidos_hoy = Pedido.objects.filter(fecha_creacion=timezone.now().date()).count()
-    
-    trabajos_pendientes = Trabajo.objects.filter(estado='pendiente').count()
-    trabajos_en_produccion = Trabajo.objects.filter(estado='en_produccion').count()
-    trabajos_hoy = Trabajo.objects.filter(fecha_creacion=timezone.now().date()).count()
-    
-    compras_pendientes = Compra.objects.filter(estado='pendiente').count()
-    compras_ordenadas = Compra.objects.filter(estado='ordenado').count()
-    compras_recibidas = Compra.objects.filter(estado='recibido').count()
-    
-    from django.db.models import F
-    materiales_bajo_stock = Inventario.objects.filter(
-        cantidad__lte=F('cantidad_minima')
-    ).count()
-    
-    produccion_activa = Produccion.objects.filter(estado='en_proceso').count()
+    stats = estadisticas_dashboard()
     
     ultimos_pedidos = Pedido.objects.select_related('cliente', 'inventario').order_by('-fecha_creacion')[:5]
     ultimos_trabajos = Trabajo.objects.select_related('cliente', 'producto').order_by('-fecha_creacion')[:5]
@@ -80,19 +65,19 @@ def dashboard(request):
     ).order_by('cantidad')[:5]
     
     context = {
-        'total_clientes': total_clientes,
-        'total_productos': total_productos,
-        'pedidos_pendientes': pedidos_pendientes,
-        'pedidos_en_produccion': pedidos_en_produccion,
-        'pedidos_hoy': pedidos_hoy,
-        'trabajos_pendientes': trabajos_pendientes,
-        'trabajos_en_produccion': trabajos_en_produccion,
-        'trabajos_hoy': trabajos_hoy,
-        'compras_pendientes': compras_pendientes,
-        'compras_ordenadas': compras_ordenadas,
-        'compras_recibidas': compras_recibidas,
-        'materiales_bajo_stock': materiales_bajo_stock,
-        'produccion_activa': produccion_activa,
+        'total_clientes': stats['clientes']['total'],
+        'total_productos': stats['productos']['activos'],
+        'pedidos_pendientes': stats['pedidos']['pendientes'],
+        'pedidos_en_produccion': stats['pedidos']['en_produccion'],
+        'pedidos_hoy': stats['pedidos']['hoy'],
+        'trabajos_pendientes': stats['trabajos']['pendientes'],
+        'trabajos_en_produccion': stats['trabajos']['en_produccion'],
+        'trabajos_hoy': stats['trabajos']['hoy'],
+        'compras_pendientes': stats['compras']['pendientes'],
+        'compras_ordenadas': stats['compras']['ordenadas'],
+        'compras_recibidas': stats['compras']['recibidas'],
+        'materiales_bajo_stock': stats['inventario']['bajo_stock'],
+        'produccion_activa': stats['produccion']['en_proceso'],
         'ultimos_pedidos': ultimos_pedidos,
         'ultimos_trabajos': ultimos_trabajos,
         'materiales_criticos': materiales_criticos,
@@ -108,16 +93,14 @@ def clientes_lista(request):
     clientes = Cliente.objects.all()
     
     if query:
-        clientes = clientes.filter(
-            Q(nombre__icontains=query) |
-            Q(email__icontains=query) |
-            Q(telefono__icontains=query) |
-            Q(nit_ci__icontains=query)
-        )
+        clientes = busqueda.filtrar(clientes, query)
     
-    clientes = clientes.order_by('-fecha_registro')
+    exportado = exportacion.exportar(request, clientes, 'clientes', ('-fecha_registro', '-id'))
+    if exportado:
+        return exportado
+    pagina = paginar(clientes, request, ('-fecha_registro', '-id'))
     
-    return render(request, 'clientes/lista.html', {'clientes': clientes, 'query': query})
+    return render(request, 'clientes/lista.html', {'clientes': pagina, 'pagina': pagina, 'query': query})
 
 
 @login_required
@@ -178,16 +161,16 @@ def pedidos_lista(request):
         pedidos = pedidos.filter(estado=estado_filtro)
     
     if query:
-        pedidos = pedidos.filter(
-            Q(cliente__nombre__icontains=query) |
-            Q(inventario__nombre__icontains=query) |
-            Q(descripcion__icontains=query)
-        )
+        pedidos = busqueda.filtrar(pedidos, query)
     
-    pedidos = pedidos.order_by('-fecha_creacion')
+    exportado = exportacion.exportar(request, pedidos, 'pedidos', ('-fecha_creacion', '-id'))
+    if exportado:
+        return exportado
+    pagina = paginar(pedidos, request, ('-fecha_creacion', '-id'))
     
     return render(request, 'pedidos/lista.html', {
-        'pedidos': pedidos,
+        'pedidos': pagina,
+        'pagina': pagina,
         'estado_filtro': estado_filtro,
         'query': query
     })
@@ -205,21 +188,64 @@ def trabajos_lista(request):
         trabajos = trabajos.filter(estado=estado_filtro)
 
     if query:
-        trabajos = trabajos.filter(
-            Q(cliente__nombre__icontains=query) |
-            Q(producto__nombre__icontains=query) |
-            Q(descripcion__icontains=query)
-        )
+        trabajos = busqueda.filtrar(trabajos, query)
 
-    trabajos = trabajos.order_by('-fecha_creacion')
+    exportado = exportacion.exportar(request, trabajos, 'trabajos', ('-fecha_creacion', '-id'))
+    if exportado:
+        return exportado
+    pagina = paginar(trabajos, request, ('-fecha_creacion', '-id'))
 
     return render(request, 'trabajos/lista.html', {
-        'trabajos': trabajos,
+        'trabajos': pagina,
+        'pagina': pagina,
         'estado_filtro': estado_filtro,
         'query': query,
     })
 
 
+def _transicion_lote(request, modelo, lista_url):
+    if request.method != 'POST':
+        return redirect(lista_url)
+
+    ids = request.POST.getlist('ids')
+    if not ids:
+        messages.warning(request, 'Selecciona al menos un registro')
+        return redirect(lista_url)
+    try:
+        resultados = transiciones.transicionar_lote(modelo, ids, request.POST.get('estado', ''))
+    except ValueError as exc:
+        messages.error(request, str(exc))
+        return redirect(lista_url)
+
+    actualizados = [str(r['id']) for r in resultados if r['resultado'] == 'ok']
+    omitidos = [f"#{r['id']}: {r['mensaje']}" for r in resultados if r['resultado'] != 'ok']
+    if actualizados:
+        messages.success(request, f'{len(actualizados)} registros actualizados')
+    if omitidos:
+        messages.warning(request, 'Sin actualizar: ' + '; '.join(omitidos))
+    return redirect(lista_url)
+
+
+def _api_transicion_lote(request, modelo):
+    try:
+        resultados = transiciones.transicionar_lote(modelo, request.data.get('ids') or [], request.data.get('estado', ''))
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=400)
+    return Response({'resumen': transiciones.resumir(resultados), 'resultados': resultados})
+
+
+@login_required
+@administrador_o_empleado
+def pedidos_transicion(request):
+    return _transicion_lote(request, Pedido, 'core:pedidos_lista')
+
+
+@login_required
+@administrador_o_empleado
+def trabajos_transicion(request):
+    return _transicion_lote(request, Trabajo, 'core:trabajos_lista')
+
+
 @login_required
 @administrador_o_empleado
 def trabajo_crear(request):
@@ -234,15 +260,10 @@ def trabajo_crear(request):
     else:
         form = TrabajoForm()
 
-    productos_data = list(Producto.objects.filter(activo=True).values('id', 'precio_unitario'))
-    productos_json = json.dumps(productos_data, cls=DjangoJSONEncoder)
-    productos_count = Producto.objects.filter(activo=True).count()
-
     return render(request, 'trabajos/formulario.html', {
         'form': form,
         'accion': 'Crear',
-        'productos_data_json': productos_json,
-        'productos_count': productos_count,
+        'catalogo_url': catalogo.url('productos'),
     })
 
 
@@ -260,16 +281,11 @@ def trabajo_editar(request, pk):
     else:
         form = TrabajoForm(instance=trabajo)
 
-    productos_data = list(Producto.objects.filter(activo=True).values('id', 'precio_unitario'))
-    productos_json = json.dumps(productos_data, cls=DjangoJSONEncoder)
-    productos_count = Producto.objects.filter(activo=True).count()
-
     return render(request, 'trabajos/formulario.html', {
         'form': form,
         'accion': 'Editar',
         'trabajo': trabajo,
-        'productos_data_json': productos_json,
-        'productos_count': productos_count,
+        'catalogo_url': catalogo.url('productos'),
     })
 
 
@@ -306,18 +322,10 @@ def pedido_crear(request):
     else:
         form = PedidoForm()
 
-    from django.core.serializers.json import DjangoJSONEncoder
-    import json
-    qs_inv = Inventario.objects.filter(cantidad__gt=0)
-    productos_data = list(qs_inv.values('id', 'precio_unitario'))
-    productos_json = json.dumps(productos_data, cls=DjangoJSONEncoder)
-    productos_count = qs_inv.count()
-    
     return render(request, 'pedidos/formulario.html', {
         'form': form,
         'accion': 'Crear',
-        'productos_data_json': productos_json,
-        'productos_count': productos_count,
+        'catalogo_url': catalogo.url('materiales'),
     })
 
 
@@ -335,19 +343,11 @@ def pedido_editar(request, pk):
     else:
         form = PedidoForm(instance=pedido)
 
-    from django.core.serializers.json import DjangoJSONEncoder
-    import json
-    qs_inv = Inventario.objects.filter(Q(cantidad__gt=0) | Q(pk=pedido.inventario_id))
-    productos_data = list(qs_inv.values('id', 'precio_unitario'))
-    productos_json = json.dumps(productos_data, cls=DjangoJSONEncoder)
-    productos_count = qs_inv.count()
-
     return render(request, 'pedidos/formulario.html', {
         'form': form,
         'accion': 'Editar',
         'pedido': pedido,
-        'productos_data_json': productos_json,
-        'productos_count': productos_count,
+        'catalogo_url': catalogo.url('materiales'),
     })
 
 
@@ -379,9 +379,19 @@ def inventario_lista(request):
     qs = Inventario.objects.all()
     if ocultar_agotados:
         qs = qs.filter(cantidad__gt=0)
-    inventario = qs.order_by('nombre')
+    exportado = exportacion.exportar(request, qs, 'inventario', ('nombre', 'id'))
+    if exportado:
+        return exportado
+    pagina = paginar(qs, request, ('nombre', 'id'))
+    totales = qs.aggregate(
+        total=Count('pk'),
+        bajo_stock=Count('pk', filter=Q(cantidad__lte=F('cantidad_minima'))),
+        agotados=Count('pk', filter=Q(cantidad=0)),
+    )
     return render(request, 'inventario/lista.html', {
-        'inventario': inventario,
+        'inventario': pagina,
+        'pagina': pagina,
+        'totales': totales,
         'ocultar_agotados': ocultar_agotados,
     })
 
@@ -390,11 +400,51 @@ def inventario_lista(request):
 @login_required
 @administrador_o_empleado
 def produccion_panel(request):
-    producciones = Produccion.objects.select_related('pedido__cliente', 'empleado').exclude(
+    producciones = Produccion.objects.select_related('pedido__cliente', 'empleado', 'plan').exclude(
         estado='terminado'
     ).order_by('-fecha_inicio')
-    
-    return render(request, 'produccion/panel.html', {'producciones': producciones})
+    atrasadas = sum(1 for p in producciones if hasattr(p, 'plan') and p.plan.atrasada)
+    en_proceso = sum(1 for p in producciones if p.estado == 'en_proceso')
+    sin_iniciar = sum(1 for p in producciones if p.estado == 'no_iniciado')
+
+    return render(request, 'produccion/panel.html', {
+        'producciones': producciones, 'atrasadas': atrasadas, 'en_proceso': en_proceso, 'sin_iniciar': sin_iniciar,
+    })
+
+
+@login_required
+@administrador_o_empleado
+def produccion_planificar(request):
+    if request.method == 'POST':
+        filas = planificacion.planificar()
+        atrasadas = sum(1 for fila in filas if fila.atrasada)
+        messages.success(request, f'Plan recalculado: {len(filas)} trabajos, {atrasadas} no llegan a su fecha de entrega')
+    return redirect('core:produccion_panel')
+
+
+@login_required
+@administrador_o_empleado
+def produccion_lote(request):
+    if request.method != 'POST':
+        return redirect('core:produccion_panel')
+
+    ids = request.POST.getlist('ids')
+    if not ids:
+        messages.warning(request, 'Selecciona al menos una producción')
+        return redirect('core:produccion_panel')
+    try:
+        resultados = transiciones.transicionar_producciones(ids, request.POST.get('accion', ''))
+    except ValueError as exc:
+        messages.error(request, str(exc))
+        return redirect('core:produccion_panel')
+
+    actualizados = [r for r in resultados if r['resultado'] == 'ok']
+    omitidos = [f"#{r['id']}: {r['mensaje']}" for r in resultados if r['resultado'] != 'ok']
+    if actualizados:
+        messages.success(request, f'{len(actualizados)} producciones actualizadas')
+    if omitidos:
+        messages.warning(request, 'Sin actualizar: ' + '; '.join(omitidos))
+    return redirect('core:produccion_panel')
 
 
 @login_required
@@ -419,43 +469,176 @@ def api_status(request):
     })
 
 
+def _puede_ver_eventos(request):
+    perfil = getattr(request.user, 'perfil', None) if request.user.is_authenticated else None
+    return perfil is not None and perfil.rol in ('administrador', 'empleado')
+
+
+async def eventos_stream(request):
+    from asgiref.sync import sync_to_async
+
+    if not await sync_to_async(_puede_ver_eventos)(request):
+        return JsonResponse({'error': 'No autorizado'}, status=403)
+    if not isinstance(request, ASGIRequest) or not eventos.activos():
+        # Bajo WSGI el flujo ocuparía un hilo para siempre; el navegador no reintenta ante un error.
+        return JsonResponse({'error': 'El flujo de eventos requiere un servidor ASGI'}, status=501)
+    desde = request.headers.get('Last-Event-ID') or request.GET.get('desde', '')
+    respuesta = StreamingHttpResponse(
+        eventos.difusor.flujo(int(desde) if desde.isdigit() else None), content_type='text/event-stream',
+    )
+    respuesta['Cache-Control'] = 'no-cache'
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
+
+
 @api_view(['GET'])
 @login_required
 def api_dashboard_stats(request):
-    from django.db.models import F
-    
-    stats = {
-        'pedidos': {
-            'total': Pedido.objects.count(),
-            'pendientes': Pedido.objects.filter(estado='pendiente').count(),
-            'en_produccion': Pedido.objects.filter(estado='en_produccion').count(),
-            'terminados': Pedido.objects.filter(estado='terminado').count(),
-        },
-        'trabajos': {
-            'total': Trabajo.objects.count(),
-            'pendientes': Trabajo.objects.filter(estado='pendiente').count(),
-            'en_produccion': Trabajo.objects.filter(estado='en_produccion').count(),
-            'terminados': Trabajo.objects.filter(estado='terminado').count(),
-        },
-        'inventario': {
-            'total_materiales': Inventario.objects.count(),
-            'bajo_stock': Inventario.objects.filter(cantidad__lte=F('cantidad_minima')).count(),
-        },
-        'clientes': {
-            'total': Cliente.objects.count(),
-            'frecuentes': Cliente.objects.filter(es_frecuente=True).count(),
-        },
-        'compras': {
-            'total': Compra.objects.count(),
-            'pendientes': Compra.objects.filter(estado='pendiente').count(),
-            'ordenadas': Compra.objects.filter(estado='ordenado').count(),
-            'recibidas': Compra.objects.filter(estado='recibido').count(),
-        },
-    }
+    stats = dict(estadisticas_dashboard())
+    stats['cache'] = metricas_cache()
     
     return Response(stats)
 
 
+@api_view(['POST'])
+@login_required
+@administrador_o_empleado
+def api_pedidos_transicion(request):
+    return _api_transicion_lote(request, Pedido)
+
+
+@api_view(['POST'])
+@login_required
+@administrador_o_empleado
+def api_trabajos_transicion(request):
+    return _api_transicion_lote(request, Trabajo)
+
+
+@api_view(['POST'])
+@login_required
+@administrador_o_empleado
+def api_produccion_lote(request):
+    try:
+        resultados = transiciones.transicionar_producciones(request.data.get('ids') or [], request.data.get('accion', ''))
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=400)
+    return Response({'resumen': transiciones.resumir(resultados), 'resultados': resultados})
+
+
+def _version_catalogo(request, tipo):
+    return catalogo.version(tipo) if tipo in catalogo.CATALOGOS else None
+
+
+def _modificacion_catalogo(request, tipo):
+    return catalogo.ultima_modificacion(tipo) if tipo in catalogo.CATALOGOS else None
+
+
+@login_required
+@condition(etag_func=_version_catalogo, last_modified_func=_modificacion_catalogo)
+def api_catalogo(request, tipo):
+    if tipo not in catalogo.CATALOGOS:
+        raise Http404(f'Catálogo desconocido: {tipo}')
+    datos = catalogo.catalogo(tipo)
+    respuesta = JsonResponse({'version': datos['version'], tipo: datos['items']})
+    if request.GET.get('v') == datos['version']:
+        respuesta['Cache-Control'] = 'private, max-age=31536000, immutable'
+    else:
+        respuesta['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+
+def _momento(valor):
+    from datetime import datetime, time
+    from django.utils.dateparse import parse_date, parse_datetime
+
+    if not valor:
+        return timezone.now()
+    # Una fecha sola cuenta hasta el final de ese día.
+    fecha = parse_date(valor)
+    momento = datetime.combine(fecha, time.max) if fecha else parse_datetime(valor)
+    if momento is None:
+        raise ValueError(f'Fecha inválida: {valor}')
+    return timezone.make_aware(momento) if timezone.is_naive(momento) else momento
+
+
+@api_view(['GET'])
+@login_required
+def api_stock_historico(request):
+    try:
+        momento = _momento(request.query_params.get('momento', '').strip())
+        materiales = request.query_params.get('materiales', '').strip()
+        ids = [int(pk) for pk in materiales.split(',') if pk.strip()] if materiales else None
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=400)
+
+    estado = stock.stock_en(momento, ids)
+    nombres = dict(Inventario.objects.filter(pk__in=list(estado)).values_list('pk', 'nombre'))
+    return Response({
+        'momento': momento,
+        'stock': [
+            {'id': pk, 'nombre': nombres.get(pk), 'cantidad': cantidad, 'punto_control': punto, 'movimientos_reproducidos': reproducidos}
+            for pk, (cantidad, punto, reproducidos) in estado.items()
+        ],
+    })
+
+
+@api_view(['GET'])
+@login_required
+def api_promesa_entrega(request):
+    try:
+        cantidad = int(request.query_params.get('cantidad', ''))
+        material = request.query_params.get('inventario', '').strip()
+        inventario_id = int(material) if material else None
+        if cantidad < 1:
+            raise ValueError('La cantidad debe ser mayor a cero')
+        return Response(promesas.prometer(cantidad, inventario_id))
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=400)
+
+
+@api_view(['GET'])
+@login_required
+def api_produccion_plan(request):
+    return Response({
+        'empleados': [
+            {
+                'id': empleado.pk,
+                'username': empleado.username,
+                'horas': sum(fila.horas for fila in filas),
+                'atrasadas': sum(1 for fila in filas if fila.atrasada),
+                'cola': [
+                    {
+                        'produccion': fila.produccion_id,
+                        'pedido': fila.produccion.pedido_id,
+                        'cliente': fila.produccion.pedido.cliente.nombre,
+                        'posicion': fila.posicion,
+                        'horas': fila.horas,
+                        'inicio': fila.inicio,
+                        'fin': fila.fin,
+                        'fecha_entrega': fila.fecha_entrega,
+                        'atrasada': fila.atrasada,
+                    }
+                    for fila in filas
+                ],
+            }
+            for empleado, filas in planificacion.plan_por_empleado().items()
+        ],
+    })
+
+
+@api_view(['GET'])
+@login_required
+def api_autocompletar(request, fuente):
+    if fuente not in autocompletar.FUENTES:
+        return Response({'error': f'Fuente desconocida: {fuente}'}, status=404)
+    return Response(autocompletar.autocompletar(
+        fuente,
+        request.GET.get('q', ''),
+        limite=request.GET.get('limite'),
+        cursor=request.GET.get('cursor'),
+    ))
+
+
 @login_required
 @administrador_o_empleado
 def compra_marcar_recibido(request, pk):
@@ -482,8 +665,11 @@ def proveedores_lista(request):
             Q(email__icontains=query) |
             Q(telefono__icontains=query)
         )
-    proveedores = proveedores.order_by('nombre')
-    return render(request, 'proveedores/lista.html', {'proveedores': proveedores, 'query': query})
+    exportado = exportacion.exportar(request, proveedores, 'proveedores', ('nombre', 'id'))
+    if exportado:
+        return exportado
+    pagina = paginar(proveedores, request, ('nombre', 'id'))
+    return render(request, 'proveedores/lista.html', {'proveedores': pagina, 'pagina': pagina, 'query': query})
 
 
 @login_required
@@ -536,154 +722,89 @@ def compras_lista(request):
     if estado_filtro:
         compras = compras.filter(estado=estado_filtro)
     if query:
-        compras = compras.filter(
-            Q(proveedor__nombre__icontains=query) |
-            Q(inventario__nombre__icontains=query) |
-            Q(observaciones__icontains=query)
-        )
-    compras = compras.order_by('-fecha_creacion')
+        compras = busqueda.filtrar(compras, query)
+    exportado = exportacion.exportar(request, compras, 'compras', ('-fecha_creacion', '-id'))
+    if exportado:
+        return exportado
+    pagina = paginar(compras, request, ('-fecha_creacion', '-id'))
     return render(request, 'compras/lista.html', {
-        'compras': compras,
+        'compras': pagina,
+        'pagina': pagina,
         'estado_filtro': estado_filtro,
         'query': query
     })
 
 
-@login_required
-@administrador_o_empleado
-def compra_crear(request):
+def _material_nuevo(datos):
+    return Inventario.objects.create(
+        nombre=datos.get('nombre_material'),
+        descripcion=datos.get('descripcion_material') or '',
+        unidad=datos.get('unidad_material') or 'unidad',
+        cantidad=0,
+        cantidad_minima=int(datos.get('cantidad_minima_material') or 10),
+        proveedor=datos.get('proveedor_material') or '',
+        precio_unitario=Decimal(datos.get('precio_unitario_material') or '0'),
+    )
+
+
+def _guardar_compra(request, compra=None):
+    def guardar(form):
+        nueva = form.save(commit=False)
+        if compra is None:
+            nueva.usuario_registro = request.user
+        nueva.save()
+        return nueva
+
+    datos = request.POST
+    if datos.get('material_nuevo') not in ['on', 'true', '1']:
+        form = CompraForm(datos, instance=compra)
+        return form, guardar(form) if form.is_valid() else None
+
+    if not datos.get('nombre_material'):
+        messages.error(request, 'Debes ingresar el nombre del nuevo material.')
+        return CompraForm(datos, instance=compra), None
+
+    with transaction.atomic():
+        try:
+            inv = _material_nuevo(datos)
+        except (ValueError, InvalidOperation):
+            messages.error(request, 'Los datos del nuevo material no son válidos.')
+            return CompraForm(datos, instance=compra), None
+        datos = datos.copy()
+        datos['inventario'] = str(inv.id)
+        form = CompraForm(datos, instance=compra)
+        if form.is_valid():
+            return form, guardar(form)
+        transaction.set_rollback(True)
+    return form, None
+
+
+def _formulario_compra(request, compra=None):
     if request.method == 'POST':
-        material_nuevo = request.POST.get('material_nuevo') in ['on', 'true', '1']
-        if material_nuevo:
-            nombre = request.POST.get('nombre_material')
-            if not nombre:
-                messages.error(request, 'Debes ingresar el nombre del nuevo material.')
-                form = CompraForm(request.POST)
-                return render(request, 'compras/formulario.html', {
-                    'form': form,
-                    'accion': 'Crear',
-                    'inventarios_json': json.dumps(list(Inventario.objects.values('id', 'precio_unitario', 'proveedor')), cls=DjangoJSONEncoder),
-                    'proveedores_nombres': list(Proveedor.objects.filter(activo=True).order_by('nombre').values_list('nombre', flat=True))
-                })
-
-            descripcion = request.POST.get('descripcion_material') or ''
-            unidad = request.POST.get('unidad_material') or 'unidad'
-            cantidad_minima = int(request.POST.get('cantidad_minima_material') or 10)
-            proveedor_txt = request.POST.get('proveedor_material') or ''
-            precio_unit_material = Decimal(request.POST.get('precio_unitario_material') or '0')
-
-            inv = Inventario.objects.create(
-                nombre=nombre,
-                descripcion=descripcion,
-                unidad=unidad,
-                cantidad=0,
-                cantidad_minima=cantidad_minima,
-                proveedor=proveedor_txt,
-                precio_unitario=precio_unit_material,
-            )
-            post_data = request.POST.copy()
-            post_data['inventario'] = str(inv.id)
-            form = CompraForm(post_data)
-            if form.is_valid():
-                compra = form.save(commit=False)
-                compra.usuario_registro = request.user
-                compra.save()
-                messages.success(request, f'Compra #{compra.id} creada exitosamente')
-                return redirect('core:compras_lista')
-            else:
-                inv.delete()
-                return render(request, 'compras/formulario.html', {
-                    'form': form,
-                    'accion': 'Crear',
-                    'inventarios_json': json.dumps(list(Inventario.objects.values('id', 'precio_unitario', 'proveedor')), cls=DjangoJSONEncoder),
-                    'proveedores_nombres': list(Proveedor.objects.filter(activo=True).order_by('nombre').values_list('nombre', flat=True))
-                })
-        else:
-            form = CompraForm(request.POST)
-            if form.is_valid():
-                compra = form.save(commit=False)
-                compra.usuario_registro = request.user
-                compra.save()
-                messages.success(request, f'Compra #{compra.id} creada exitosamente')
-                return redirect('core:compras_lista')
+        form, guardada = _guardar_compra(request, compra)
+        if guardada:
+            verbo = 'actualizada' if compra else 'creada'
+            messages.success(request, f'Compra #{guardada.id} {verbo} exitosamente')
+            return redirect('core:compras_lista')
     else:
-        form = CompraForm()
+        form = CompraForm(instance=compra)
 
-    return render(request, 'compras/formulario.html', {
-        'form': form,
-        'accion': 'Crear',
-        'inventarios_json': json.dumps(list(Inventario.objects.values('id', 'precio_unitario', 'proveedor')), cls=DjangoJSONEncoder),
-        'proveedores_nombres': list(Proveedor.objects.filter(activo=True).order_by('nombre').values_list('nombre', flat=True))
-    })
+    contexto = {'form': form, 'accion': 'Editar' if compra else 'Crear', **catalogo.contexto_compra()}
+    if compra:
+        contexto['compra'] = compra
+    return render(request, 'compras/formulario.html', contexto)
+
+
+@login_required
+@administrador_o_empleado
+def compra_crear(request):
+    return _formulario_compra(request)
 
 
 @login_required
 @administrador_o_empleado
 def compra_editar(request, pk):
-    compra = get_object_or_404(Compra, pk=pk)
-    if request.method == 'POST':
-        material_nuevo = request.POST.get('material_nuevo') in ['on', 'true', '1']
-        if material_nuevo:
-            nombre = request.POST.get('nombre_material')
-            if not nombre:
-                form = CompraForm(request.POST, instance=compra)
-                messages.error(request, 'Debes ingresar el nombre del nuevo material.')
-                return render(request, 'compras/formulario.html', {
-                    'form': form,
-                    'accion': 'Editar',
-                    'compra': compra,
-                    'inventarios_json': json.dumps(list(Inventario.objects.values('id', 'precio_unitario', 'proveedor')), cls=DjangoJSONEncoder),
-                    'proveedores_nombres': list(Proveedor.objects.filter(activo=True).order_by('nombre').values_list('nombre', flat=True))
-                })
-
-            descripcion = request.POST.get('descripcion_material') or ''
-            unidad = request.POST.get('unidad_material') or 'unidad'
-            cantidad_minima = int(request.POST.get('cantidad_minima_material') or 10)
-            proveedor_txt = request.POST.get('proveedor_material') or ''
-            precio_unit_material = Decimal(request.POST.get('precio_unitario_material') or '0')
-
-            inv = Inventario.objects.create(
-                nombre=nombre,
-                descripcion=descripcion,
-                unidad=unidad,
-                cantidad=0,
-                cantidad_minima=cantidad_minima,
-                proveedor=proveedor_txt,
-                precio_unitario=precio_unit_material,
-            )
-            post_data = request.POST.copy()
-            post_data['inventario'] = str(inv.id)
-            form = CompraForm(post_data, instance=compra)
-            if form.is_valid():
-                compra = form.save(commit=False)
-                compra.save()
-                messages.success(request, f'Compra #{compra.id} actualizada exitosamente')
-                return redirect('core:compras_lista')
-            else:
-                inv.delete()
-                return render(request, 'compras/formulario.html', {
-                    'form': form,
-                    'accion': 'Editar',
-                    'compra': compra,
-                    'inventarios_json': json.dumps(list(Inventario.objects.values('id', 'precio_unitario', 'proveedor')), cls=DjangoJSONEncoder),
-                    'proveedores_nombres': list(Proveedor.objects.filter(activo=True).order_by('nombre').values_list('nombre', flat=True))
-                })
-        else:
-            form = CompraForm(request.POST, instance=compra)
-            if form.is_valid():
-                compra = form.save(commit=False)
-                compra.save()
-                messages.success(request, f'Compra #{compra.id} actualizada exitosamente')
-                return redirect('core:compras_lista')
-    else:
-        form = CompraForm(instance=compra)
-    return render(request, 'compras/formulario.html', {
-        'form': form,
-        'accion': 'Editar',
-        'compra': compra,
-        'inventarios_json': json.dumps(list(Inventario.objects.values('id', 'precio_unitario', 'proveedor')), cls=DjangoJSONEncoder),
-        'proveedores_nombres': list(Proveedor.objects.filter(activo=True).order_by('nombre').values_list('nombre', flat=True))
-    })
+    return _formulario_compra(request, get_object_or_404(Compra, pk=pk))
 
 
 @login_required
@@ -701,120 +822,105 @@ def compra_eliminar(request, pk):
 @login_required
 @administrador_o_empleado
 def compras_reportes(request):
-    from django.utils.dateparse import parse_date
-    from django.http import HttpResponse
-    from io import BytesIO
-
-    qs = Compra.objects.select_related('proveedor', 'inventario').all()
-
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    estado = request.GET.get('estado')
-
-    if start_date:
-        sd = parse_date(start_date)
-        if sd:
-            qs = qs.filter(fecha_creacion__gte=sd)
-    if end_date:
-        ed = parse_date(end_date)
-        if ed:
-            qs = qs.filter(fecha_creacion__lte=ed)
-    if estado:
-        qs = qs.filter(estado=estado)
-
-    resumen = {
-        'total': qs.count(),
-        'pendientes': qs.filter(estado='pendiente').count(),
-        'ordenadas': qs.filter(estado='ordenado').count(),
-        'recibidas': qs.filter(estado='recibido').count(),
-        'canceladas': qs.filter(estado='cancelado').count(),
-        'costo_total': qs.aggregate(total=Sum('costo_total'))['total'] or Decimal('0'),
+    filtros = reportes.filtros_compras(request.GET)
+
+    if request.GET.get('export') == 'pdf':
+        tarea, _ = tareas.encolar('compras_pdf', filtros, usuario=request.user)
+        return redirect('core:tarea_estado', pk=tarea.pk)
+
+    reporte = reportes.reporte_compras(filtros)
+    context = {
+        **reporte,
+        'desgloses': [
+            ('Por proveedor', 'Proveedor', reporte['por_proveedor']),
+            ('Por material', 'Material', reporte['por_material']),
+            ('Por mes', 'Mes', reporte['por_mes']),
+        ],
+        'start_date': filtros['start_date'],
+        'end_date': filtros['end_date'],
+        'estado': filtros['estado'],
     }
+    return render(request, 'compras/reportes.html', context)
 
+
+@login_required
+@administrador_o_empleado
+def ventas_reportes(request):
+    filtros = ventas.filtros_ventas(request.GET)
     export = request.GET.get('export')
+
     if export == 'pdf':
-        try:
-            from reportlab.lib.pagesizes import A4
-            from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-            from reportlab.lib import colors
-            from reportlab.lib.styles import getSampleStyleSheet
-        except Exception:
-            messages.error(request, 'Exportación a PDF no disponible. Instala la dependencia reportlab.')
-        else:
-            buffer = BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=24, leftMargin=24, topMargin=24, bottomMargin=24)
-            elements = []
-            styles = getSampleStyleSheet()
-            
-            title = Paragraph('Reporte de Compras', styles['Title'])
-            elements.append(title)
-            elements.append(Spacer(1, 8))
-            filtros_txt = f"Rango: {start_date or '-'} a {end_date or '-'} | Estado: {estado or 'Todos'}"
-            elements.append(Paragraph(filtros_txt, styles['Normal']))
-            elements.append(Spacer(1, 12))
-            
-            res_data = [
-                ['Total', 'Pendientes', 'Ordenadas', 'Recibidas', 'Canceladas', 'Costo Total (Bs.)'],
-                [
-                    str(resumen['total']),
-                    str(resumen['pendientes']),
-                    str(resumen['ordenadas']),
-                    str(resumen['recibidas']),
-                    str(resumen['canceladas']),
-                    f"{resumen['costo_total']}",
-                ]
-            ]
-            res_table = Table(res_data)
-            res_table.setStyle(TableStyle([
-                ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#f1f3f5')),
-                ('TEXTCOLOR', (0,0), (-1,0), colors.HexColor('#495057')),
-                ('GRID', (0,0), (-1,-1), 0.25, colors.grey),
-                ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-                ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-                ('BOTTOMPADDING', (0,0), (-1,0), 6),
-            ]))
-            elements.append(res_table)
-            elements.append(Spacer(1, 16))
-            
-            headers = ['ID', 'Proveedor', 'Material', 'Cant.', 'Unit.', 'Total', 'Estado', 'F. Creación', 'F. Recepción']
-            data = [headers]
-            for c in qs.order_by('-fecha_creacion'):
-                data.append([
-                    str(c.id),
-                    c.proveedor.nombre if c.proveedor else '',
-                    c.inventario.nombre if c.inventario else '',
-                    str(c.cantidad),
-                    f"{c.precio_unitario}",
-                    f"{c.costo_total}",
-                    c.get_estado_display(),
-                    c.fecha_creacion.strftime('%Y-%m-%d') if c.fecha_creacion else '',
-                    c.fecha_recepcion.strftime('%Y-%m-%d') if c.fecha_recepcion else '',
-                ])
-            table = Table(data, repeatRows=1)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#e9ecef')),
-                ('TEXTCOLOR', (0,0), (-1,0), colors.HexColor('#212529')),
-                ('GRID', (0,0), (-1,-1), 0.25, colors.grey),
-                ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-                ('ALIGN', (0,0), (-1,0), 'CENTER'),
-                ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ]))
-            elements.append(table)
-
-            doc.build(elements)
-            pdf = buffer.getvalue()
-            buffer.close()
-            suffix = ''
-            if start_date or end_date:
-                suffix = f"_{start_date or ''}_a_{end_date or ''}"
-            response = HttpResponse(pdf, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="compras{suffix}.pdf"'
-            return response
+        tarea, _ = tareas.encolar('ventas_pdf', filtros, usuario=request.user)
+        return redirect('core:tarea_estado', pk=tarea.pk)
+
+    reporte = ventas.reporte_ventas(filtros)
+    if export == 'csv':
+        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{ventas.nombre_archivo(filtros, "csv")}"'
+        ventas.escribir_csv(reporte, response)
+        return response
 
     context = {
-        'resumen': resumen,
-        'start_date': start_date or '',
-        'end_date': end_date or '',
-        'estado': estado or '',
+        **reporte,
+        'secciones': [(titulo, columna, reporte[clave]) for clave, titulo, columna in ventas.SECCIONES],
+        'cliente_seleccionado': Cliente.objects.filter(pk=filtros['cliente']).first() if filtros['cliente'] else None,
+        'estados': Pedido.ESTADOS,
     }
-    return render(request, 'compras/reportes.html', context)
+    return render(request, 'ventas/reportes.html', context)
+
+
+@api_view(['GET'])
+@login_required
+def api_reportes_ventas(request):
+    return Response(ventas.reporte_ventas(ventas.filtros_ventas(request.query_params)))
+
+
+def _tarea_json(tarea):
+    datos = {
+        'id': tarea.pk,
+        'tipo': tarea.tipo,
+        'estado': tarea.estado,
+        'parametros': tarea.parametros,
+        'fecha_creacion': tarea.fecha_creacion,
+        'fecha_fin': tarea.fecha_fin,
+        'url_estado': reverse('core:api_tarea_estado', args=[tarea.pk]),
+        'url_descarga': None,
+        'error': tarea.error.strip().splitlines()[-1] if tarea.error else '',
+    }
+    if tarea.estado == 'completada':
+        datos['url_descarga'] = reverse('core:tarea_descargar', args=[tarea.pk])
+    return datos
+
+
+@login_required
+@administrador_o_empleado
+def tarea_estado(request, pk):
+    tarea = get_object_or_404(Tarea, pk=pk)
+    volver = 'core:ventas_reportes' if tarea.tipo == 'ventas_pdf' else 'core:compras_reportes'
+    return render(request, 'reportes/tarea.html', {'tarea': tarea, 'datos': _tarea_json(tarea), 'volver': volver})
+
+
+@login_required
+@administrador_o_empleado
+def tarea_descargar(request, pk):
+    tarea = get_object_or_404(Tarea, pk=pk, estado='completada')
+    ruta = tareas.ruta_archivo(tarea)
+    if ruta is None or not ruta.exists():
+        raise Http404('El archivo del reporte ya no está disponible')
+    return FileResponse(ruta.open('rb'), as_attachment=True, filename=tarea.nombre_archivo, content_type='application/pdf')
+
+
+@api_view(['GET'])
+@login_required
+def api_tarea_estado(request, pk):
+    return Response(_tarea_json(get_object_or_404(Tarea, pk=pk)))
+
+
+@api_view(['GET', 'POST'])
+@login_required
+def api_reportes_compras(request):
+    if request.method == 'GET':
+        filtros = reportes.filtros_compras(request.query_params)
+        return Response({'filtros': filtros, **reportes.reporte_compras(filtros)})
+    tarea, creada = tareas.encolar('compras_pdf', reportes.filtros_compras(request.data), usuario=request.user)
+    return Response(_tarea_json(tarea), status=202 if creada else 200)